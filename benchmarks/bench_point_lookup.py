@@ -0,0 +1,124 @@
+"""
+Сравнение поиска элемента по ID точки: реестр графа схемы против прежнего поиска по тегам холста.
+
+Замеряются сам поиск, распространение отказов (mark_failed_elements) и построение дерева RCA
+(build_tree_base(is_fta=False)). Для прежнего варианта graph.node_by_point подменяется
+поиском по холсту, как это делал FailureSimulator.get_node_by_point до введения реестра.
+Требуется дисплей (окно Tk создается и сразу скрывается).
+
+Запуск: python benchmarks/bench_point_lookup.py [число агрегатов]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import main
+from graph_model import node_points
+from rca_fta import build_tree_base
+
+
+def canvas_node_by_point(simulator, point_id, kind=None):
+    """
+    Прежний поиск: find_withtag по тегам точки и разбор тега point_of_{id}.
+    """
+    canvas = simulator.canvas
+    point_items = canvas.find_withtag(f'out_{point_id}') or canvas.find_withtag(f'in_{point_id}')
+    if point_items:
+        for tag in canvas.gettags(point_items[0]):
+            if tag.startswith('point_of_'):
+                node = simulator.nodes[int(tag.split('_')[-1])]
+                if not node.deleted:
+                    return node
+    return None
+
+
+def build_scheme(aggregates, seed=0):
+    simulator = main.FailureSimulator()
+    simulator.root.withdraw()
+    rng = random.Random(seed)
+
+    inputs = max(1, aggregates // 10)
+    for _ in range(inputs):
+        simulator.add_input_node()
+    for _ in range(aggregates):
+        simulator.add_aggregate()
+    for _ in range(inputs):
+        simulator.add_output_node()
+
+    aggregate_nodes = [node for node in simulator.nodes if node.type == 'aggregate']
+    output_points = [f'0{k}' for k in range(1, inputs + 1)]
+    for node in aggregate_nodes:
+        in_points, out_points = node_points(node)
+        for in_point in in_points:
+            if output_points and rng.random() < 0.6:
+                simulator.create_new_connection(in_point, rng.choice(output_points))
+        for in_point in in_points:
+            for out_point in out_points:
+                if rng.random() < 0.2:
+                    simulator.create_new_connection(in_point, out_point, internal=True)
+        output_points.extend(out_points)
+    for node in simulator.nodes:
+        if node.type == 'output':
+            simulator.create_new_connection(node_points(node)[0][0], rng.choice(output_points))
+    return simulator
+
+
+def measure(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_workloads(simulator, points, out_points, connections):
+    def lookups():
+        for kind, point_id in points:
+            simulator.get_node_by_point(point_id, kind)
+
+    def propagation():
+        for point_id in out_points:
+            simulator.mark_failed_elements(point_id, 'out')
+        simulator.canvas.dtag('failed', 'failed')
+
+    def rca_tree():
+        build_tree_base(simulator, connections, is_fta=False)
+
+    return {
+        'get_node_by_point': measure(lookups),
+        'mark_failed_elements': measure(propagation),
+        'build_tree_base(is_fta=False)': measure(rca_tree),
+    }
+
+
+def main_benchmark(aggregates):
+    simulator = build_scheme(aggregates)
+    graph = simulator.graph
+    points = list(graph.point_index)
+    out_points = [point_id for kind, point_id in points if kind == 'out']
+    connections = simulator.get_internal_connections()
+    print(f'Агрегатов: {aggregates}, точек: {len(points)}, соединений: {len(simulator.connections)}, '
+          f'элементов холста: {len(simulator.canvas.find_all())}')
+
+    registry = run_workloads(simulator, points, out_points, connections)
+
+    graph.node_by_point = lambda point_id, kind=None: canvas_node_by_point(simulator, point_id, kind)
+    try:
+        legacy = run_workloads(simulator, points, out_points, connections)
+    finally:
+        del graph.node_by_point
+
+    print(f'{"Операция":32} {"холст, с":>10} {"реестр, с":>10} {"ускорение":>10}')
+    for name in registry:
+        speedup = legacy[name] / registry[name] if registry[name] else float('inf')
+        print(f'{name:32} {legacy[name]:10.4f} {registry[name]:10.4f} {speedup:9.1f}x')
+    simulator.root.destroy()
+
+
+if __name__ == '__main__':
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,79 @@
+"""
+Время загрузки большой схемы из файлов JSON и .npz без графического интерфейса.
+
+Схема из заданного числа агрегатов со случайными соединениями (по 9 на агрегат) сохраняется
+во временный каталог. Замеряются чтение файла с проверками (load_scheme) и построение графа:
+пакетное (SchemeData.build_graph - add_nodes/add_connections) и, как раньше, поэлементное
+(add_node/add_connection для каждого элемента и соединения). Отрисовка на холсте не входит.
+
+Запуск: python benchmarks/bench_scheme_load.py [число агрегатов] [число повторов]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from graph_model import SchemeGraph, node_points
+from scheme_io import SchemeData, load_scheme, make_node, save_scheme
+
+
+def random_scheme(aggregates, seed=0):
+    """
+    :return: SchemeData: Вход, выход и aggregates агрегатов с 9 * aggregates случайными соединениями
+    """
+    rng = random.Random(seed)
+    nodes = [make_node('input', 0, 1)]
+    nodes += [make_node('aggregate', idx + 1, idx + 1, idx % 100 * 150, idx // 100 * 150)
+              for idx in range(aggregates)]
+    nodes.append(make_node('output', aggregates + 1, 1))
+    points = [node_points(node) for node in nodes]
+
+    connections = set()
+    while len(connections) < 9 * aggregates:
+        start, end = rng.randrange(1, aggregates + 1), rng.randrange(1, aggregates + 1)
+        if start != end:
+            connections.add((rng.choice(points[start][1]), rng.choice(points[end][0]), False))
+    return SchemeData(nodes, sorted(connections))
+
+
+def build_graph_per_element(scheme):
+    graph = SchemeGraph()
+    for node in scheme.nodes:
+        graph.add_node(node)
+    for out_point, in_point, internal in scheme.connections:
+        graph.add_connection(out_point, in_point, internal)
+    return graph
+
+
+def measure(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main_benchmark(aggregates, repeat):
+    scheme = random_scheme(aggregates)
+    print(f'Агрегатов: {aggregates}, соединений: {len(scheme.connections)}, лучшее из {repeat}')
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in ('json', 'npz'):
+            path = os.path.join(directory, f'scheme.{extension}')
+            save_scheme(path, scheme)
+            loaded = load_scheme(path)
+            read = measure(lambda: load_scheme(path), repeat)
+            batch = measure(loaded.build_graph, repeat)
+            per_element = measure(lambda: build_graph_per_element(loaded), repeat)
+            print(f'{extension:5} чтение {read:6.3f} с; граф: пакетно {batch:6.3f} с, '
+                  f'поэлементно {per_element:6.3f} с; всего {read + batch:6.3f} с '
+                  f'(как раньше {read + per_element:6.3f} с)')
+
+
+if __name__ == '__main__':
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+                   int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,88 @@
+"""
+Время запуска программы: импорт main (по данным python -X importtime) и время до появления окна.
+
+Каждый замер выполняется в отдельном процессе интерпретатора. Режим "как раньше" перед созданием
+окна импортирует модули анализа (main.PRELOAD_MODULES), как это делали импорты analysis и rca_fta
+в начале main.py. Для замера времени до окна требуется дисплей.
+
+Запуск: python benchmarks/bench_startup.py [число повторов]
+"""
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+HEAVY_MODULES = ('numpy', 'pandas', 'networkx', 'matplotlib')
+
+WINDOW_SCRIPT = """
+import sys
+import main
+if sys.argv[1] == 'eager':
+    main.preload_modules()
+simulator = main.FailureSimulator(preload=False)
+simulator.root.update()
+print('ready', flush=True)
+simulator.root.destroy()
+"""
+
+LOADED_SCRIPT = """
+import sys
+import main
+print(' '.join(name for name in {modules} if name in sys.modules))
+""".format(modules=HEAVY_MODULES)
+
+
+def import_times():
+    """
+    Запускает python -X importtime -c "import main" и разбирает вывод.
+    :return: dict: Модуль -> (глубина вложенности, собственное время, накопленное время в микросекундах)
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                             cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (depth, int(self_time), int(cumulative))
+    return times
+
+
+def time_to_window(mode):
+    """
+    :param mode: 'lazy' | 'eager'
+    :return: float: Время от запуска процесса до отрисовки окна, с; None, если окно не создать
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', WINDOW_SCRIPT, mode], cwd=SRC_DIR,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    ready = process.stdout.readline().strip() == 'ready'
+    elapsed = time.perf_counter() - start
+    process.wait()
+    return elapsed if ready else None
+
+
+def main_benchmark(repeat):
+    times = import_times()
+    print(f'import main: {times["main"][2] / 1000:.1f} мс')
+    print(f'{"Импорт из main":40} {"накопл., мс":>12}')
+    direct = [(name, cumulative) for name, (depth, _, cumulative) in times.items() if depth == 1]
+    for name, cumulative in sorted(direct, key=lambda item: -item[1])[:10]:
+        print(f'{name:40} {cumulative / 1000:12.1f}')
+
+    loaded = subprocess.run([sys.executable, '-c', LOADED_SCRIPT], cwd=SRC_DIR,
+                            capture_output=True, text=True, check=True).stdout.split()
+    print(f'Тяжелые зависимости после import main: {", ".join(loaded) or "нет"}')
+
+    for mode, title in (('lazy', 'по требованию'), ('eager', 'как раньше')):
+        results = [time_to_window(mode) for _ in range(repeat)]
+        if None in results:
+            print('Окно создать не удалось (нет дисплея?), время до окна не измерено')
+            return
+        print(f'Время до окна ({title}): {min(results):.3f} с (лучшее из {repeat})')
+
+
+if __name__ == '__main__':
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,113 @@
+"""
+Рост памяти процесса (RSS) при многократном открытии и закрытии окна дерева FTA.
+
+Режимы:
+    cached  - схема не меняется, окно каждый раз получает ту же фигуру из кэша;
+    rebuild - перед каждым открытием схема меняется (внутреннее соединение добавляется
+              или удаляется), поэтому фигура строится заново, а прежняя должна освобождаться;
+    pyplot  - как раньше: фигура создается plt.figure и не закрывается после закрытия окна
+              (выполняется последним, так как оставляет фигуры в памяти).
+Перед каждым замером выполняются gc.collect и malloc_trim (если доступна glibc): иначе
+освобожденные растры Agg по несколько МБ остаются в куче процесса и RSS растет до плато,
+хотя живых фигур не прибавляется. Предупреждения о циклах в случайной схеме не показываются.
+Требуется дисплей.
+
+Запуск: python benchmarks/bench_tree_memory.py [число циклов] [число агрегатов]
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+import resource
+import sys
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import rca_fta
+from bench_point_lookup import build_scheme
+from graph_model import node_points
+from tree_view import TreeRenderer
+
+
+def rss_mb():
+    """
+    :return: float: Текущий RSS процесса в МБ после сборки мусора и возврата свободной памяти кучи
+             системе (без /proc - пиковый по getrusage)
+    """
+    gc.collect()
+    libc_name = ctypes.util.find_library('c')
+    if libc_name:
+        libc = ctypes.CDLL(libc_name)
+        if hasattr(libc, 'malloc_trim'):
+            libc.malloc_trim(0)
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def open_close(simulator):
+    simulator.build_fault_tree()
+    simulator.root.update()
+    rca_fta.close_tree_window(simulator, True, simulator.tree_windows[True])
+    simulator.root.update()
+
+
+def open_close_pyplot(simulator):
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    connections = simulator.get_internal_connections()
+    G, pos, node_colors, node_sizes = rca_fta.build_tree_base(simulator, connections, is_fta=True)
+    figure = plt.figure(figsize=(16, 12))
+    TreeRenderer(figure.add_axes([0, 0, 1, 1]), G, pos, node_colors, node_sizes)
+    window = tk.Toplevel(simulator.root)
+    canvas = FigureCanvasTkAgg(figure, master=window)
+    canvas.draw()
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    simulator.root.update()
+    window.destroy()
+    simulator.root.update()
+
+
+def run_mode(simulator, mode, cycles, toggle):
+    """
+    :param toggle: Внутреннее соединение (выходная точка, входная точка), переключаемое в режиме rebuild
+    """
+    step = open_close_pyplot if mode == 'pyplot' else open_close
+    step(simulator)
+    start = rss_mb()
+    samples = []
+    for cycle in range(1, cycles + 1):
+        if mode == 'rebuild':
+            if simulator.graph.has_connection(*toggle):
+                simulator.graph.remove_connection(*toggle)
+            else:
+                simulator.graph.add_connection(*toggle, internal=True)
+        step(simulator)
+        if cycle % max(1, cycles // 4) == 0 or cycle == cycles:
+            samples.append(f'{cycle}: {rss_mb() - start:+.1f}')
+    growth = rss_mb() - start
+    print(f'{mode:8} RSS в начале {start:7.1f} МБ, прирост {growth:+7.1f} МБ '
+          f'({growth / cycles * 1024:+.0f} КБ/цикл); {", ".join(samples)}')
+
+
+def main_benchmark(cycles, aggregates):
+    rca_fta.messagebox.showwarning = lambda *args, **kwargs: None
+    print(f'Циклов открытия/закрытия: {cycles}, агрегатов: {aggregates}')
+    simulator = build_scheme(aggregates)
+    aggregate = next(node for node in simulator.nodes if node.type == 'aggregate')
+    in_points, out_points = node_points(aggregate)
+    toggle = (out_points[0], in_points[0])
+    if simulator.graph.has_connection(*toggle):
+        simulator.graph.remove_connection(*toggle)
+
+    for mode in ('cached', 'rebuild', 'pyplot'):
+        run_mode(simulator, mode, cycles, toggle)
+    simulator.root.destroy()
+
+
+if __name__ == '__main__':
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+                   int(sys.argv[2]) if len(sys.argv) > 2 else 200)
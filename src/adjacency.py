@@ -0,0 +1,134 @@
+import numpy as np
+from reachability import label_graph
+
+
+class SparseAdjacency:
+    """
+    Разреженная матрица смежности в формате CSR.
+    Строка i содержит индексы точек, в которые ведут ребра из точки i (indices[indptr[i]:indptr[i + 1]]).
+    Занимает O(E) памяти вместо O(n^2) у плотной матрицы.
+    """
+    def __init__(self, point_labels, indptr, indices):
+        """
+        :param point_labels: Подписи точек в порядке строк матрицы
+        :param indptr: Массив смещений строк длиной n + 1
+        :param indices: Массив индексов столбцов ненулевых элементов
+        """
+        self.point_labels = point_labels
+        self.label_index = {label: idx for idx, label in enumerate(point_labels)}
+        self.indptr = indptr
+        self.indices = indices
+        self.shape = (len(point_labels), len(point_labels))
+
+    @classmethod
+    def from_successors(cls, point_labels, successors):
+        """
+        Строит матрицу по спискам преемников.
+        :param point_labels: Подписи точек
+        :param successors: Списки преемников, индексированные номером точки
+        """
+        indptr = np.zeros(len(successors) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in successors])
+        indices = np.fromiter((j for row in successors for j in sorted(row)),
+                              dtype=np.int32, count=int(indptr[-1]))
+        return cls(point_labels, indptr, indices)
+
+    @classmethod
+    def from_dense(cls, matrix, point_labels):
+        """
+        Строит разреженную матрицу по плотной.
+        :param matrix: Квадратная матрица numpy
+        :param point_labels: Подписи точек
+        """
+        rows, cols = np.nonzero(matrix)
+        indptr = np.zeros(len(point_labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(point_labels)), out=indptr[1:])
+        return cls(point_labels, indptr, cols.astype(np.int32))
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def row(self, i):
+        """
+        :return: np.ndarray: Индексы столбцов ненулевых элементов строки i
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def __getitem__(self, key):
+        i, j = key
+        row = self.row(i)
+        pos = np.searchsorted(row, j)
+        return 1.0 if pos < len(row) and row[pos] == j else 0.0
+
+    def successor_lists(self):
+        """
+        :return: list: Списки преемников для алгоритмов обхода графа
+        """
+        return [self.row(i).tolist() for i in range(self.shape[0])]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=self.shape[0])
+
+    def edge_list(self):
+        """
+        :return: list: Пары подписей (из_точки, в_точку) для всех ненулевых элементов
+        """
+        rows = np.repeat(np.arange(self.shape[0]), self.out_degree())
+        return [(self.point_labels[i], self.point_labels[j]) for i, j in zip(rows, self.indices)]
+
+    def toarray(self):
+        """
+        :return: np.ndarray: Плотная матрица float64, как у build_adjacency_matrix без sparse
+        """
+        matrix = np.zeros(self.shape)
+        rows = np.repeat(np.arange(self.shape[0]), self.out_degree())
+        matrix[rows, self.indices] = 1
+        return matrix
+
+    def to_scipy(self):
+        """
+        :return: scipy.sparse.csr_matrix с теми же данными (требуется scipy)
+        """
+        from scipy.sparse import csr_matrix
+        data = np.ones(self.nnz)
+        return csr_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+
+def build_adjacency(internal_connections, sparse=True):
+    """
+    Строит матрицу смежности по внутренним соединениям схемы.
+    :param internal_connections: Список кортежей (начальная_точка, конечная_точка)
+    :param sparse: True - SparseAdjacency, False - плотная матрица numpy
+    :return: tuple: (подписи точек, матрица)
+    """
+    point_labels, _, successors = label_graph(internal_connections)
+    adjacency = SparseAdjacency.from_successors(point_labels, successors)
+    if sparse:
+        return point_labels, adjacency
+    return point_labels, adjacency.toarray()
+
+
+def as_sparse(matrix, point_labels):
+    """
+    Приводит матрицу смежности любого формата к SparseAdjacency.
+    :param matrix: SparseAdjacency или плотная матрица numpy
+    :param point_labels: Подписи точек
+    """
+    if isinstance(matrix, SparseAdjacency):
+        return matrix
+    return SparseAdjacency.from_dense(matrix, point_labels)
+
+
+def adjacency_dataframe(matrix, point_labels):
+    """
+    Представляет матрицу смежности в виде DataFrame для экспорта.
+    :param matrix: SparseAdjacency или плотная матрица numpy
+    :param point_labels: Подписи точек
+    """
+    import pandas as pd
+    dense = matrix.toarray() if isinstance(matrix, SparseAdjacency) else matrix
+    return pd.DataFrame(dense, index=point_labels, columns=point_labels)
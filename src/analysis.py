@@ -1,142 +1,242 @@
 import tkinter as tk
 import numpy as np
-import pandas as pd
 from tkinter import ttk
-
-def build_adjacency_matrix(simulator):
-    internal_connections = simulator.get_internal_connections()
-
-    all_points = set()
-    for start, end in internal_connections:
-        all_points.add(start)
-        all_points.add(end)
-
-    point_labels = sorted(list(all_points))
+from incremental import incremental_analysis
+from metrics import METRIC_COLUMNS
+
+METRIC_TITLES = {
+    'I1': 'I1',
+    'I2': 'I2 (вниз)',
+    'upstream': 'Вверх',
+    'in_degree': 'Вход. связи',
+    'out_degree': 'Исх. связи',
+    'centrality': 'Степень',
+    'betweenness': 'Посредничество',
+    'influence': 'Влияние',
+    'dominated': 'Доминирует',
+}
+
+def build_adjacency_matrix(simulator, sparse=False):
+    """
+    Строит матрицу смежности точек схемы и сохраняет ее в simulator.adjacency_matrix.
+    Разреженная матрица берется из инкрементального анализа и перестраивается только после изменения схемы.
+    :param sparse: True - вернуть разреженную SparseAdjacency (O(E) памяти), False - плотную матрицу numpy
+    :return: Матрица смежности
+    """
+    point_labels, matrix = incremental_analysis(simulator).adjacency()
+    if not sparse:
+        matrix = matrix.toarray()
 
     simulator.point_labels = point_labels
-
-    size = len(point_labels)
-
-    matrix = np.zeros((size, size))
-
-    for start, end in internal_connections:
-        from_idx = point_labels.index(start)
-        to_idx = point_labels.index(end)
-        matrix[from_idx][to_idx] = 1
-
-    matrix = matrix.T
-
     simulator.adjacency_matrix = matrix
 
     return matrix
 
+class MatrixView:
+    """
+    Виртуализированный просмотр матрицы смежности.
+    На холсте рисуются только видимые ячейки, поэтому время открытия окна и память
+    не зависят от размера матрицы. Поддерживает прокрутку, масштаб и поиск строки/столбца.
+    """
+    header_size = 50
+
+    def __init__(self, master, adjacency, point_labels):
+        """
+        :param master: Родительское окно
+        :param adjacency: SparseAdjacency
+        :param point_labels: Подписи строк и столбцов
+        """
+        self.adjacency = adjacency
+        self.point_labels = point_labels
+        self.cell_size = 30
+        self.first_row = 0
+        self.first_col = 0
+        self.visible_rows = 0
+        self.visible_cols = 0
+        self.highlighted = None
+
+        toolbar = ttk.Frame(master)
+        toolbar.pack(fill='x', padx=5, pady=2)
+        ttk.Label(toolbar, text='Точка:').pack(side='left')
+        self.search_var = tk.StringVar()
+        entry = ttk.Entry(toolbar, textvariable=self.search_var, width=12)
+        entry.pack(side='left', padx=2)
+        entry.bind('<Return>', lambda e: self.find())
+        ttk.Button(toolbar, text='Найти', command=self.find).pack(side='left', padx=2)
+        ttk.Button(toolbar, text='+', width=3, command=lambda: self.zoom(1.25)).pack(side='left')
+        ttk.Button(toolbar, text='-', width=3, command=lambda: self.zoom(0.8)).pack(side='left')
+        self.status = ttk.Label(toolbar, text=f'{len(point_labels)} x {len(point_labels)}, связей: {adjacency.nnz}')
+        self.status.pack(side='left', padx=10)
+
+        frame = ttk.Frame(master)
+        frame.pack(expand=True, fill='both', padx=5, pady=5)
+        self.canvas = tk.Canvas(frame, bg='white', highlightthickness=0)
+        self.vsb = ttk.Scrollbar(frame, orient='vertical', command=self.yview)
+        self.hsb = ttk.Scrollbar(frame, orient='horizontal', command=self.xview)
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        self.vsb.grid(row=0, column=1, sticky='ns')
+        self.hsb.grid(row=1, column=0, sticky='ew')
+        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.canvas.bind('<Motion>', self.show_cell)
+        self.canvas.bind('<MouseWheel>', lambda e: self.yview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Shift-MouseWheel>', lambda e: self.xview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Control-MouseWheel>', lambda e: self.zoom(1.25 if e.delta > 0 else 0.8))
+        self.canvas.bind('<Button-4>', lambda e: self.yview('scroll', -1, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self.yview('scroll', 1, 'units'))
+
+    def _scroll(self, args, first, visible):
+        size = len(self.point_labels)
+        if args[0] == 'moveto':
+            new_first = int(float(args[1]) * size)
+        else:
+            step = int(args[1])
+            new_first = first + (step * max(1, visible - 1) if args[2] == 'pages' else step)
+        return max(0, min(new_first, size - visible))
+
+    def yview(self, *args):
+        self.first_row = self._scroll(args, self.first_row, self.visible_rows)
+        self.redraw()
+
+    def xview(self, *args):
+        self.first_col = self._scroll(args, self.first_col, self.visible_cols)
+        self.redraw()
+
+    def zoom(self, factor):
+        """
+        Изменяет размер ячеек.
+        :param factor: Множитель размера
+        """
+        self.cell_size = max(4, min(80, int(round(self.cell_size * factor))))
+        self.redraw()
+
+    def find(self):
+        """
+        Прокручивает матрицу к строке и столбцу точки, введенной в поле поиска, и выделяет их.
+        """
+        label = self.search_var.get().strip()
+        idx = self.adjacency.label_index.get(label)
+        if idx is None:
+            self.status.config(text=f'Точка {label} не найдена')
+            return
+        self.highlighted = idx
+        size = len(self.point_labels)
+        self.first_row = max(0, min(idx, size - self.visible_rows))
+        self.first_col = max(0, min(idx, size - self.visible_cols))
+        self.redraw()
+
+    def cell_at(self, x, y):
+        """
+        :return: tuple: (строка, столбец) ячейки под координатами холста или None
+        """
+        header = self.header_size
+        if x < header or y < header:
+            return None
+        row = self.first_row + int((y - header) // self.cell_size)
+        col = self.first_col + int((x - header) // self.cell_size)
+        if row >= len(self.point_labels) or col >= len(self.point_labels):
+            return None
+        return row, col
+
+    def show_cell(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell:
+            row, col = cell
+            self.status.config(text=f'{self.point_labels[row]} -> {self.point_labels[col]}: '
+                                    f'{int(self.adjacency[row, col])}')
+
+    def redraw(self):
+        """
+        Перерисовывает видимое окно матрицы.
+        """
+        canvas = self.canvas
+        canvas.delete('all')
+        size = len(self.point_labels)
+        header = self.header_size
+        cell = self.cell_size
+        width = max(canvas.winfo_width(), header)
+        height = max(canvas.winfo_height(), header)
+
+        self.visible_rows = min(size, (height - header) // cell + 1)
+        self.visible_cols = min(size, (width - header) // cell + 1)
+        self.first_row = max(0, min(self.first_row, size - self.visible_rows))
+        self.first_col = max(0, min(self.first_col, size - self.visible_cols))
+        rows = min(self.visible_rows, size - self.first_row)
+        cols = min(self.visible_cols, size - self.first_col)
+        show_text = cell >= 14
+        font = ('Arial', max(6, min(12, cell // 3)))
+
+        canvas.create_rectangle(header, header, header + cols * cell, header + rows * cell,
+                                fill='#FFB6C1', outline='')
+
+        last_col = self.first_col + cols
+        for k in range(rows):
+            i = self.first_row + k
+            row = self.adjacency.row(i)
+            lo, hi = np.searchsorted(row, [self.first_col, last_col])
+            y = header + k * cell
+            for j in row[lo:hi]:
+                x = header + (j - self.first_col) * cell
+                canvas.create_rectangle(x, y, x + cell, y + cell, fill='#90EE90', outline='')
+
+        for k in range(rows + 1):
+            y = header + k * cell
+            canvas.create_line(0, y, header + cols * cell, y, fill='#D3D3D3')
+        for k in range(cols + 1):
+            x = header + k * cell
+            canvas.create_line(x, 0, x, header + rows * cell, fill='#D3D3D3')
+
+        for k in range(rows):
+            i = self.first_row + k
+            y = header + k * cell
+            canvas.create_rectangle(0, y, header, y + cell, outline='black',
+                                    fill='khaki' if i == self.highlighted else 'lightgray')
+            if show_text:
+                canvas.create_text(header / 2, y + cell / 2, text=self.point_labels[i], font=font)
+        for k in range(cols):
+            j = self.first_col + k
+            x = header + k * cell
+            canvas.create_rectangle(x, 0, x + cell, header, outline='black',
+                                    fill='khaki' if j == self.highlighted else 'lightgray')
+            if show_text:
+                canvas.create_text(x + cell / 2, header / 2, text=self.point_labels[j], font=font)
+        canvas.create_rectangle(0, 0, header, header, fill='lightgray', outline='black')
+
+        if size:
+            self.vsb.set(self.first_row / size, (self.first_row + rows) / size)
+            self.hsb.set(self.first_col / size, (self.first_col + cols) / size)
+
+
 def show_adjacency_matrix(simulator):
     """
     Отображает матрицу смежности для текущей схемы сопряжения.
     Создает новое окно с визуализацией связей между точками.
     """
-
-    internal_connections = simulator.get_internal_connections()
-
-    all_points = set()
-    for start, end in internal_connections:
-        all_points.add(start)
-        all_points.add(end)
-
-    point_labels = sorted(list(all_points))
-
-    matrix = build_adjacency_matrix(simulator)
-
-    df = pd.DataFrame(matrix,
-                      index=point_labels,
-                      columns=point_labels)
+    matrix = build_adjacency_matrix(simulator, sparse=True)
 
     matrix_window = tk.Toplevel(simulator.root)
     matrix_window.title("Матрица смежности")
+    matrix_window.geometry("800x700")
 
-    frame = ttk.Frame(matrix_window)
-    frame.pack(expand=True, fill='both', padx=5, pady=5)
-
-    for j, label in enumerate(point_labels, start=1):
-        cell = tk.Label(frame, text=label, borderwidth=1, relief="solid",
-                        width=6, height=2, bg='lightgray')
-        cell.grid(row=0, column=j, sticky='nsew')
+    MatrixView(matrix_window, matrix, simulator.point_labels)
 
-    for i, row_label in enumerate(point_labels, start=1):
-        row_header = tk.Label(frame, text=row_label, borderwidth=1, relief="solid",
-                              width=6, height=2, bg='lightgray')
-        row_header.grid(row=i, column=0, sticky='nsew')
+def format_metric(value):
+    return f'{value:.4g}' if isinstance(value, float) else value
 
-        for j, col_label in enumerate(point_labels, start=1):
-            value = df.iloc[i - 1, j - 1]
-            bg_color = '#90EE90' if value == 1 else '#FFB6C1'
-            cell = tk.Label(frame, borderwidth=1, relief="solid",
-                            width=6, height=2, bg=bg_color,
-                            highlightbackground='#D3D3D3', highlightthickness=1)
-            cell.grid(row=i, column=j, sticky='nsew')
 
-    for i in range(len(point_labels) + 1):
-        frame.grid_columnconfigure(i, weight=1)
-        frame.grid_rowconfigure(i, weight=1)
-
-    canvas = tk.Canvas(matrix_window)
-
-    canvas.pack(side='left', fill='both', expand=True)
-    
 def build_analysis_table(simulator):
     """
-    Создает таблицу анализа схемы с метриками I1, I2 и степенью центральности для каждой точки.
-    TODO: исправить логику поиска вершин, некорректно ищет для i1 i2
+    Создает таблицу анализа схемы с метриками I1, I2, степенью центральности, посредничеством,
+    влиянием и критичностью по дереву доминаторов для каждой точки.
     """
-    build_adjacency_matrix(simulator)
-
-    point_labels = simulator.point_labels
-    size = len(point_labels)
-
-    output_points = []
-    for item in simulator.canvas.find_all():
-        tags = simulator.canvas.gettags(item)
-        for tag in tags:
-            if tag.startswith('in_') and not tag.endswith('text'):
-                _, point_id = tag.split('_')
-                node = simulator.get_node_by_point(point_id)
-                if node and node.type == "output":
-                    output_points.append(simulator.get_point_text(point_id, 'in'))
-
-    print(output_points)
-
-    output_indices = [point_labels.index(point) for point in output_points if point in point_labels]
-
-    metrics = []
-    for i, point in enumerate(point_labels):
-        reachable = np.zeros(size, dtype=int)
-        current_matrix = simulator.adjacency_matrix.copy()
-
-        for power in range(1, size + 1):
-            reachable = reachable | (current_matrix[i] > 0)
-            current_matrix = np.matmul(current_matrix, simulator.adjacency_matrix)
-
-        i1_value = sum(1 for j in output_indices if reachable[j])
-
-        i2_value = np.sum(reachable)
-
-        outgoing_connections = np.sum(simulator.adjacency_matrix[i] > 0)
-
-        transposed_matrix = simulator.adjacency_matrix.T
-        incoming_connections = np.sum(transposed_matrix[i] > 0)
-
-        centrality = outgoing_connections + incoming_connections
-
-        metrics.append({
-            'point': point,
-            'I1': i1_value,
-            'I2': i2_value,
-            'centrality': centrality  
-        })
+    build_adjacency_matrix(simulator, sparse=True)
+    metrics = incremental_analysis(simulator).importance_table()
 
     table_window = tk.Toplevel(simulator.root)
     table_window.title("Таблица анализа схемы")
-    table_window.geometry("600x800")
+    table_window.geometry("1000x800")
 
     frame = tk.Frame(table_window)
     frame.pack(fill=tk.BOTH, expand=True)
@@ -150,19 +250,91 @@ def build_analysis_table(simulator):
     vsb.config(command=table.yview)
     hsb.config(command=table.xview)
 
-    table['columns'] = ('I1', 'I2', 'centrality')
-    table.column('#0', width=150, minwidth=100)
-    table.column('I1', width=100, minwidth=50, anchor=tk.CENTER)
-    table.column('I2', width=100, minwidth=50, anchor=tk.CENTER)
-    table.column('centrality', width=150, minwidth=100, anchor=tk.CENTER)
-
+    table['columns'] = METRIC_COLUMNS
+    table.column('#0', width=100, minwidth=60)
     table.heading('#0', text='Точка', anchor=tk.CENTER)
-    table.heading('I1', text='I1', anchor=tk.CENTER)
-    table.heading('I2', text='I2', anchor=tk.CENTER)
-    table.heading('centrality', text='Степень центральности', anchor=tk.CENTER)
+    for column in METRIC_COLUMNS:
+        table.column(column, width=90, minwidth=50, anchor=tk.CENTER)
+        table.heading(column, text=METRIC_TITLES[column], anchor=tk.CENTER)
 
     for metric in metrics:
         table.insert('', tk.END, text=metric['point'],
-                     values=(metric['I1'], metric['I2'], metric['centrality']))
+                     values=[format_metric(metric[column]) for column in METRIC_COLUMNS])
 
-    table.pack(fill=tk.BOTH, expand=True)
\ No newline at end of file
+    table.pack(fill=tk.BOTH, expand=True)
+
+class MetricsPanel:
+    """
+    Окно с мерами важности точек, обновляемое после каждого изменения схемы.
+    Показывает меры, которые инкрементальный анализ поддерживает без полного пересчета:
+    I1, I2, число источников и степени точек.
+    """
+    columns = ('I1', 'I2', 'upstream', 'in_degree', 'out_degree', 'centrality')
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.refresh_job = None
+
+        self.window = tk.Toplevel(simulator.root)
+        self.window.title("Панель метрик")
+        self.window.geometry("650x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.summary = ttk.Label(self.window)
+        self.summary.pack(fill='x', padx=5, pady=2)
+
+        frame = tk.Frame(self.window)
+        frame.pack(fill=tk.BOTH, expand=True)
+        vsb = tk.Scrollbar(frame, orient="vertical")
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.table = ttk.Treeview(frame, yscrollcommand=vsb.set)
+        vsb.config(command=self.table.yview)
+        self.table['columns'] = self.columns
+        self.table.column('#0', width=80, minwidth=60)
+        self.table.heading('#0', text='Точка', anchor=tk.CENTER)
+        for column in self.columns:
+            self.table.column(column, width=90, minwidth=50, anchor=tk.CENTER)
+            self.table.heading(column, text=METRIC_TITLES[column], anchor=tk.CENTER)
+        self.table.pack(fill=tk.BOTH, expand=True)
+
+        self.refresh()
+
+    def schedule_refresh(self):
+        """
+        Откладывает обновление до освобождения Tk, объединяя серию изменений схемы.
+        """
+        if self.refresh_job is None:
+            self.refresh_job = self.simulator.root.after_idle(self.refresh)
+
+    def refresh(self):
+        self.refresh_job = None
+        analysis = incremental_analysis(self.simulator)
+        metrics = analysis.importance_table(structural=False)
+
+        self.table.delete(*self.table.get_children())
+        for metric in metrics:
+            self.table.insert('', tk.END, text=metric['point'],
+                              values=[metric[column] for column in self.columns])
+
+        critical = max(metrics, key=lambda metric: (metric['I1'], metric['I2']), default=None)
+        summary = f"Точек: {len(metrics)}, связей: {len(analysis.edge_count)}"
+        if critical is not None:
+            summary += f", наибольшее влияние на выходы: {critical['point']} (I1 = {critical['I1']})"
+        self.summary.config(text=summary)
+
+    def close(self):
+        if self.refresh_job is not None:
+            self.simulator.root.after_cancel(self.refresh_job)
+        self.simulator.metrics_panel = None
+        self.window.destroy()
+
+
+def show_metrics_panel(simulator):
+    """
+    Открывает панель метрик или поднимает уже открытую.
+    """
+    if simulator.metrics_panel is not None:
+        simulator.metrics_panel.window.lift()
+        return
+    simulator.metrics_panel = MetricsPanel(simulator)
@@ -0,0 +1,279 @@
+from fault_tree import SYSTEM_EVENT
+from reachability import strongly_connected_components
+
+FALSE = 0
+TRUE = 1
+ORDER_HEURISTICS = ('dfs', 'fanout', 'index')
+
+
+class BDD:
+    """
+    Упорядоченная сокращенная диаграмма двоичных решений (ROBDD).
+    Узлы хранятся в массивах level/low/high; уникальная таблица гарантирует каноничность,
+    таблица вычисленных результатов исключает повторные операции над одной парой узлов.
+    Узлы 0 и 1 - терминальные. Дочерние узлы всегда создаются раньше родителя,
+    поэтому порядок номеров узлов топологический.
+    """
+    def __init__(self, levels):
+        """
+        :param levels: Число переменных
+        """
+        self.levels = levels
+        self.level = [levels, levels]
+        self.low = [FALSE, TRUE]
+        self.high = [FALSE, TRUE]
+        self.unique = {}
+        self.computed = {}
+
+    def make(self, level, low, high):
+        """
+        Возвращает узел (level, low, high), создавая его только при отсутствии в уникальной таблице.
+        """
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = node
+        return node
+
+    def variable(self, level):
+        """
+        :return: Узел функции, равной переменной уровня level
+        """
+        return self.make(level, FALSE, TRUE)
+
+    def _terminal(self, op, f, g):
+        if op == 'and':
+            if f == FALSE or g == FALSE:
+                return FALSE
+            if f == TRUE:
+                return g
+            if g == TRUE or f == g:
+                return f
+        else:
+            if f == TRUE or g == TRUE:
+                return TRUE
+            if f == FALSE:
+                return g
+            if g == FALSE or f == g:
+                return f
+        return None
+
+    def apply(self, op, f, g):
+        """
+        Применяет операцию 'and' | 'or' к двум диаграммам.
+        Рекурсия Шеннона развернута в явный стек, поэтому глубина не ограничена стеком вызовов.
+        """
+        values = []
+        stack = [(f, g, None)]
+        while stack:
+            f, g, frame = stack.pop()
+            if frame is not None:
+                high = values.pop()
+                low = values.pop()
+                key, level = frame
+                node = self.make(level, low, high)
+                self.computed[key] = node
+                values.append(node)
+                continue
+
+            result = self._terminal(op, f, g)
+            if result is not None:
+                values.append(result)
+                continue
+            key = (op, f, g) if f < g else (op, g, f)
+            result = self.computed.get(key)
+            if result is not None:
+                values.append(result)
+                continue
+
+            level = min(self.level[f], self.level[g])
+            f_low, f_high = (self.low[f], self.high[f]) if self.level[f] == level else (f, f)
+            g_low, g_high = (self.low[g], self.high[g]) if self.level[g] == level else (g, g)
+            stack.append((None, None, (key, level)))
+            stack.append((f_high, g_high, None))
+            stack.append((f_low, g_low, None))
+        return values[-1]
+
+    def reachable(self, root):
+        """
+        :return: list: Номера нетерминальных узлов, достижимых из root, по возрастанию
+        """
+        seen = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in seen:
+                continue
+            seen.add(node)
+            stack.append(self.low[node])
+            stack.append(self.high[node])
+        return sorted(seen)
+
+    def probability(self, root, level_p):
+        """
+        Точная вероятность того, что функция равна 1, при независимых переменных.
+        :param root: Корень диаграммы
+        :param level_p: Вероятности переменных по уровням
+        :return: float
+        """
+        return self._probabilities(root, level_p)[root]
+
+    def _probabilities(self, root, level_p):
+        values = {FALSE: 0.0, TRUE: 1.0}
+        for node in self.reachable(root):
+            p = level_p[self.level[node]]
+            values[node] = p * values[self.high[node]] + (1 - p) * values[self.low[node]]
+        return values
+
+    def birnbaum(self, root, level_p):
+        """
+        Важность Бирнбаума каждой переменной: P(f | x = 1) - P(f | x = 0) = dP(f) / dp(x).
+        Вычисляется за один прямой и один обратный проход по узлам диаграммы.
+        :param root: Корень диаграммы
+        :param level_p: Вероятности переменных по уровням
+        :return: list: Важность по уровням
+        """
+        values = self._probabilities(root, level_p)
+        importance = [0.0] * self.levels
+        if root <= TRUE:
+            return importance
+
+        reach_probability = {root: 1.0}
+        for node in reversed(self.reachable(root)):
+            weight = reach_probability.get(node, 0.0)
+            level = self.level[node]
+            p = level_p[level]
+            low, high = self.low[node], self.high[node]
+            importance[level] += weight * (values[high] - values[low])
+            reach_probability[high] = reach_probability.get(high, 0.0) + weight * p
+            reach_probability[low] = reach_probability.get(low, 0.0) + weight * (1 - p)
+        return importance
+
+
+def variable_order(fault_tree, tops, heuristic='dfs'):
+    """
+    Выбирает порядок переменных диаграммы для базовых событий дерева отказов.
+    'dfs' - порядок первого посещения при обходе в глубину от головных событий (события одной ветви рядом);
+    'fanout' - сначала события, от которых зависит больше всего точек;
+    'index' - порядок подписей точек.
+    :param fault_tree: FaultTree
+    :param tops: Подписи головных точек
+    :param heuristic: Эвристика упорядочивания
+    :return: list: Номера базовых событий в порядке уровней
+    """
+    size = len(fault_tree.labels)
+    if heuristic == 'index':
+        return list(range(size))
+    if heuristic == 'fanout':
+        dependents = [0] * size
+        for dependencies in fault_tree.dependencies:
+            for dependency in dependencies:
+                dependents[dependency] += 1
+        return sorted(range(size), key=lambda idx: -dependents[idx])
+    if heuristic != 'dfs':
+        raise ValueError(f"Неизвестная эвристика порядка переменных: {heuristic}")
+
+    order = []
+    visited = [False] * size
+    starts = [fault_tree.label_index[top] for top in tops if top in fault_tree.label_index]
+    for start in starts + list(range(size)):
+        if visited[start]:
+            continue
+        stack = [start]
+        while stack:
+            idx = stack.pop()
+            if visited[idx]:
+                continue
+            visited[idx] = True
+            order.append(idx)
+            stack.extend(reversed(fault_tree.dependencies[idx]))
+    return order
+
+
+class FaultTreeBDD:
+    """
+    Функция структуры дерева отказов FaultTree в виде BDD.
+    Дает точную вероятность головного события и важность Бирнбаума всех точек без перебора сечений.
+    """
+    def __init__(self, fault_tree, tops=(), heuristic='dfs'):
+        """
+        :param fault_tree: FaultTree
+        :param tops: Головные точки, определяющие порядок переменных
+        :param heuristic: Эвристика порядка переменных ('dfs', 'fanout', 'index')
+        """
+        self.fault_tree = fault_tree
+        self.order = variable_order(fault_tree, tops, heuristic)
+        self.level_of = [0] * len(self.order)
+        for level, idx in enumerate(self.order):
+            self.level_of[idx] = level
+        self.bdd = BDD(len(self.order))
+        self.events = self._build_events()
+
+    def _build_events(self):
+        fault_tree = self.fault_tree
+        bdd = self.bdd
+        gate = fault_tree.gate
+        events = [FALSE] * len(fault_tree.labels)
+        _, components = strongly_connected_components(fault_tree.dependencies)
+
+        def evaluate(idx):
+            dependencies = fault_tree.dependencies[idx]
+            gate_event = FALSE
+            if dependencies:
+                gate_event = events[dependencies[0]]
+                for dependency in dependencies[1:]:
+                    gate_event = bdd.apply(gate, gate_event, events[dependency])
+            return bdd.apply('or', bdd.variable(self.level_of[idx]), gate_event)
+
+        for members in components:
+            changed = True
+            while changed:
+                changed = False
+                for idx in members:
+                    event = evaluate(idx)
+                    if event != events[idx]:
+                        events[idx] = event
+                        changed = True
+                if len(members) == 1 and members[0] not in fault_tree.dependencies[members[0]]:
+                    break
+        return events
+
+    def top(self, top):
+        """
+        :param top: Подпись точки или SYSTEM_EVENT
+        :return: Корень диаграммы головного события
+        """
+        fault_tree = self.fault_tree
+        if top == SYSTEM_EVENT:
+            root = FALSE
+            for label in fault_tree.roots:
+                root = self.bdd.apply('or', root, self.events[fault_tree.label_index[label]])
+            return root
+        idx = fault_tree.label_index.get(top)
+        return self.events[idx] if idx is not None else FALSE
+
+    def _level_probabilities(self, p):
+        return [p[idx] for idx in self.order]
+
+    def probability(self, top, p):
+        """
+        :param top: Подпись точки или SYSTEM_EVENT
+        :param p: Вероятности базовых событий (FaultTree.probability_vector)
+        :return: float: Точная вероятность головного события
+        """
+        return self.bdd.probability(self.top(top), self._level_probabilities(p))
+
+    def birnbaum(self, top, p):
+        """
+        :param top: Подпись точки или SYSTEM_EVENT
+        :param p: Вероятности базовых событий (FaultTree.probability_vector)
+        :return: dict: Точка -> важность Бирнбаума
+        """
+        importance = self.bdd.birnbaum(self.top(top), self._level_probabilities(p))
+        return {self.fault_tree.labels[idx]: importance[level] for level, idx in enumerate(self.order)}
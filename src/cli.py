@@ -0,0 +1,230 @@
+"""
+Пакетный анализ схем сопряжения без графического интерфейса.
+
+Загружает сохраненные схемы (JSON или .npz) и записывает результаты анализа в CSV, JSON или Parquet.
+Модули Tk и matplotlib не импортируются, поэтому запуск возможен на сервере без дисплея.
+
+Запуск: python src/cli.py схема.json [схема2.npz ...] -o results --format csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from adjacency import build_adjacency
+from metrics import importance_table
+from propagation import single_points_of_failure, sweep_failures
+from scheme_io import load_scheme
+
+ANALYSES = ('propagation', 'spof', 'adjacency', 'importance', 'fta', 'rca')
+FORMATS = ('csv', 'json', 'parquet')
+
+
+def node_label(node):
+    """
+    :return: str: Подпись элемента в виде "тип номер", например "aggregate 3"
+    """
+    return f'{node.type} {node.typeid}'
+
+
+def propagation_rows(graph):
+    """
+    Результаты перебора одиночных отказов выходных точек схемы.
+    :param graph: SchemeGraph
+    :return: list: Словари с ключами point, node, points, edges, nodes, outputs
+    """
+    return [{
+        'point': row['point'],
+        'node': node_label(row['node']),
+        'points': row['points'],
+        'edges': row['edges'],
+        'nodes': row['nodes'],
+        'outputs': ' '.join(str(node.typeid) for node in row['outputs']),
+    } for row in sweep_failures(graph)]
+
+
+def spof_rows(graph):
+    """
+    Единичные точки отказа каждого выхода схемы.
+    :param graph: SchemeGraph
+    :return: list: Словари с ключами output, point, connected, count, spof
+    """
+    return [{
+        'output': row['output'].typeid,
+        'point': row['point'],
+        'connected': row['connected'],
+        'count': len(row['spof']),
+        'spof': ' '.join(row['spof']),
+    } for row in single_points_of_failure(graph)]
+
+
+def adjacency_rows(graph):
+    """
+    Матрица смежности точек в виде списка ненулевых элементов.
+    :param graph: SchemeGraph
+    :return: list: Словари с ключами source, target
+    """
+    point_labels, adjacency = build_adjacency(graph.internal_connections(), sparse=True)
+    return [{'source': point_labels[i], 'target': point_labels[j]}
+            for i, successors in enumerate(adjacency.successor_lists()) for j in successors]
+
+
+def importance_rows(graph):
+    """
+    Таблица мер важности I1, I2 и степени центральности точек.
+    :param graph: SchemeGraph
+    """
+    point_labels, adjacency = build_adjacency(graph.internal_connections(), sparse=True)
+    return importance_table(point_labels, adjacency, graph.output_labels())
+
+
+def tree_rows(graph, is_fta):
+    """
+    Структура дерева FTA или RCA: узлы с уровнями, координатами, цветами, размерами и номером
+    цикла схемы, в который входит узел, и ребра.
+    :param graph: SchemeGraph
+    :param is_fta: True для FTA, False для RCA
+    :return: tuple: (строки узлов, строки ребер)
+    """
+    from trees import build_tree_structure
+
+    G, pos, node_colors, node_sizes = build_tree_structure(graph, graph.internal_connections(), is_fta)
+    if G is None:
+        return [], []
+    cycle_of = {node: number for number, cycle in enumerate(G.graph['cycles'], 1) for node in cycle}
+    nodes = [{
+        'node': str(node),
+        'level': G.graph['levels'][node],
+        'x': pos[node][0],
+        'y': pos[node][1],
+        'color': color,
+        'size': size,
+        'cycle': cycle_of.get(node, ''),
+    } for node, color, size in zip(G.nodes(), node_colors, node_sizes)]
+    edges = [{'source': str(start), 'target': str(end)} for start, end in G.edges()]
+    return nodes, edges
+
+
+def analyze_scheme(graph, analyses=ANALYSES):
+    """
+    Выполняет выбранные виды анализа схемы.
+    :param graph: SchemeGraph
+    :param analyses: Названия видов анализа из ANALYSES
+    :return: dict: Имя таблицы -> список строк (словарей)
+    """
+    tables = {}
+    for analysis in analyses:
+        if analysis == 'propagation':
+            tables['propagation'] = propagation_rows(graph)
+        elif analysis == 'spof':
+            tables['spof'] = spof_rows(graph)
+        elif analysis == 'adjacency':
+            tables['adjacency'] = adjacency_rows(graph)
+        elif analysis == 'importance':
+            tables['importance'] = importance_rows(graph)
+        elif analysis in ('fta', 'rca'):
+            nodes, edges = tree_rows(graph, analysis == 'fta')
+            tables[f'{analysis}_nodes'] = nodes
+            tables[f'{analysis}_edges'] = edges
+    return tables
+
+
+def write_table(path, rows, output_format):
+    """
+    Записывает таблицу в файл.
+    :param path: Путь к файлу без расширения
+    :param rows: Список словарей с одинаковыми ключами
+    :param output_format: 'csv' | 'json' | 'parquet'
+    :return: str: Путь к записанному файлу
+    """
+    path = f'{path}.{output_format}'
+    if output_format == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            if rows:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+    elif output_format == 'json':
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(rows, file, ensure_ascii=False, indent=1)
+    elif output_format == 'parquet':
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Неизвестный формат: {output_format}")
+    return path
+
+
+def scheme_output_dirs(scheme_paths, output_dir):
+    """
+    Каталоги результатов схем: output_dir/<имя файла схемы с расширением>. Если в пакете есть файлы
+    с одинаковым именем из разных каталогов, к имени добавляется номер (-2, -3, ...), чтобы
+    результаты одной схемы не перезаписывали результаты другой.
+    :param scheme_paths: Пути к файлам схем
+    :param output_dir: Каталог результатов
+    :return: list: Каталоги в порядке схем
+    """
+    used = set()
+    dirs = []
+    for scheme_path in scheme_paths:
+        base = name = os.path.basename(os.path.normpath(scheme_path))
+        number = 1
+        while name.lower() in used:
+            number += 1
+            name = f'{base}-{number}'
+        used.add(name.lower())
+        dirs.append(os.path.join(output_dir, name))
+    return dirs
+
+
+def write_scheme_results(scheme_path, scheme_dir, output_format='csv', analyses=ANALYSES):
+    """
+    Анализирует одну схему и записывает таблицы в scheme_dir/<таблица>.<формат>.
+    :return: list: Пути к записанным файлам
+    """
+    graph = load_scheme(scheme_path).build_graph()
+    os.makedirs(scheme_dir, exist_ok=True)
+    return [write_table(os.path.join(scheme_dir, name), rows, output_format)
+            for name, rows in analyze_scheme(graph, analyses).items()]
+
+
+def run(scheme_paths, output_dir, output_format='csv', analyses=ANALYSES):
+    """
+    Анализирует схемы и записывает результаты в каталоги scheme_output_dirs.
+    :param scheme_paths: Пути к файлам схем
+    :param output_dir: Каталог результатов
+    :param output_format: 'csv' | 'json' | 'parquet'
+    :param analyses: Названия видов анализа из ANALYSES
+    :return: list: Пути к записанным файлам
+    """
+    written = []
+    for scheme_path, scheme_dir in zip(scheme_paths, scheme_output_dirs(scheme_paths, output_dir)):
+        written.extend(write_scheme_results(scheme_path, scheme_dir, output_format, analyses))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетный анализ схем сопряжения без графического интерфейса')
+    parser.add_argument('schemes', nargs='+', help='Файлы схем (.json или .npz)')
+    parser.add_argument('-o', '--output', default='results', help='Каталог результатов')
+    parser.add_argument('-f', '--format', choices=FORMATS, default='csv', help='Формат таблиц')
+    parser.add_argument('-a', '--analysis', choices=ANALYSES, action='append',
+                        help='Вид анализа (можно указать несколько раз); по умолчанию - все')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for scheme_path, scheme_dir in zip(args.schemes, scheme_output_dirs(args.schemes, args.output)):
+        try:
+            written = write_scheme_results(scheme_path, scheme_dir, args.format, args.analysis or ANALYSES)
+        except ImportError as error:
+            parser.error(f'формат {args.format} недоступен: {error}')
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            print(f'{scheme_path}: {error}', file=sys.stderr)
+            failed += 1
+            continue
+        print(f'{scheme_path}: записано файлов: {len(written)} в {scheme_dir}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
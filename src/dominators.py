@@ -0,0 +1,159 @@
+def immediate_dominators(successors, root):
+    """
+    Строит дерево доминаторов алгоритмом Ленгауэра - Тарьяна со сбалансированными деревьями
+    link/eval, O(E α(E, V)).
+    Вершина d доминирует над v, если любой путь из root в v проходит через d.
+    :param successors: Списки преемников вершин
+    :param root: Начальная вершина
+    :return: list: Непосредственный доминатор каждой вершины; у root - сама root,
+             у недостижимых из root вершин - None
+    """
+    # Вершины нумеруются в порядке обхода в глубину с 1; номер 0 - фиктивная пустая вершина.
+    vertex = [None]
+    number = {root: 1}
+    parent = [0, 0]
+    vertex.append(root)
+    work = [(root, 0)]
+    while work:
+        current, child = work[-1]
+        current_successors = successors[current]
+        while child < len(current_successors):
+            following = current_successors[child]
+            child += 1
+            if following not in number:
+                work[-1] = (current, child)
+                number[following] = len(vertex)
+                vertex.append(following)
+                parent.append(number[current])
+                work.append((following, 0))
+                break
+        else:
+            work.pop()
+
+    size = len(vertex)
+    predecessors = [[] for _ in range(size)]
+    for v in range(1, size):
+        for following in successors[vertex[v]]:
+            predecessors[number[following]].append(v)
+
+    semi = list(range(size))
+    label = list(range(size))
+    ancestor = [0] * size
+    child = [0] * size
+    subtree = [1] * size
+    subtree[0] = 0
+    dom = [0] * size
+    bucket = [[] for _ in range(size)]
+
+    def compress(v):
+        chain = []
+        while ancestor[ancestor[v]] != 0:
+            chain.append(v)
+            v = ancestor[v]
+        while chain:
+            v = chain.pop()
+            a = ancestor[v]
+            if semi[label[a]] < semi[label[v]]:
+                label[v] = label[a]
+            ancestor[v] = ancestor[a]
+
+    def evaluate(v):
+        if ancestor[v] == 0:
+            return label[v]
+        compress(v)
+        if semi[label[ancestor[v]]] >= semi[label[v]]:
+            return label[v]
+        return label[ancestor[v]]
+
+    def link(v, w):
+        s = w
+        while semi[label[w]] < semi[label[child[s]]]:
+            if subtree[s] + subtree[child[child[s]]] >= 2 * subtree[child[s]]:
+                ancestor[child[s]] = s
+                child[s] = child[child[s]]
+            else:
+                subtree[child[s]] = subtree[s]
+                ancestor[s] = child[s]
+                s = child[s]
+        label[s] = label[w]
+        subtree[v] += subtree[w]
+        if subtree[v] < 2 * subtree[w]:
+            s, child[v] = child[v], s
+        while s != 0:
+            ancestor[s] = v
+            s = child[s]
+
+    for w in range(size - 1, 1, -1):
+        for v in predecessors[w]:
+            u = evaluate(v)
+            if semi[u] < semi[w]:
+                semi[w] = semi[u]
+        bucket[semi[w]].append(w)
+        link(parent[w], w)
+        for v in bucket[parent[w]]:
+            u = evaluate(v)
+            dom[v] = u if semi[u] < semi[v] else parent[w]
+        bucket[parent[w]] = []
+
+    for w in range(2, size):
+        if dom[w] != semi[w]:
+            dom[w] = dom[dom[w]]
+
+    idom = [None] * len(successors)
+    idom[root] = root
+    for w in range(2, size):
+        idom[vertex[w]] = vertex[dom[w]]
+    return idom
+
+
+def source_dominators(successors, sources):
+    """
+    Строит дерево доминаторов от множества источников: к графу добавляется фиктивный корень
+    с ребрами во все источники, его номер равен len(successors).
+    :param successors: Списки преемников вершин
+    :param sources: Вершины-источники (например, точки входов схемы)
+    :return: list: Непосредственные доминаторы вершин графа с корнем; вершины, у которых
+             непосредственный доминатор - фиктивный корень, не зависят ни от одной вершины графа
+    """
+    root = len(successors)
+    return immediate_dominators(list(successors) + [list(sources)], root)
+
+
+def dominated_counts(idom, root):
+    """
+    Считает для каждой вершины число вершин, над которыми она доминирует (без нее самой),
+    т.е. число вершин, отрезанных от корня при ее отказе.
+    :param idom: Результат immediate_dominators
+    :param root: Корень дерева доминаторов
+    :return: list: Размеры поддеревьев дерева доминаторов минус один; 0 для недостижимых вершин
+    """
+    children = [[] for _ in idom]
+    for v, d in enumerate(idom):
+        if d is not None and v != root:
+            children[d].append(v)
+
+    order = [root]
+    for v in order:
+        order.extend(children[v])
+
+    counts = [0] * len(idom)
+    for v in reversed(order):
+        if v != root:
+            counts[idom[v]] += counts[v] + 1
+    return counts
+
+
+def dominator_chain(idom, vertex, root):
+    """
+    :return: list: Строгие доминаторы вершины от ближайшего к корню, без самой вершины и корня;
+             пустой список для недостижимой вершины
+    """
+    chain = []
+    if idom[vertex] is None:
+        return chain
+    current = idom[vertex]
+    while current != root:
+        chain.append(current)
+        current = idom[current]
+    chain.reverse()
+    return chain
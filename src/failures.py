@@ -1,104 +1,78 @@
-def mark_failed_elements(simulator, point_id):
+import threading
+import tkinter as tk
+from tkinter import messagebox, simpledialog, ttk
+from propagation import propagate_failure, single_points_of_failure, sweep_failures
+from reachability import label_graph
+
+MONTE_CARLO_POLL = 100
+
+
+def mark_failed_elements(simulator, point_id, kind=None):
     """
     Помечает элементы тегом failed, обозначающим отказ данного элемента системы.
     После выбора изначальной отказавшей точки проверяет распространение отказов.
     :param point_id: ID изначальной отказавшей точки
+    :param kind: 'in' | 'out' - тип точки; если не задан, определяется по графу схемы
+    :return: FailureSet: Отказавшие точки, соединения и элементы
     """
-    if point_id in simulator.visited_points:
-        return
-    simulator.visited_points.add(point_id)
-
-    node = simulator.get_node_by_point(point_id)
-    if node:
-        node_items = simulator.canvas.find_withtag(f'node_{node.id}')
-        for item in node_items:
-            simulator.canvas.addtag_withtag('failed', item)
-
-    current_point_type = 'in' if simulator.canvas.find_withtag(f'in_{point_id}') else 'out'
-
-    node = simulator.get_node_by_point(point_id)
-
-    if current_point_type == 'in':
-        for conn in simulator.connections:
-            start, end = conn
-            if end == point_id:
-                internal_items = simulator.canvas.find_withtag(f'internal_conn_in_{node.id}_{start}_{end}')
-                if internal_items:
-                    for item in internal_items:
-                        simulator.canvas.addtag_withtag('failed', item)
-                    out_items = simulator.canvas.find_withtag(f'out_{start}')
-                    for item in out_items:
-                        simulator.canvas.addtag_withtag('failed', item)
-                    simulator.mark_failed_elements(start)
-                else:
-                    conn_items = simulator.canvas.find_withtag(f'conn_{start}_{end}')
-                    if conn_items:
-                        for item in conn_items:
-                            simulator.canvas.addtag_withtag('failed', item)
-                        out_items = simulator.canvas.find_withtag(f'out_{start}')
-                        for item in out_items:
-                            simulator.canvas.addtag_withtag('failed', item)
-                        simulator.mark_failed_elements(start)
-
-    else:
-        if node.type == 'aggregate':
-            for conn in simulator.connections:
-                if conn[0] == point_id:
-                    conn_items = simulator.canvas.find_withtag(f'conn_{conn[0]}_{conn[1]}')
-                    if conn_items:
-                        for item in conn_items:
-                            simulator.canvas.addtag_withtag('failed', item)
-                        connected_point = conn[1]
-                        point_items = simulator.canvas.find_withtag(f'in_{connected_point}')
-                        for item in point_items:
-                            simulator.canvas.addtag_withtag('failed', item)
-                        simulator.mark_failed_elements(connected_point)
-        else:
-            node_items = simulator.canvas.find_withtag(f'node_{node.id}')
-            for item in node_items:
-                simulator.canvas.addtag_withtag('failed', item)
+    graph = simulator.graph
+    failure = propagate_failure(graph, point_id, kind or graph.point_kind(point_id))
+    tag_failed_elements(simulator, failure)
+    simulator.failed_points = failure.points
+    simulator.failure = failure
+    return failure
 
-            for conn in simulator.connections:
-                if conn[0] == point_id:
-                    conn_items = simulator.canvas.find_withtag(f'conn_{conn[0]}_{conn[1]}')
-                    for item in conn_items:
-                        simulator.canvas.addtag_withtag('failed', item)
-                    connected_point = conn[1]
-                    point_items = simulator.canvas.find_withtag(f'in_{connected_point}')
-                    for item in point_items:
-                        simulator.canvas.addtag_withtag('failed', item)
-                    simulator.mark_failed_elements(connected_point)
 
+def tag_failed_elements(simulator, failure):
+    """
+    Помечает тегом failed все элементы холста, входящие в результат распространения отказа.
+    :param failure: FailureSet
+    """
+    canvas = simulator.canvas
+    graph = simulator.graph
 
-def color_failed_elements(simulator):
+    for node_id in failure.nodes:
+        canvas.addtag_withtag('failed', f'node_{node_id}')
+
+    for kind, point_id in failure.points:
+        canvas.addtag_withtag('failed', f'{kind}_{point_id}')
+
+    for start, end in failure.edges:
+        if graph.is_internal(start, end):
+            node = graph.node_by_point(end, 'in')
+            canvas.addtag_withtag('failed', f'internal_conn_in_{node.id}_{start}_{end}')
+        else:
+            canvas.addtag_withtag('failed', f'conn_{start}_{end}')
+
+
+def color_failed_elements(simulator, items=None):
     """
     Данный метод вызывается после разметки отказавших элементов для окраски вершин и соединений в красный цвет.
     Вершины также увеличиваются в размерах.
+    :param items: Элементы холста для окраски; по умолчанию - все элементы с тегом failed
     """
-    all_items = simulator.canvas.find_all()
-    for item in all_items:
-        if 'failed' in simulator.canvas.gettags(item):
-            item_type = simulator.canvas.type(item)
-            if item_type == 'oval':
-                coords = simulator.canvas.coords(item)
-                center_x = (coords[0] + coords[2]) / 2
-                center_y = (coords[1] + coords[3]) / 2
-                width = coords[2] - coords[0]
-                height = coords[3] - coords[1]
-                new_width = width * 1.5
-                new_height = height * 1.5
-                new_coords = [
-                    center_x - new_width / 2,
-                    center_y - new_height / 2,
-                    center_x + new_width / 2,
-                    center_y + new_height / 2
-                ]
-                simulator.canvas.coords(item, *new_coords)
-                simulator.canvas.itemconfig(item, fill='red')
-            elif item_type == 'polygon':
-                simulator.canvas.itemconfig(item, outline='red', width=2)
-            elif item_type == 'line':
-                simulator.canvas.itemconfig(item, fill='red', width=2)
+    for item in simulator.canvas.find_withtag('failed') if items is None else items:
+        item_type = simulator.canvas.type(item)
+        if item_type == 'oval':
+            coords = simulator.canvas.coords(item)
+            center_x = (coords[0] + coords[2]) / 2
+            center_y = (coords[1] + coords[3]) / 2
+            width = coords[2] - coords[0]
+            height = coords[3] - coords[1]
+            new_width = width * 1.5
+            new_height = height * 1.5
+            new_coords = [
+                center_x - new_width / 2,
+                center_y - new_height / 2,
+                center_x + new_width / 2,
+                center_y + new_height / 2
+            ]
+            simulator.canvas.coords(item, *new_coords)
+            simulator.canvas.itemconfig(item, fill='red')
+        elif item_type == 'polygon':
+            simulator.canvas.itemconfig(item, outline='red', width=2)
+        elif item_type == 'line':
+            simulator.canvas.itemconfig(item, fill='red', width=2)
 
 
 def set_failure(simulator):
@@ -109,13 +83,13 @@ def set_failure(simulator):
     simulator.canvas.unbind('<Button-1>')
     simulator.failure_mode = True
     simulator.root.config(cursor="crosshair")
-    simulator.visited_points = set()
 
     def handle_failure_click(event):
         if not simulator.failure_mode:
             return
 
-        clicked_items = simulator.canvas.find_closest(event.x, event.y)
+        clicked_items = simulator.canvas.find_closest(simulator.canvas.canvasx(event.x),
+                                                     simulator.canvas.canvasy(event.y))
         if not clicked_items:
             return
 
@@ -123,8 +97,7 @@ def set_failure(simulator):
         for tag in tags:
             if tag.startswith('out_') and not tag.endswith('text'):
                 point_id = tag[4:]
-                simulator.visited_points.clear()
-                simulator.mark_failed_elements(point_id)
+                simulator.mark_failed_elements(point_id, 'out')
                 simulator.color_failed_elements()
 
                 simulator.failure_mode = False
@@ -139,6 +112,7 @@ def reset_failures(simulator):
     """
     Сбрасывает все отказавшие элементы.
     """
+    simulator.failure = None
     failed_items = simulator.canvas.find_withtag('failed')
     for item in failed_items:
         tags = list(simulator.canvas.gettags(item))
@@ -156,14 +130,16 @@ def reset_failures(simulator):
                 elif tag.startswith('in_'):
                     simulator.canvas.itemconfig(item, fill='green')
 
+            # Точки рисуются радиусом 5 в координатах модели, на холсте - с учетом текущего масштаба
+            radius = 5 * simulator.view_scale
             coords = simulator.canvas.coords(item)
             center_x = (coords[0] + coords[2]) / 2
             center_y = (coords[1] + coords[3]) / 2
             new_coords = [
-                center_x - 5,
-                center_y - 5,
-                center_x + 5,
-                center_y + 5
+                center_x - radius,
+                center_y - radius,
+                center_x + radius,
+                center_y + radius
             ]
             simulator.canvas.coords(item, *new_coords)
 
@@ -171,4 +147,261 @@ def reset_failures(simulator):
             simulator.canvas.itemconfig(item, outline='#999999', width=2)
 
         elif item_type == 'line':
-            simulator.canvas.itemconfig(item, fill='orange', width=3)
\ No newline at end of file
+            simulator.canvas.itemconfig(item, fill='orange', width=3)
+
+
+def show_single_points_of_failure(simulator):
+    """
+    Выводит для каждого выхода схемы единичные точки отказа - точки, отказ любой из которых
+    отрезает выход от всех входов.
+    """
+    rows = single_points_of_failure(simulator.graph)
+
+    node_names = {'input': 'Вход', 'output': 'Выход', 'aggregate': 'Агрегат'}
+
+    def point_name(point_id):
+        node = simulator.graph.node_by_point(point_id, 'out')
+        return f"{point_id} ({node_names[node.type]} {node.typeid})" if node else point_id
+
+    table_window = tk.Toplevel(simulator.root)
+    table_window.title("Единичные точки отказа выходов")
+    table_window.geometry("800x600")
+
+    frame = tk.Frame(table_window)
+    frame.pack(fill=tk.BOTH, expand=True)
+
+    vsb = tk.Scrollbar(frame, orient="vertical")
+    vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+    table = ttk.Treeview(frame, yscrollcommand=vsb.set)
+    vsb.config(command=table.yview)
+
+    table['columns'] = ('point', 'count', 'spof')
+    table.column('#0', width=80, minwidth=60)
+    table.column('point', width=80, minwidth=50, anchor=tk.CENTER)
+    table.column('count', width=80, minwidth=50, anchor=tk.CENTER)
+    table.column('spof', width=520, minwidth=100)
+
+    table.heading('#0', text='Выход', anchor=tk.CENTER)
+    table.heading('point', text='Точка', anchor=tk.CENTER)
+    table.heading('count', text='Число', anchor=tk.CENTER)
+    table.heading('spof', text='Единичные точки отказа (от входов к выходу)', anchor=tk.CENTER)
+
+    for row in rows:
+        spof = ', '.join(point_name(point_id) for point_id in row['spof'])
+        table.insert('', tk.END, text=row['output'].typeid,
+                     values=(row['point'], len(row['spof']) if row['connected'] else '-',
+                             spof if row['connected'] else 'не связан со входами'))
+
+    table.pack(fill=tk.BOTH, expand=True)
+
+
+def set_failure_probability(simulator):
+    """
+    Переводит холст в режим задания вероятности отказа: клик по выходной точке
+    открывает диалог ввода вероятности для этой точки.
+    """
+    simulator.canvas.unbind('<Button-1>')
+    simulator.failure_mode = True
+    simulator.root.config(cursor="question_arrow")
+
+    def handle_probability_click(event):
+        if not simulator.failure_mode:
+            return
+
+        clicked_items = simulator.canvas.find_closest(simulator.canvas.canvasx(event.x),
+                                                     simulator.canvas.canvasy(event.y))
+        if not clicked_items:
+            return
+
+        tags = simulator.canvas.gettags(clicked_items[0])
+        for tag in tags:
+            if tag.startswith('out_') and not tag.endswith('text'):
+                point_id = tag[4:]
+                current = simulator.failure_probabilities.get(point_id, simulator.default_failure_probability)
+                value = simpledialog.askfloat("Вероятность отказа", f"Вероятность отказа точки {point_id}:",
+                                              initialvalue=current, minvalue=0.0, maxvalue=1.0,
+                                              parent=simulator.root)
+                if value is not None:
+                    simulator.failure_probabilities[point_id] = value
+                return
+
+    simulator.canvas.bind('<Button-1>', handle_probability_click)
+
+
+def set_default_failure_probability(simulator):
+    """
+    Задает вероятность отказа для всех точек, у которых она не указана явно.
+    """
+    value = simpledialog.askfloat("Вероятность отказа", "Вероятность отказа точек по умолчанию:",
+                                  initialvalue=simulator.default_failure_probability,
+                                  minvalue=0.0, maxvalue=1.0, parent=simulator.root)
+    if value is not None:
+        simulator.default_failure_probability = value
+
+
+def run_monte_carlo(simulator):
+    """
+    Оценивает вероятности отказа выходов схемы методом Монте-Карло и выводит их в таблицу.
+    Моделирование выполняется в отдельном потоке, а окно прогресса опрашивает его через root.after,
+    поэтому интерфейс не блокируется и расчет можно отменить.
+    """
+    trials = simpledialog.askinteger("Метод Монте-Карло", "Число испытаний:",
+                                     initialvalue=1000000, minvalue=1, parent=simulator.root)
+    if not trials:
+        return
+    seed_text = simpledialog.askstring("Метод Монте-Карло",
+                                       "Начальное значение генератора (пусто - случайное):",
+                                       initialvalue='', parent=simulator.root)
+    if seed_text is None:
+        return
+    seed = None
+    if seed_text.strip():
+        try:
+            seed = int(seed_text)
+        except ValueError:
+            messagebox.showerror("Ошибка", f"Начальное значение должно быть целым числом: {seed_text}")
+            return
+        if seed < 0:
+            messagebox.showerror("Ошибка", "Начальное значение не может быть отрицательным")
+            return
+
+    from monte_carlo import CHUNK_TRIALS, SimulationCancelled, simulate
+
+    point_labels, _, successors = label_graph(simulator.get_internal_connections())
+    output_sources = simulator.graph.output_sources()
+    output_points = [label for _, label in output_sources]
+    probabilities = dict(simulator.failure_probabilities)
+    default_probability = simulator.default_failure_probability
+
+    state = {'done': 0, 'result': None, 'error': None}
+    cancel = threading.Event()
+
+    def progress(count):
+        if cancel.is_set():
+            raise SimulationCancelled()
+        state['done'] += count
+
+    def work():
+        try:
+            state['result'] = simulate(point_labels, successors, output_points, probabilities, trials,
+                                       default_probability=default_probability, seed=seed,
+                                       workers=None if trials > CHUNK_TRIALS else 1, progress=progress)
+        except SimulationCancelled:
+            pass
+        except Exception as e:
+            state['error'] = e
+
+    progress_window = tk.Toplevel(simulator.root)
+    progress_window.title("Метод Монте-Карло")
+    progress_window.resizable(False, False)
+    status = tk.Label(progress_window, text=f"Выполнено испытаний: 0 из {trials}")
+    status.pack(padx=10, pady=(10, 5))
+    bar = ttk.Progressbar(progress_window, length=300, maximum=trials)
+    bar.pack(padx=10, pady=5)
+    cancel_button = tk.Button(progress_window, text="Отмена", command=cancel.set)
+    cancel_button.pack(pady=(5, 10))
+    progress_window.protocol("WM_DELETE_WINDOW", cancel.set)
+
+    worker = threading.Thread(target=work, name='monte-carlo', daemon=True)
+    worker.start()
+
+    def poll():
+        if worker.is_alive():
+            done = min(state['done'], trials)
+            bar['value'] = done
+            status.config(text="Отмена..." if cancel.is_set() else f"Выполнено испытаний: {done} из {trials}")
+            progress_window.after(MONTE_CARLO_POLL, poll)
+            return
+        progress_window.destroy()
+        if state['error'] is not None:
+            messagebox.showerror("Ошибка", f"Не удалось выполнить моделирование: {state['error']}")
+        elif state['result'] is not None:
+            show_monte_carlo_result(simulator, state['result'], output_sources, seed)
+
+    progress_window.after(MONTE_CARLO_POLL, poll)
+
+
+def show_monte_carlo_result(simulator, result, output_sources, seed=None):
+    """
+    Выводит вероятности отказа выходов с 95% доверительными интервалами.
+    :param result: MonteCarloResult
+    :param output_sources: Пары (выходной элемент, подпись точки) в порядке result.output_points
+    :param seed: Начальное значение генератора, если оно было задано
+    """
+    table_window = tk.Toplevel(simulator.root)
+    seed_note = f", seed {seed}" if seed is not None else ""
+    table_window.title(f"Метод Монте-Карло ({result.trials} испытаний{seed_note})")
+    table_window.geometry("600x400")
+
+    table = ttk.Treeview(table_window)
+    table['columns'] = ('point', 'probability', 'low', 'high')
+    table.column('#0', width=120, minwidth=100)
+    for column in table['columns']:
+        table.column(column, width=110, minwidth=50, anchor=tk.CENTER)
+
+    table.heading('#0', text='Выход', anchor=tk.CENTER)
+    table.heading('point', text='Точка', anchor=tk.CENTER)
+    table.heading('probability', text='P отказа', anchor=tk.CENTER)
+    table.heading('low', text='95% ДИ, от', anchor=tk.CENTER)
+    table.heading('high', text='95% ДИ, до', anchor=tk.CENTER)
+
+    probabilities = result.probabilities()
+    low, high = result.confidence_intervals()
+    for k, (node, label) in enumerate(output_sources):
+        table.insert('', tk.END, text=f'Выход {node.typeid}',
+                     values=(label, f'{probabilities[k]:.6f}', f'{low[k]:.6f}', f'{high[k]:.6f}'))
+
+    system_probability, system_low, system_high = result.system_probability()
+    table.insert('', tk.END, text='Система',
+                 values=('', f'{system_probability:.6f}', f'{system_low:.6f}', f'{system_high:.6f}'))
+
+    table.pack(fill=tk.BOTH, expand=True)
+
+
+def show_failure_sweep(simulator):
+    """
+    Перебирает одиночные отказы всех выходных точек и выводит для каждой размер
+    области распространения отказа и затронутые выходы системы.
+    """
+    rows = sweep_failures(simulator.graph)
+    rows.sort(key=lambda row: (-row['points'], row['point']))
+
+    node_names = {'input': 'Вход', 'output': 'Выход', 'aggregate': 'Агрегат'}
+
+    table_window = tk.Toplevel(simulator.root)
+    table_window.title("Перебор одиночных отказов")
+    table_window.geometry("800x600")
+
+    frame = tk.Frame(table_window)
+    frame.pack(fill=tk.BOTH, expand=True)
+
+    vsb = tk.Scrollbar(frame, orient="vertical")
+    vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+    table = ttk.Treeview(frame, yscrollcommand=vsb.set)
+    vsb.config(command=table.yview)
+
+    table['columns'] = ('node', 'points', 'edges', 'nodes', 'outputs')
+    table.column('#0', width=80, minwidth=60)
+    table.column('node', width=110, minwidth=80, anchor=tk.CENTER)
+    table.column('points', width=90, minwidth=50, anchor=tk.CENTER)
+    table.column('edges', width=90, minwidth=50, anchor=tk.CENTER)
+    table.column('nodes', width=90, minwidth=50, anchor=tk.CENTER)
+    table.column('outputs', width=300, minwidth=100)
+
+    table.heading('#0', text='Точка', anchor=tk.CENTER)
+    table.heading('node', text='Элемент', anchor=tk.CENTER)
+    table.heading('points', text='Точек', anchor=tk.CENTER)
+    table.heading('edges', text='Соединений', anchor=tk.CENTER)
+    table.heading('nodes', text='Элементов', anchor=tk.CENTER)
+    table.heading('outputs', text='Затронутые выходы', anchor=tk.CENTER)
+
+    for row in rows:
+        node = row['node']
+        outputs = ', '.join(str(output.typeid) for output in row['outputs'])
+        table.insert('', tk.END, text=row['point'],
+                     values=(f"{node_names[node.type]} {node.typeid}", row['points'], row['edges'],
+                             row['nodes'], outputs or '-'))
+
+    table.pack(fill=tk.BOTH, expand=True)
@@ -0,0 +1,184 @@
+from reachability import strongly_connected_components
+
+SYSTEM_EVENT = 'System'
+GATES = ('or', 'and')
+
+
+def mask_points(mask, labels):
+    """
+    Переводит битовую маску базовых событий в список подписей точек.
+    :param mask: Битовая маска (int)
+    :param labels: Подписи точек по номерам битов
+    :return: list: Подписи точек
+    """
+    points = []
+    while mask:
+        low = mask & -mask
+        points.append(labels[low.bit_length() - 1])
+        mask ^= low
+    return points
+
+
+def minimize(family, max_order=None):
+    """
+    Оставляет в семействе сечений только минимальные (удаляет надмножества других сечений)
+    и сечения, порядок которых не превышает max_order.
+    :param family: Итерируемое множество битовых масок
+    :param max_order: Максимальный порядок сечения или None
+    :return: list: Минимальные сечения, упорядоченные по порядку
+    """
+    by_order = sorted({mask for mask in family
+                       if max_order is None or mask.bit_count() <= max_order},
+                      key=int.bit_count)
+    minimal = []
+    by_lowest_bit = {}
+    for mask in by_order:
+        subsumed = False
+        rest = mask
+        while rest and not subsumed:
+            low = rest & -rest
+            rest ^= low
+            subsumed = any(mask & kept == kept for kept in by_lowest_bit.get(low, ()))
+        if not subsumed:
+            minimal.append(mask)
+            by_lowest_bit.setdefault(mask & -mask, []).append(mask)
+    return minimal
+
+
+def combine_and(left, right, max_order=None):
+    """
+    Сечения для вентиля И: попарные объединения сечений входов.
+    """
+    return minimize((a | b for a in left for b in right), max_order)
+
+
+def combine_or(left, right, max_order=None):
+    """
+    Сечения для вентиля ИЛИ: объединение семейств сечений входов.
+    """
+    return minimize(list(left) + list(right), max_order)
+
+
+class FaultTree:
+    """
+    Дерево отказов, построенное по тому же графу зависимостей, что и дерево FTA в build_tree_base.
+    Для каждой точки x событие "отказ x" = базовое событие x ИЛИ вентиль(события точек, от которых зависит x).
+    Вентиль 'or' соответствует распространению отказов в mark_failed_elements (точка отказывает при отказе
+    любого источника), 'and' - резервированию (точка отказывает только при отказе всех источников).
+    Базовые события нумеруются битами, сечения хранятся как битовые маски.
+    """
+    def __init__(self, internal_connections, gate='or', extra_points=()):
+        """
+        :param internal_connections: Список кортежей (начальная_точка, конечная_точка), где начальная точка
+            зависит от конечной
+        :param gate: 'or' | 'and' - вентиль, объединяющий источники точки
+        :param extra_points: Точки, которые нужно учесть, даже если их нет во внутренних соединениях
+            (например, выходы, подключенные напрямую ко входам системы)
+        """
+        if gate not in GATES:
+            raise ValueError(f"Неизвестный тип вентиля: {gate}")
+        self.gate = gate
+
+        all_points = set(extra_points)
+        for start, end in internal_connections:
+            all_points.add(start)
+            all_points.add(end)
+        self.labels = sorted(all_points)
+        self.label_index = {label: idx for idx, label in enumerate(self.labels)}
+
+        self.dependencies = [[] for _ in self.labels]
+        has_dependents = [False] * len(self.labels)
+        for start, end in internal_connections:
+            start_idx, end_idx = self.label_index[start], self.label_index[end]
+            if end_idx not in self.dependencies[start_idx]:
+                self.dependencies[start_idx].append(end_idx)
+                has_dependents[end_idx] = True
+        self.roots = [label for idx, label in enumerate(self.labels) if not has_dependents[idx]]
+        self._families = {}
+
+    def point_cut_sets(self, max_order=4):
+        """
+        Вычисляет минимальные сечения события отказа каждой точки.
+        Точки обрабатываются по компонентам сильной связности в обратном топологическом порядке;
+        для циклических компонент семейства уточняются до неподвижной точки.
+        :param max_order: Максимальный порядок сечения или None без ограничения
+        :return: list: Семейства минимальных сечений (списки масок) по номерам точек
+        """
+        if max_order in self._families:
+            return self._families[max_order]
+
+        combine = combine_and if self.gate == 'and' else combine_or
+        families = [[] for _ in self.labels]
+        _, components = strongly_connected_components(self.dependencies)
+
+        def evaluate(idx):
+            dependencies = self.dependencies[idx]
+            if dependencies:
+                gate_family = families[dependencies[0]]
+                for dependency in dependencies[1:]:
+                    gate_family = combine(gate_family, families[dependency], max_order)
+            else:
+                gate_family = []
+            return combine_or([1 << idx], gate_family, max_order)
+
+        for members in components:
+            if len(members) == 1 and members[0] not in self.dependencies[members[0]]:
+                families[members[0]] = evaluate(members[0])
+                continue
+            changed = True
+            while changed:
+                changed = False
+                for idx in members:
+                    family = evaluate(idx)
+                    if set(family) != set(families[idx]):
+                        families[idx] = family
+                        changed = True
+
+        self._families[max_order] = families
+        return families
+
+    def cut_sets(self, top, max_order=4):
+        """
+        Минимальные сечения для отказа точки или всей системы.
+        :param top: Подпись точки или SYSTEM_EVENT - отказ хотя бы одной корневой точки
+        :param max_order: Максимальный порядок сечения или None без ограничения
+        :return: list: Минимальные сечения (битовые маски)
+        """
+        families = self.point_cut_sets(max_order)
+        if top == SYSTEM_EVENT:
+            return minimize((mask for root in self.roots for mask in families[self.label_index[root]]),
+                            max_order)
+        idx = self.label_index.get(top)
+        return list(families[idx]) if idx is not None else []
+
+    def probability_vector(self, probabilities, default_probability=0.0):
+        """
+        :param probabilities: Словарь точка -> вероятность отказа
+        :param default_probability: Вероятность для точек, отсутствующих в словаре
+        :return: list: Вероятности базовых событий по номерам битов
+        """
+        return [probabilities.get(label, default_probability) for label in self.labels]
+
+    def cut_set_probability(self, mask, p):
+        """
+        :param mask: Сечение
+        :param p: Вероятности базовых событий из probability_vector
+        :return: float: Вероятность одновременного отказа всех элементов сечения
+        """
+        probability = 1.0
+        for idx in mask_points(mask, range(len(p))):
+            probability *= p[idx]
+        return probability
+
+    def top_event_probability(self, cut_sets, p):
+        """
+        Оценка вероятности головного события сверху по минимальным сечениям
+        (min cut upper bound): 1 - П(1 - P(C)).
+        :param cut_sets: Минимальные сечения
+        :param p: Вероятности базовых событий из probability_vector
+        :return: float
+        """
+        complement = 1.0
+        for mask in cut_sets:
+            complement *= 1.0 - self.cut_set_probability(mask, p)
+        return 1.0 - complement
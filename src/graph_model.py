@@ -0,0 +1,399 @@
+JOURNAL_LIMIT = 100000
+
+
+class Node:
+    """
+    Класс, представляющий элемент в схеме сопряжения.
+    Input - вход программной системы
+    Output - выход программной системы
+    Aggregate - информационный сервис
+    """
+    input_nodes = 0
+    output_nodes = 0
+    aggregate_nodes = 0
+    def __init__(self, node_type, node_id):
+        """
+        Инициализирует новый узел.
+        :param node_type: Тип узла ('input', 'output', 'aggregate')
+        :param node_id: Уникальный числовой идентификатор элемента
+        """
+        self.type = node_type
+        self.id = node_id
+        self.inputs = []
+        self.outputs = []
+        self.x = 0
+        self.y = 0
+        self.deleted = False
+
+        if node_type == 'input':
+            Node.input_nodes += 1
+            self.typeid = Node.input_nodes
+            self.outputs.append(f'0{Node.input_nodes}')
+        elif node_type == 'output':
+            Node.output_nodes += 1
+            self.typeid = Node.output_nodes
+            self.inputs.append(f'{Node.output_nodes}')
+        elif node_type == 'aggregate':
+            Node.aggregate_nodes += 1
+            self.typeid = Node.aggregate_nodes
+            for i in range(6):
+                self.inputs.append(f'{Node.aggregate_nodes}{i + 1}')
+                self.outputs.append(f'{Node.aggregate_nodes}{i + 1}')
+
+
+def node_points(node):
+    """
+    Возвращает ID точек элемента в том виде, в котором они отрисовываются на холсте.
+    :param node: Элемент схемы
+    :return: tuple: (список входных точек, список выходных точек)
+    """
+    if node.type == 'input':
+        return [], [f'0{node.typeid}']
+    if node.type == 'output':
+        return [f'{node.typeid}0'], []
+    return ([f'{node.typeid}{i + 7}' for i in range(6)],
+            [f'{node.typeid}{i + 1}' for i in range(6)])
+
+
+class SchemeGraph:
+    """
+    Модель схемы сопряжения в памяти, не зависящая от холста Tk.
+    Хранит элементы, их точки и соединения с целочисленными индексами и списками смежности,
+    поэтому анализ схемы выполняется за O(V+E) и может работать без дисплея.
+
+    Точка адресуется парой (тип, ID), где тип - 'in' или 'out': ID входных и выходных точек
+    разных элементов могут совпадать. Соединение всегда хранится как (выходная_точка, входная_точка).
+
+    Добавления и удаления соединений записываются в журнал изменений, по которому производные
+    структуры (см. incremental.py) обновляются без полного перестроения.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Удаляет все элементы и соединения.
+        """
+        self.nodes = {}
+        self.points = []
+        self.point_index = {}
+        self.point_owner = []
+        self.out_edges = []
+        self.in_edges = []
+        self.edges = []
+        self.edge_index = {}
+        self.version = getattr(self, 'version', 0) + 1
+        self._cache = {}
+        self._cache_version = self.version
+        self.journal = []
+        self.journal_start = 0
+        self.journal_epoch = self.version
+
+    def add_node(self, node):
+        """
+        Добавляет элемент и все его точки в граф.
+        :param node: Экземпляр Node
+        """
+        self.version += 1
+        self.nodes[node.id] = node
+        in_points, out_points = node_points(node)
+        for kind, point_ids in (('in', in_points), ('out', out_points)):
+            for point_id in point_ids:
+                self.point_index[(kind, point_id)] = len(self.points)
+                self.points.append((kind, point_id))
+                self.point_owner.append(node.id)
+                self.out_edges.append([])
+                self.in_edges.append([])
+
+    def add_nodes(self, nodes):
+        """
+        Добавляет несколько элементов сразу (загрузка схемы): списки точек расширяются целиком,
+        версия графа увеличивается один раз. Результат тот же, что у add_node для каждого элемента.
+        :param nodes: Экземпляры Node
+        """
+        self.version += 1
+        start = len(self.points)
+        points = self.points
+        owners = self.point_owner
+        for node in nodes:
+            self.nodes[node.id] = node
+            in_points, out_points = node_points(node)
+            points.extend([('in', point_id) for point_id in in_points])
+            points.extend([('out', point_id) for point_id in out_points])
+            owners.extend([node.id] * (len(in_points) + len(out_points)))
+        self.point_index.update(zip(points[start:], range(start, len(points))))
+        self.out_edges.extend([] for _ in range(len(points) - start))
+        self.in_edges.extend([] for _ in range(len(points) - start))
+
+    def remove_node(self, node_id):
+        """
+        Удаляет элемент, его точки и все соединения, в которых участвуют эти точки.
+        :param node_id: ID элемента
+        :return: list: Удаленные соединения (выходная_точка, входная_точка, внутреннее)
+        """
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return []
+
+        self.version += 1
+        removed = []
+        in_points, out_points = node_points(node)
+        for kind, point_ids in (('in', in_points), ('out', out_points)):
+            for point_id in point_ids:
+                idx = self.point_index.get((kind, point_id))
+                if idx is None or self.point_owner[idx] != node_id:
+                    continue
+                for edge_idx in list(self.out_edges[idx]) + list(self.in_edges[idx]):
+                    edge = self.edges[edge_idx]
+                    if edge is not None:
+                        out_point, in_point = self.points[edge[0]][1], self.points[edge[1]][1]
+                        self.remove_connection(out_point, in_point)
+                        removed.append((out_point, in_point, edge[2]))
+                del self.point_index[(kind, point_id)]
+                self.point_owner[idx] = None
+        return removed
+
+    def add_connection(self, out_point, in_point, internal=False):
+        """
+        Добавляет соединение между выходной и входной точками.
+        :param out_point: ID выходной точки
+        :param in_point: ID входной точки
+        :param internal: True для соединения внутри агрегата
+        :return: int: Индекс соединения или None, если точек нет в графе
+        """
+        if (out_point, in_point) in self.edge_index:
+            return self.edge_index[(out_point, in_point)]
+
+        start = self.point_index.get(('out', out_point))
+        end = self.point_index.get(('in', in_point))
+        if start is None or end is None:
+            return None
+
+        self.version += 1
+        edge_idx = len(self.edges)
+        self.edges.append((start, end, internal))
+        self.edge_index[(out_point, in_point)] = edge_idx
+        self.out_edges[start].append(edge_idx)
+        self.in_edges[end].append(edge_idx)
+        self.record(('add', out_point, in_point, internal))
+        return edge_idx
+
+    def add_connections(self, connections):
+        """
+        Добавляет несколько соединений сразу (загрузка схемы) с одним увеличением версии графа.
+        Как и в add_connection, повторные соединения и соединения с отсутствующими точками пропускаются.
+        Вместо записи каждого соединения журнал начинается заново, как после clear: производные
+        структуры, следившие за графом, перестраиваются целиком.
+        :param connections: Соединения (выходная_точка, входная_точка, внутреннее)
+        """
+        self.version += 1
+        point_index = self.point_index
+        edge_index = self.edge_index
+        edges = self.edges
+        out_edges = self.out_edges
+        in_edges = self.in_edges
+        for out_point, in_point, internal in connections:
+            key = (out_point, in_point)
+            if key in edge_index:
+                continue
+            start = point_index.get(('out', out_point))
+            end = point_index.get(('in', in_point))
+            if start is None or end is None:
+                continue
+            edge_idx = len(edges)
+            edge_index[key] = edge_idx
+            out_edges[start].append(edge_idx)
+            in_edges[end].append(edge_idx)
+            edges.append((start, end, internal))
+        self.journal = []
+        self.journal_start = 0
+        self.journal_epoch = self.version
+
+    def remove_connection(self, out_point, in_point):
+        """
+        Удаляет соединение.
+        :param out_point: ID выходной точки
+        :param in_point: ID входной точки
+        :return: True, если соединение существовало
+        """
+        edge_idx = self.edge_index.pop((out_point, in_point), None)
+        if edge_idx is None:
+            return False
+        self.version += 1
+        start, end, internal = self.edges[edge_idx]
+        self.out_edges[start].remove(edge_idx)
+        self.in_edges[end].remove(edge_idx)
+        self.edges[edge_idx] = None
+        self.record(('remove', out_point, in_point, internal))
+        return True
+
+    def record(self, change):
+        """
+        Добавляет запись в журнал изменений. Старая половина журнала отбрасывается при переполнении.
+        :param change: Кортеж ('add' | 'remove', выходная_точка, входная_точка, внутреннее)
+        """
+        self.journal.append(change)
+        if len(self.journal) > JOURNAL_LIMIT:
+            dropped = len(self.journal) // 2
+            del self.journal[:dropped]
+            self.journal_start += dropped
+
+    def journal_position(self):
+        """
+        :return: tuple: Позиция конца журнала для последующего вызова changes_since
+        """
+        return self.journal_epoch, self.journal_start + len(self.journal)
+
+    def changes_since(self, position):
+        """
+        Возвращает изменения соединений после позиции журнала.
+        :param position: Результат journal_position
+        :return: list: Записи журнала или None, если граф очищен или записи уже отброшены
+        """
+        epoch, index = position
+        if epoch != self.journal_epoch or index < self.journal_start:
+            return None
+        return self.journal[index - self.journal_start:]
+
+    def cached(self, key, builder):
+        """
+        Возвращает производную структуру (индексы, замыкания и т.п.), построенную по графу.
+        Структура пересчитывается только после изменения графа.
+        :param key: Ключ структуры
+        :param builder: Функция builder(graph), строящая структуру
+        """
+        if self._cache_version != self.version:
+            self._cache = {}
+            self._cache_version = self.version
+        if key not in self._cache:
+            self._cache[key] = builder(self)
+        return self._cache[key]
+
+    def has_connection(self, out_point, in_point):
+        return (out_point, in_point) in self.edge_index
+
+    def is_occupied(self, point_id, kind='in'):
+        """
+        Проверяет, участвует ли точка во внешнем соединении.
+        Используются списки соединений точки, поэтому проверка не зависит от размера схемы.
+        :param point_id: ID точки
+        :param kind: 'in' | 'out' - тип точки
+        :return: True, если к точке подключено хотя бы одно внешнее соединение
+        """
+        idx = self.point_index.get((kind, point_id))
+        if idx is None:
+            return False
+        point_edges = self.in_edges[idx] if kind == 'in' else self.out_edges[idx]
+        return any(not self.edges[edge_idx][2] for edge_idx in point_edges)
+
+    def connections(self):
+        """
+        :return: list: Кортежи (выходная_точка, входная_точка) в порядке создания соединений
+        """
+        return [(self.points[edge[0]][1], self.points[edge[1]][1])
+                for edge in self.edges if edge is not None]
+
+    def incident_connections(self, node_id):
+        """
+        Возвращает соединения, в которых участвуют точки элемента.
+        Индекс элемент -> соединения строится за один проход по графу и переиспользуется до его изменения.
+        :param node_id: ID элемента
+        :return: list: Кортежи (выходная_точка, входная_точка, внутреннее)
+        """
+        return self.cached('incident', build_incidence_index).get(node_id, [])
+
+    def is_internal(self, out_point, in_point):
+        edge_idx = self.edge_index.get((out_point, in_point))
+        return edge_idx is not None and self.edges[edge_idx][2]
+
+    def node_by_point(self, point_id, kind=None):
+        """
+        Возвращает элемент, которому принадлежит точка.
+        :param point_id: ID точки
+        :param kind: 'in' | 'out' - тип точки; если не задан, сначала ищется выходная точка
+        :return: Node или None
+        """
+        kinds = (kind,) if kind else ('out', 'in')
+        for point_kind in kinds:
+            idx = self.point_index.get((point_kind, point_id))
+            if idx is not None:
+                node = self.nodes.get(self.point_owner[idx])
+                if node is not None and not node.deleted:
+                    return node
+        return None
+
+    def point_kind(self, point_id):
+        """
+        :return: 'in', если в графе есть входная точка с таким ID, иначе 'out'
+        """
+        return 'in' if ('in', point_id) in self.point_index else 'out'
+
+    def point_source(self, in_point):
+        """
+        Возвращает выходную точку, внешнее соединение от которой приходит во входную точку.
+        Именно этот ID подписывается у входной точки на холсте.
+        :param in_point: ID входной точки
+        :return: ID выходной точки или None, если вход не подключен
+        """
+        idx = self.point_index.get(('in', in_point))
+        if idx is None:
+            return None
+        for edge_idx in self.in_edges[idx]:
+            start, _, internal = self.edges[edge_idx]
+            if not internal:
+                return self.points[start][1]
+        return None
+
+    def internal_connections(self):
+        """
+        Получает список всех внутренних соединений в виде (выходная_точка, источник_входной_точки).
+        Соединения, чья входная точка ни к чему не подключена, не влияют на схему и пропускаются.
+        :return: list: Cписок кортежей (начальная_точка, конечная_точка)
+        """
+        internal_connections = []
+        for edge in self.edges:
+            if edge is None or not edge[2]:
+                continue
+            end_text = self.point_source(self.points[edge[1]][1])
+            if end_text is not None:
+                internal_connections.append((self.points[edge[0]][1], end_text))
+        return internal_connections
+
+    def output_sources(self):
+        """
+        :return: list: Пары (выходной элемент, подпись его входной точки) для подключенных выходов
+        """
+        sources = []
+        for node in self.nodes.values():
+            if node.type == 'output' and not node.deleted:
+                for in_point in node_points(node)[0]:
+                    label = self.point_source(in_point)
+                    if label is not None:
+                        sources.append((node, label))
+        return sources
+
+    def output_labels(self):
+        """
+        :return: list: Подписи входных точек выходных элементов (ID подключенных к ним выходных точек)
+        """
+        return [label for _, label in self.output_sources()]
+
+
+def build_incidence_index(graph):
+    """
+    Строит индекс соединений, инцидентных каждому элементу.
+    Внутреннее соединение агрегата попадает в список элемента один раз.
+    :param graph: SchemeGraph
+    :return: dict: ID элемента -> список (выходная_точка, входная_точка, внутреннее)
+    """
+    incidence = {}
+    for edge in graph.edges:
+        if edge is None:
+            continue
+        start, end, internal = edge
+        connection = (graph.points[start][1], graph.points[end][1], internal)
+        start_owner, end_owner = graph.point_owner[start], graph.point_owner[end]
+        incidence.setdefault(start_owner, []).append(connection)
+        if end_owner != start_owner:
+            incidence.setdefault(end_owner, []).append(connection)
+    return incidence
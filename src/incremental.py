@@ -0,0 +1,256 @@
+from adjacency import SparseAdjacency
+from metrics import metric_rows, structural_metrics
+from reachability import reachability_sets, reverse_condensation, strongly_connected_components
+
+
+class IncrementalAnalysis:
+    """
+    Производные структуры анализа схемы, обновляемые по журналу изменений SchemeGraph.
+
+    Хранится граф зависимостей точек, тот же, что строит label_graph по внутренним соединениям:
+    ребро ведет из источника входной точки агрегата в выходную точку, связанную с ней внутренним
+    соединением. Для каждой точки хранятся битовые маски достижимых из нее точек и точек,
+    из которых достижима она. При добавлении ребра маски дополняются на месте (динамическое
+    транзитивное замыкание), после удаления замыкание пересчитывается при следующем обращении.
+    Матрица смежности и структурные меры важности перестраиваются, только если изменился
+    граф зависимостей, а не любое соединение схемы.
+    """
+    def __init__(self, graph):
+        """
+        :param graph: SchemeGraph
+        """
+        self.graph = graph
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Строит все структуры по текущему состоянию графа схемы.
+        """
+        graph = self.graph
+        self.position = graph.journal_position()
+        self.sources = {}
+        self.internal = {}
+        self.edge_count = {}
+        self.successors = {}
+        self.predecessors = {}
+        self.version = 0
+        self.bits = {}
+        self.bit_labels = []
+        self.reach = []
+        self.ancestors = []
+        self.closure_valid = False
+        self._adjacency = None
+        self._structural = None
+        for edge in graph.edges:
+            if edge is not None:
+                start, end, internal = edge
+                self.apply('add', graph.points[start][1], graph.points[end][1], internal)
+
+    def sync(self):
+        """
+        Применяет изменения схемы, записанные в журнал после предыдущей синхронизации.
+        :return: True, если изменился граф зависимостей точек
+        """
+        version = self.version
+        changes = self.graph.changes_since(self.position)
+        if changes is None:
+            self.rebuild()
+            return True
+        for change in changes:
+            self.apply(*change)
+        self.position = self.graph.journal_position()
+        return self.version != version
+
+    def apply(self, action, out_point, in_point, internal):
+        """
+        Применяет одно изменение соединения к графу зависимостей точек.
+        :param action: 'add' | 'remove'
+        """
+        if internal:
+            outs = self.internal.setdefault(in_point, set())
+            source = self.source(in_point)
+            if action == 'add':
+                outs.add(out_point)
+                if source is not None:
+                    self.add_dependency(source, out_point)
+            else:
+                outs.discard(out_point)
+                if source is not None:
+                    self.remove_dependency(source, out_point)
+            return
+
+        old_source = self.source(in_point)
+        sources = self.sources.setdefault(in_point, [])
+        if action == 'add':
+            sources.append(out_point)
+        elif out_point in sources:
+            sources.remove(out_point)
+        new_source = self.source(in_point)
+        if old_source != new_source:
+            for following in self.internal.get(in_point, ()):
+                if old_source is not None:
+                    self.remove_dependency(old_source, following)
+                if new_source is not None:
+                    self.add_dependency(new_source, following)
+
+    def source(self, in_point):
+        """
+        :return: Выходная точка, внешнее соединение от которой приходит во входную точку, как
+                 у SchemeGraph.point_source
+        """
+        sources = self.sources.get(in_point)
+        return sources[0] if sources else None
+
+    def add_dependency(self, source, point):
+        count = self.edge_count.get((source, point), 0)
+        self.edge_count[(source, point)] = count + 1
+        if count:
+            return
+        self.successors.setdefault(source, set()).add(point)
+        self.predecessors.setdefault(point, set()).add(source)
+        self.version += 1
+        if self.closure_valid:
+            self.insert_closure(source, point)
+
+    def remove_dependency(self, source, point):
+        count = self.edge_count.get((source, point), 0) - 1
+        if count > 0:
+            self.edge_count[(source, point)] = count
+            return
+        self.edge_count.pop((source, point), None)
+        self.successors[source].discard(point)
+        if not self.successors[source]:
+            del self.successors[source]
+        self.predecessors[point].discard(source)
+        if not self.predecessors[point]:
+            del self.predecessors[point]
+        self.version += 1
+        self.closure_valid = False
+
+    def point_labels(self):
+        """
+        :return: list: Отсортированные точки графа зависимостей, как у label_graph
+        """
+        return sorted(self.successors.keys() | self.predecessors.keys())
+
+    def bit(self, label):
+        """
+        Номер бита точки в масках замыкания; новым точкам номера выдаются по мере появления.
+        """
+        bit = self.bits.get(label)
+        if bit is None:
+            bit = self.bits[label] = len(self.bit_labels)
+            self.bit_labels.append(label)
+            self.reach.append(0)
+            self.ancestors.append(0)
+        return bit
+
+    def insert_closure(self, source, point):
+        """
+        Дополняет замыкание после добавления ребра source -> point: все точки, из которых
+        достижима source (и она сама), начинают достигать point и всего, что достижимо из нее.
+        """
+        u = self.bit(source)
+        v = self.bit(point)
+        before = self.ancestors[u] | (1 << u)
+        after = self.reach[v] | (1 << v)
+        if not after & ~self.reach[u]:
+            return
+        for x in iterate_bits(before):
+            self.reach[x] |= after
+        for y in iterate_bits(after):
+            self.ancestors[y] |= before
+
+    def ensure_closure(self):
+        """
+        Пересчитывает замыкание целиком, если оно устарело после удаления ребер.
+        """
+        if self.closure_valid:
+            return
+        labels = self.point_labels()
+        self.bits = {label: bit for bit, label in enumerate(labels)}
+        self.bit_labels = labels
+        successors = [[self.bits[point] for point in self.successors.get(label, ())] for label in labels]
+        predecessors = [[self.bits[point] for point in self.predecessors.get(label, ())] for label in labels]
+        condensation = strongly_connected_components(successors)
+        self.reach = reachability_sets(successors, condensation)
+        self.ancestors = reachability_sets(predecessors, reverse_condensation(condensation))
+        self.closure_valid = True
+
+    def reachable(self, label):
+        """
+        :return: set: Точки, достижимые из точки путем длины не меньше 1
+        """
+        self.sync()
+        self.ensure_closure()
+        bit = self.bits.get(label)
+        if bit is None:
+            return set()
+        return {self.bit_labels[y] for y in iterate_bits(self.reach[bit])}
+
+    def adjacency(self):
+        """
+        Матрица смежности графа зависимостей; перестраивается только после его изменения.
+        :return: tuple: (подписи точек, SparseAdjacency)
+        """
+        self.sync()
+        if self._adjacency is None or self._adjacency[0] != self.version:
+            labels = self.point_labels()
+            index = {label: idx for idx, label in enumerate(labels)}
+            successors = [[index[point] for point in self.successors.get(label, ())] for label in labels]
+            self._adjacency = (self.version, labels, SparseAdjacency.from_successors(labels, successors))
+        return self._adjacency[1], self._adjacency[2]
+
+    def importance_table(self, structural=True, betweenness_samples=None, seed=0):
+        """
+        Таблица мер важности, как у metrics.importance_table. I1, I2 и число источников берутся
+        из поддерживаемого замыкания; структурные меры кэшируются до изменения графа зависимостей.
+        :param structural: False - без посредничества, влияния и критичности по доминаторам
+        :return: list: Словари с ключами point и METRIC_COLUMNS
+        """
+        point_labels, adjacency = self.adjacency()
+        self.ensure_closure()
+
+        output_mask = 0
+        for label in self.graph.output_labels():
+            bit = self.bits.get(label)
+            if bit is not None:
+                output_mask |= 1 << bit
+
+        measures = []
+        upstream = []
+        for label in point_labels:
+            bit = self.bits[label]
+            reach = self.reach[bit]
+            measures.append(((reach & output_mask).bit_count(), reach.bit_count()))
+            upstream.append(self.ancestors[bit].bit_count())
+
+        metrics = None
+        if structural:
+            key = (self.version, betweenness_samples, seed)
+            if self._structural is None or self._structural[0] != key:
+                self._structural = (key, structural_metrics(adjacency, adjacency.successor_lists(),
+                                                            betweenness_samples, seed))
+            metrics = self._structural[1]
+        return metric_rows(point_labels, adjacency, measures, upstream, metrics)
+
+
+def iterate_bits(mask):
+    """
+    Перебирает номера установленных битов маски.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def incremental_analysis(simulator):
+    """
+    Возвращает инкрементальный анализ текущего графа схемы, создавая его при первом обращении
+    и после замены графа (например, при открытии файла).
+    """
+    analysis = simulator.analysis
+    if analysis is None or analysis.graph is not simulator.graph:
+        analysis = simulator.analysis = IncrementalAnalysis(simulator.graph)
+    return analysis
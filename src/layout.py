@@ -0,0 +1,152 @@
+from collections import deque
+
+CROSSING_SWEEPS = 4
+COMPACTION_PASSES = 2
+NODE_SPACING = 3
+LEVEL_SPACING = 2
+
+
+def layered_layout(G, levels, sweeps=CROSSING_SWEEPS, node_spacing=NODE_SPACING, level_spacing=LEVEL_SPACING):
+    """
+    Послойная укладка графа по схеме Сугиямы для деревьев FTA и RCA.
+    1. Начальный порядок узлов в слоях - порядок обхода в ширину (очередь deque) от узлов
+       верхнего слоя.
+    2. Пересечения уменьшаются методом барицентров: не больше sweeps проходов вниз и вверх,
+       обход прекращается, как только порядок перестает меняться.
+    3. Координаты x сжимаются: каждый узел тянется к среднему положению соседей выше (проход вниз)
+       или ниже (проход вверх) при сохранении порядка и минимального расстояния node_spacing,
+       поэтому узлы не перекрываются.
+    Ребра через несколько слоев не разбиваются фиктивными узлами, а учитываются напрямую:
+    номер узла в слое нормируется на ширину слоя, и барицентр считается по соседям из любых
+    уже упорядоченных слоев. Так каждый проход занимает O(V + E) даже для схем с длинными связями.
+    :param G: Граф NetworkX
+    :param levels: Словарь узел -> номер слоя (0 - верхний) для всех узлов G
+    :param sweeps: Наибольшее число пар проходов упорядочивания
+    :param node_spacing: Минимальное расстояние между узлами слоя
+    :param level_spacing: Расстояние между слоями
+    :return: dict: Узел -> (x, y)
+    """
+    if not levels:
+        return {}
+
+    up, down = layer_edges(G, levels)
+    layers = initial_order(levels, up, down)
+
+    rank = {}
+    for layer in layers:
+        set_ranks(layer, rank)
+    for _ in range(sweeps):
+        changed = False
+        for layer in layers[1:]:
+            changed |= reorder(layer, up, rank)
+        for layer in reversed(layers[:-1]):
+            changed |= reorder(layer, down, rank)
+        if not changed:
+            break
+
+    x = {}
+    for layer in layers:
+        offset = (len(layer) - 1) / 2
+        for i, node in enumerate(layer):
+            x[node] = (i - offset) * node_spacing
+    for _ in range(COMPACTION_PASSES):
+        for layer in layers[1:]:
+            place(layer, up, x, node_spacing)
+        for layer in reversed(layers[:-1]):
+            place(layer, down, x, node_spacing)
+
+    return {node: (x[node], -level * level_spacing) for node, level in levels.items()}
+
+
+def layer_edges(G, levels):
+    """
+    Разделяет соседей узлов на лежащих выше и ниже; ребра внутри одного слоя (циклы)
+    не влияют на укладку.
+    :return: tuple: (соседи выше, соседи ниже) - словари узел -> список узлов
+    """
+    up = {}
+    down = {}
+    for start, end in G.edges():
+        if levels[start] == levels[end]:
+            continue
+        top, bottom = (start, end) if levels[start] < levels[end] else (end, start)
+        down.setdefault(top, []).append(bottom)
+        up.setdefault(bottom, []).append(top)
+    return up, down
+
+
+def initial_order(levels, up, down):
+    """
+    Начальный порядок слоев: узлы добавляются в свой слой в порядке обхода в ширину,
+    начинающегося с узлов верхнего слоя в порядке словаря levels.
+    :return: list: Непустые слои - списки узлов сверху вниз
+    """
+    top = min(levels.values())
+    layers = [[] for _ in range(max(levels.values()) - top + 1)]
+    seen = set()
+    starts = sorted(levels, key=lambda node: levels[node] != top)
+    queue = deque()
+    for start in starts:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue.append(start)
+        while queue:
+            node = queue.popleft()
+            layers[levels[node] - top].append(node)
+            for neighbour in down.get(node, []) + up.get(node, []):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+    return [layer for layer in layers if layer]
+
+
+def set_ranks(layer, rank):
+    """
+    Записывает нормированные номера узлов слоя - середины равных долей отрезка [0, 1].
+    """
+    width = len(layer)
+    for i, node in enumerate(layer):
+        rank[node] = (i + 0.5) / width
+
+
+def reorder(layer, neighbours, rank):
+    """
+    Сортирует слой по барицентрам - среднему нормированному номеру соседей со стороны прохода.
+    Узлы без таких соседей сохраняют свой номер.
+    :return: True, если порядок изменился
+    """
+    keys = {}
+    for node in layer:
+        linked = neighbours.get(node)
+        keys[node] = sum(rank[other] for other in linked) / len(linked) if linked else rank[node]
+    ordered = sorted(layer, key=keys.__getitem__)
+    if ordered == layer:
+        return False
+    layer[:] = ordered
+    set_ranks(layer, rank)
+    return True
+
+
+def place(layer, neighbours, x, spacing):
+    """
+    Сдвигает узлы слоя к среднему x их соседей, сохраняя порядок и расстояние spacing между узлами.
+    Задача min sum (x_i - d_i)^2 при x_{i+1} - x_i >= spacing после замены y_i = x_i - i * spacing
+    сводится к изотонной регрессии и решается алгоритмом объединения соседних нарушителей за O(n).
+    """
+    blocks = []
+    for i, node in enumerate(layer):
+        linked = neighbours.get(node)
+        desired = sum(x[other] for other in linked) / len(linked) if linked else x[node]
+        total, count = desired - i * spacing, 1
+        while blocks and blocks[-1][0] * count > total * blocks[-1][1]:
+            previous_total, previous_count = blocks.pop()
+            total += previous_total
+            count += previous_count
+        blocks.append((total, count))
+
+    i = 0
+    for total, count in blocks:
+        for _ in range(count):
+            x[layer[i]] = total / count + i * spacing
+            i += 1
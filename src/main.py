@@ -1,49 +1,27 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
+import importlib
 import sys
-from analysis import *
-from rca_fta import *
+import threading
 from failures import *
+from graph_model import Node, SchemeGraph, node_points
+from scheme_io import load_scheme, save_scheme, scheme_from_graph
+from viewport import *
 
+SCHEME_FILE_TYPES = [("Схема JSON", "*.json"), ("Схема numpy", "*.npz"), ("Все файлы", "*.*")]
+# Модули анализа тянут numpy, networkx и matplotlib и импортируются при первом обращении к меню.
+# После показа окна они подгружаются в фоновом потоке, чтобы первый вызов меню не ждал импорта.
+PRELOAD_MODULES = ('analysis', 'rca_fta', 'monte_carlo')
+PRELOAD_DELAY = 500
 
-class Node:
+
+def preload_modules(modules=PRELOAD_MODULES):
     """
-    Класс, представляющий элемент в схеме сопряжения.
-    Input - вход программной системы
-    Output - выход программной системы
-    Aggregate - информационный сервис
+    Импортирует модули анализа. Выполняется в фоновом потоке и не обращается к Tk.
+    :param modules: Имена модулей
     """
-    input_nodes = 0
-    output_nodes = 0
-    aggregate_nodes = 0
-    def __init__(self, node_type, node_id):
-        """
-        Инициализирует новый узел.
-        :param node_type: Тип узла ('input', 'output', 'aggregate')
-        :param node_id: Уникальный числовой идентификатор элемента
-        """
-        self.type = node_type
-        self.id = node_id
-        self.inputs = []
-        self.outputs = []
-        self.x = 0
-        self.y = 0
-        self.deleted = False
-
-        if node_type == 'input':
-            Node.input_nodes += 1
-            self.typeid = Node.input_nodes
-            self.outputs.append(f'0{Node.input_nodes}')
-        elif node_type == 'output':
-            Node.output_nodes += 1
-            self.typeid = Node.output_nodes
-            self.inputs.append(f'{Node.output_nodes}')
-        elif node_type == 'aggregate':
-            Node.aggregate_nodes += 1
-            self.typeid = Node.aggregate_nodes
-            for i in range(6):
-                self.inputs.append(f'{Node.aggregate_nodes}{i + 1}')
-                self.outputs.append(f'{Node.aggregate_nodes}{i + 1}')
+    for name in modules:
+        importlib.import_module(name)
 
 
 class FailureSimulator:
@@ -51,32 +29,59 @@ class FailureSimulator:
     Основной класс программы.
     Управляет графическим интерфейсом, логикой моделирования отказов и анализом схемы сопряжения.
     """
-    def __init__(self):
+    def __init__(self, preload=True):
         """
         Инициализирует основное окно программы и настраивает начальное состояние.
+        :param preload: True - подгрузить модули анализа в фоне после показа окна
         """
         self.root = tk.Tk()
         self.root.title("Структурные модели отказов")
 
         self.adjacency_matrix = None
         self.point_labels = None
+        self.analysis = None
+        self.metrics_panel = None
+        self.tree_cache = None
+        self.tree_figures = {}
+        self.tree_windows = {}
 
         self.nodes = []
-        self.connections = []
+        self.graph = SchemeGraph()
         self.failed_points = set()
 
         self.connection_mode = False
         self.connection_start = None
         self.selected_node = None
         self.selected_point_type = None
-        self.drag_data = {"x": 0, "y": 0, "item": None}
-
+        self.drag_data = {"x": 0, "y": 0, "item": None, "dx": 0, "dy": 0}
+        self.drag_job = None
+        self.point_items = {}
+        self.connection_items = {}
+
+        self.lazy_mode = False
+        self.materialized = set()
+        self.spatial_grid = None
+        self.viewport_job = None
+        self.view_scale = 1.0
+
+        self.failure = None
         self.failure_mode = False
+        self.failure_probabilities = {}
+        self.default_failure_probability = 0.01
 
         self.delete_mode = False
 
         self.setup_gui()
 
+        if preload:
+            self.root.after(PRELOAD_DELAY, self.start_preload)
+
+    def start_preload(self):
+        """
+        Запускает фоновую подгрузку модулей анализа.
+        """
+        threading.Thread(target=preload_modules, name='preload', daemon=True).start()
+
     def setup_gui(self):
         """
         Настраивает графический интерфейс пользователя.
@@ -93,6 +98,8 @@ class FailureSimulator:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label='Файл', menu=file_menu)
         file_menu.add_command(label='Новый', command=self.reset_canvas, accelerator="Ctrl+N")
+        file_menu.add_command(label='Открыть...', command=self.open_scheme, accelerator="Ctrl+O")
+        file_menu.add_command(label='Сохранить...', command=self.save_scheme, accelerator="Ctrl+S")
 
         nodes_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label='Узлы', menu=nodes_menu)
@@ -108,13 +115,29 @@ class FailureSimulator:
         menubar.add_cascade(label='Моделирование отказов', menu=fail_menu)
         fail_menu.add_command(label='Добавить отказ на узле', command=self.set_failure, accelerator="Ctrl+F")
         fail_menu.add_command(label='Сбросить отказы', command=self.reset_failures, accelerator="Ctrl+R")
+        fail_menu.add_command(label='Перебор одиночных отказов', command=self.show_failure_sweep)
+        fail_menu.add_command(label='Единичные точки отказа выходов', command=self.show_single_points_of_failure)
+        fail_menu.add_separator()
+        fail_menu.add_command(label='Задать вероятность отказа точки', command=self.set_failure_probability)
+        fail_menu.add_command(label='Вероятность отказа по умолчанию...', command=self.set_default_failure_probability)
+        fail_menu.add_command(label='Метод Монте-Карло...', command=self.run_monte_carlo)
 
         graph_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label='Графы', menu=graph_menu)
         graph_menu.add_command(label='Матрица смежности', command=self.show_adjacency_matrix)
         graph_menu.add_command(label='Меры важности узлов', command=self.build_analysis_table)
+        graph_menu.add_command(label='Панель метрик', command=self.show_metrics_panel)
         graph_menu.add_command(label='Дерево отказов FTA', command=self.build_fault_tree)
         graph_menu.add_command(label='Дерево анализа коренных причин RCA', command=self.build_rca_tree)
+        graph_menu.add_command(label='Минимальные сечения FTA', command=self.show_minimal_cut_sets)
+        graph_menu.add_command(label='Вероятность и важность FTA (BDD)', command=self.show_fault_tree_probability)
+
+        view_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label='Вид', menu=view_menu)
+        self.lazy_mode_var = tk.BooleanVar(value=False)
+        view_menu.add_checkbutton(label='Отрисовывать только видимую область', variable=self.lazy_mode_var,
+                                  command=lambda: self.set_lazy_mode(self.lazy_mode_var.get()))
+        view_menu.add_command(label='Исходный масштаб', command=self.reset_view)
 
         self.canvas = tk.Canvas(self.root, bg='#DDDDDD', bd=1, relief='solid')
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -124,6 +147,12 @@ class FailureSimulator:
         self.canvas.bind("<Button-3>", self.exit_modes)
         self.canvas.bind("<B1-Motion>", self.drag)
         self.canvas.bind("<ButtonRelease-1>", self.drag_stop)
+        self.canvas.bind("<ButtonPress-2>", lambda e: pan_start(self, e))
+        self.canvas.bind("<B2-Motion>", lambda e: pan(self, e))
+        self.canvas.bind("<MouseWheel>", lambda e: scroll(self, e))
+        self.canvas.bind("<Button-4>", lambda e: scroll(self, e))
+        self.canvas.bind("<Button-5>", lambda e: scroll(self, e))
+        self.canvas.bind("<Configure>", lambda e: schedule_viewport_refresh(self))
 
         self.root.bind("<Control-q>", lambda e: self.add_input_node())
         self.root.bind("<Control-w>", lambda e: self.add_aggregate())
@@ -131,6 +160,8 @@ class FailureSimulator:
         self.root.bind("<Control-f>", lambda e: self.set_failure())
         self.root.bind("<Control-r>", lambda e: self.reset_failures())
         self.root.bind("<Control-n>", lambda e: self.reset_canvas())
+        self.root.bind("<Control-o>", lambda e: self.open_scheme())
+        self.root.bind("<Control-s>", lambda e: self.save_scheme())
         self.root.bind("<Control-d>", lambda e: self.set_delete_mode())
 
         self.root.bind("<Control-Q>", lambda e: self.add_input_node())
@@ -139,6 +170,8 @@ class FailureSimulator:
         self.root.bind("<Control-F>", lambda e: self.set_failure())
         self.root.bind("<Control-R>", lambda e: self.reset_failures())
         self.root.bind("<Control-N>", lambda e: self.reset_canvas())
+        self.root.bind("<Control-O>", lambda e: self.open_scheme())
+        self.root.bind("<Control-S>", lambda e: self.save_scheme())
         self.root.bind("<Control-D>", lambda e: self.set_delete_mode())
 
 
@@ -202,6 +235,18 @@ class FailureSimulator:
         y = last_y
         node.x = x
         node.y = y
+        self.render_node(node)
+        if self.lazy_mode:
+            self.spatial_grid.insert(node.id, x, y)
+            self.materialized.add(node.id)
+
+    def render_node(self, node):
+        """
+        Создает элементы холста для узла в его текущей позиции (node.x, node.y).
+        :param node: Узел для отрисовки
+        """
+        x = node.x
+        y = node.y
 
         body_color = '#333333'
         header_color = '#555555'
@@ -214,12 +259,12 @@ class FailureSimulator:
             self.create_rounded_rectangle(self.canvas, x - 40, y - 30, x + 40, y - 15,
                                           radius=10, fill=header_color, outline=outline_color,
                                           width=2, tags=f'node_{node.id}')
-            self.canvas.create_text(x, y - 22, text=f'Вход {Node.input_nodes}',
+            self.canvas.create_text(x, y - 22, text=f'Вход {node.typeid}',
                                     fill='white', tags=f'node_{node.id}')
 
             out_id = f"0{node.typeid}"
-            self.canvas.create_oval(x + 35, y - 5, x + 45, y + 5,
-                                    tags=[f'out_{out_id}', f'point_of_{node.id}'], fill='red')
+            self.point_items[('out', out_id)] = self.canvas.create_oval(
+                x + 35, y - 5, x + 45, y + 5, tags=[f'out_{out_id}', f'point_of_{node.id}'], fill='red')
             self.canvas.create_text(x + 48, y - 10, text=out_id,
                                     fill='black', font=('Arial', 10), tags=f'out_{out_id}_text')
 
@@ -230,12 +275,12 @@ class FailureSimulator:
             self.create_rounded_rectangle(self.canvas, x - 40, y - 30, x + 40, y - 15,
                                           radius=10, fill=header_color, outline=outline_color,
                                           width=2, tags=f'node_{node.id}')
-            self.canvas.create_text(x, y - 22, text=f'Выход {Node.output_nodes}',
+            self.canvas.create_text(x, y - 22, text=f'Выход {node.typeid}',
                                     fill='white', tags=f'node_{node.id}')
 
             in_id = f"{node.typeid}0"
-            self.canvas.create_oval(x - 45, y - 5, x - 35, y + 5,
-                                    tags=[f'in_{in_id}', f'point_of_{node.id}'], fill='green')
+            self.point_items[('in', in_id)] = self.canvas.create_oval(
+                x - 45, y - 5, x - 35, y + 5, tags=[f'in_{in_id}', f'point_of_{node.id}'], fill='green')
 
         else:
             self.create_rounded_rectangle(self.canvas, x - 40, y - 60, x + 40, y + 60,
@@ -244,7 +289,7 @@ class FailureSimulator:
             self.create_rounded_rectangle(self.canvas, x - 40, y - 60, x + 40, y - 45,
                                           radius=10, fill=header_color, outline=outline_color,
                                           width=2, tags=f'node_{node.id}')
-            self.canvas.create_text(x, y - 52, text=f'Агрегат {Node.aggregate_nodes}',
+            self.canvas.create_text(x, y - 52, text=f'Агрегат {node.typeid}',
                                     fill='white', tags=f'node_{node.id}')
 
             for i in range(6):
@@ -252,14 +297,23 @@ class FailureSimulator:
                 in_id = f"{node.typeid}{i + 7}"
                 out_id = f"{node.typeid}{i + 1}"
 
-                self.canvas.create_oval(x - 45, y + y_offset - 5, x - 35, y + y_offset + 5,
-                                        tags=[f'in_{in_id}', f'point_of_{node.id}'], fill='green')
+                self.point_items[('in', in_id)] = self.canvas.create_oval(
+                    x - 45, y + y_offset - 5, x - 35, y + y_offset + 5,
+                    tags=[f'in_{in_id}', f'point_of_{node.id}'], fill='green')
 
-                self.canvas.create_oval(x + 35, y + y_offset - 5, x + 45, y + y_offset + 5,
-                                        tags=[f'out_{out_id}', f'point_of_{node.id}'], fill='red')
+                self.point_items[('out', out_id)] = self.canvas.create_oval(
+                    x + 35, y + y_offset - 5, x + 45, y + y_offset + 5,
+                    tags=[f'out_{out_id}', f'point_of_{node.id}'], fill='red')
                 self.canvas.create_text(x + 50, y + y_offset, text=out_id,
                                         fill='black', font=('Arial', 10), tags=f'out_{out_id}_text')
 
+        if self.view_scale != 1:
+            scale = self.view_scale
+            self.canvas.scale(f'node_{node.id}', 0, 0, scale, scale)
+            self.canvas.scale(f'point_of_{node.id}', 0, 0, scale, scale)
+            for out_id in node_points(node)[1]:
+                self.canvas.scale(f'out_{out_id}_text', 0, 0, scale, scale)
+
     def draw_connection(self, start_coords, end_coords, smooth, tags):
         """
         Рисует соединение между двумя точками, используя кубическую кривую Безье.
@@ -267,25 +321,49 @@ class FailureSimulator:
         :param end_coords: Координаты конечной точки
         :param smooth: True - если требуется кривая Безье, False - если требуется прямая между двумя точками (в агрегатах)
         :param tags: Теги для обращения к данному соединению
-        :return:
+        :return: ID линии на холсте
         """
-        ctrl_x1 = start_coords[0] + (end_coords[0] - start_coords[0]) * 0.4
-        ctrl_x2 = start_coords[0] + (end_coords[0] - start_coords[0]) * 0.6
-
         if smooth:
-            curve_points = [
-                start_coords[0], start_coords[1],
-                ctrl_x1, start_coords[1],
-                ctrl_x2, end_coords[1],
-                end_coords[0], end_coords[1]
-            ]
-            return self.canvas.create_line(curve_points, smooth=True, splinesteps=32,
-                                           width=3, fill='orange', tags=tags)
+            return self.canvas.create_line(self.connection_coords(start_coords, end_coords, True),
+                                           smooth=True, splinesteps=32, width=3, fill='orange', tags=tags)
         else:
-            return self.canvas.create_line(start_coords[0], start_coords[1],
-                                           end_coords[0], end_coords[1],
+            return self.canvas.create_line(self.connection_coords(start_coords, end_coords, False),
                                            width=3, fill='orange', tags=tags)
 
+    def connection_coords(self, start_coords, end_coords, smooth):
+        """
+        Вычисляет координаты линии соединения.
+        :param start_coords: Координаты начальной точки
+        :param end_coords: Координаты конечной точки
+        :param smooth: True - опорные точки кривой Безье, False - концы прямой
+        :return: list: Плоский список координат
+        """
+        if not smooth:
+            return [start_coords[0], start_coords[1], end_coords[0], end_coords[1]]
+
+        ctrl_x1 = start_coords[0] + (end_coords[0] - start_coords[0]) * 0.4
+        ctrl_x2 = start_coords[0] + (end_coords[0] - start_coords[0]) * 0.6
+        return [
+            start_coords[0], start_coords[1],
+            ctrl_x1, start_coords[1],
+            ctrl_x2, end_coords[1],
+            end_coords[0], end_coords[1]
+        ]
+
+    def point_center(self, point_id, point_type):
+        """
+        :param point_id: ID точки
+        :param point_type: 'in' | 'out' - тип точки
+        :return: list: Координаты центра точки на холсте
+        """
+        item = self.point_items.get((point_type, point_id))
+        if item is None:
+            node = self.get_node_by_point(point_id, point_type)
+            dx, dy = point_offset(node, point_type, point_id)
+            return [(node.x + dx) * self.view_scale, (node.y + dy) * self.view_scale]
+        coords = self.canvas.coords(item)
+        return [(coords[0] + coords[2]) / 2, (coords[1] + coords[3]) / 2]
+
     def canvas_click(self, event):
         """
         Обработчик клика по холсту.
@@ -294,7 +372,7 @@ class FailureSimulator:
         Если выбран элемент, то программа переходит в режим перетаскивания элемента.
         :param event: Событие клика мыши
         """
-        clicked_items = self.canvas.find_closest(event.x, event.y)
+        clicked_items = self.canvas.find_closest(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
         if not clicked_items:
             return
 
@@ -307,7 +385,7 @@ class FailureSimulator:
             if (tag.startswith('out_') or tag.startswith('in_')) and not tag.endswith('_text'):
                 point_id = tag[4:] if tag.startswith('out_') else tag[3:]
                 point_type = 'out' if tag.startswith('out_') else 'in'
-                clicked_node = self.get_node_by_point(point_id)
+                clicked_node = self.get_node_by_point(point_id, point_type)
 
                 if clicked_node and clicked_node.type == 'aggregate':
                     if not self.connection_mode:
@@ -349,62 +427,67 @@ class FailureSimulator:
         in_point = point2 if swap else point1
         out_point = point1 if swap else point2
         if internal:
-            self.connections.append((out_point, in_point))
-            start_item = self.canvas.find_withtag(f'out_{out_point}')[0]
-            end_item = self.canvas.find_withtag(f'in_{in_point}')[0]
-
-            start_coords = self.canvas.coords(start_item)
-            end_coords = self.canvas.coords(end_item)
-
-            start_x = (start_coords[0] + start_coords[2]) / 2
-            start_y = (start_coords[1] + start_coords[3]) / 2
-            end_x = (end_coords[0] + end_coords[2]) / 2
-            end_y = (end_coords[1] + end_coords[3]) / 2
-
-            line_coords = [start_x, start_y, end_x, end_y]
-            self.canvas.create_line(line_coords, fill='orange', width=2,
-                                    tags=f'internal_conn_in_{self.get_node_by_point(point1).id}_{out_point}_{in_point}')
+            self.graph.add_connection(out_point, in_point, internal=True)
+            self.render_connection(out_point, in_point, True)
+            self.scheme_changed()
             return
 
         if not self.parse_connection_tags(in_point):
-            self.connections.append((out_point, in_point))
-            print(self.connections)
+            self.graph.add_connection(out_point, in_point)
+            self.render_connection(out_point, in_point, False)
+            self.scheme_changed()
 
-            start_item = self.canvas.find_withtag(f'out_{out_point}')[0]
-            end_item = self.canvas.find_withtag(f'in_{in_point}')[0]
-            start_coords = self.canvas.coords(start_item)
-            end_coords = self.canvas.coords(end_item)
+    def render_connection(self, out_point, in_point, internal):
+        """
+        Создает на холсте линию соединения, уже добавленного в граф схемы,
+        и подпись источника у входной точки для внешнего соединения.
+        :param out_point: Выходная точка
+        :param in_point: Входная точка
+        :param internal: True для соединения внутри агрегата
+        """
+        if internal:
+            line_coords = self.point_center(out_point, 'out') + self.point_center(in_point, 'in')
+            self.connection_items[(out_point, in_point)] = self.canvas.create_line(
+                line_coords, fill='orange', width=2,
+                tags=f'internal_conn_in_{self.get_node_by_point(out_point, "out").id}_{out_point}_{in_point}')
+            return
 
-            start_x = (start_coords[0] + start_coords[2]) / 2
-            start_y = (start_coords[1] + start_coords[3]) / 2
-            end_x = (end_coords[0] + end_coords[2]) / 2
-            end_y = (end_coords[1] + end_coords[3]) / 2
+        self.connection_items[(out_point, in_point)] = self.draw_connection(
+            self.point_center(out_point, 'out'), self.point_center(in_point, 'in'), True,
+            f'conn_{out_point}_{in_point}')
+        if ('in', in_point) in self.point_items:
+            self.render_source_label(out_point, in_point)
 
-            self.draw_connection([start_x, start_y], [end_x, end_y], True,
-                                 f'conn_{out_point}_{in_point}')
+    def render_source_label(self, out_point, in_point):
+        """
+        Подписывает у входной точки ID выходной точки, от которой приходит внешнее соединение.
+        :param out_point: Выходная точка
+        :param in_point: Входная точка
+        """
+        input_coords = self.canvas.coords(self.point_items[('in', in_point)])
+        text_x = input_coords[0] - 10
+        text_y = (input_coords[1] + input_coords[3]) / 2
+        self.canvas.create_text(text_x, text_y, text=out_point,
+                                fill='black', font=('Arial', 10), tags=f'in_{in_point}_text')
 
-            input_coords = self.canvas.coords(end_item)
-            text_x = input_coords[0] - 10
-            text_y = (input_coords[1] + input_coords[3]) / 2
-            self.canvas.create_text(text_x, text_y, text=out_point,
-                                    fill='black', font=('Arial', 10), tags=f'in_{in_point}_text')
+    @property
+    def connections(self):
+        """
+        Список всех соединений схемы в порядке их создания.
+        :return: list: Кортежи (выходная_точка, входная_точка)
+        """
+        return self.graph.connections()
 
-    def get_node_by_point(self, point_id):
+    def get_node_by_point(self, point_id, point_type=None):
         """
         Метод для получения экземпляра класса Node по ID точки, принадлежащей этому экземпляру.
+        Поиск выполняется по реестру точек графа схемы (словарь), а не по тегам холста.
+        Реестр пополняется при добавлении элемента и очищается при его удалении и сбросе холста.
         :param point_id: ID точки, для которой нужно определить принадлежность
+        :param point_type: 'in' | 'out' - тип точки; если не задан, сначала ищется выходная точка
         :return: Node: Элемент с искомой точкой
         """
-        point_items = self.canvas.find_withtag(f'out_{point_id}') or self.canvas.find_withtag(f'in_{point_id}')
-        if point_items:
-            point_tags = self.canvas.gettags(point_items[0])
-            for tag in point_tags:
-                if tag.startswith('point_of_'):
-                    node_id = int(tag.split('_')[-1])
-                    node = self.nodes[node_id]
-                    if not node.deleted:
-                        return node
-        return None
+        return self.graph.node_by_point(point_id, point_type)
 
     def get_point_text(self, point_id, point_type):
         """
@@ -418,21 +501,16 @@ class FailureSimulator:
             return self.canvas.itemcget(text_items[0], 'text')
         return None
 
-    def parse_connection_tags(self, point_id):
+    def parse_connection_tags(self, point_id, point_type='in'):
         """
-        Парсирует теги всех соединений на предмет наличия ID заданной точки
+        Проверяет, занята ли точка внешним соединением.
+        Вместо разбора тегов conn_ всех элементов холста используются индексы соединений графа схемы,
+        которые обновляются при создании и удалении соединений.
         :param point_id: ID точки
+        :param point_type: 'in' | 'out' - тип точки
         :return: True, если точка присутствует хотя бы в одном соединении
         """
-        all_items = self.canvas.find_all()
-        for item in all_items:
-            tags = self.canvas.gettags(item)
-            for tag in tags:
-                if tag.startswith('conn_'):
-                    _, start, end = tag.split('_')
-                    if point_id == start or point_id == end:
-                        return True
-        return False
+        return self.graph.is_occupied(point_id, point_type)
 
     def set_delete_mode(self):
         """
@@ -454,7 +532,7 @@ class FailureSimulator:
 
         self.reset_failures()
 
-        clicked_items = self.canvas.find_closest(event.x, event.y)
+        clicked_items = self.canvas.find_closest(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
         if not clicked_items:
             return
 
@@ -466,20 +544,23 @@ class FailureSimulator:
                 node = self.nodes[node_id]
                 node.deleted = True
 
-                connections_to_remove = []
-                for conn in self.connections:
-                    start, end = conn
-                    if (any(start == out for out in node.outputs) or
-                            any(end == inp for inp in node.inputs)):
-                        self.canvas.delete(f'conn_{start}_{end}')
+                for start, end, internal in self.graph.remove_node(node_id):
+                    self.connection_items.pop((start, end), None)
+                    if internal:
                         self.canvas.delete(f'internal_conn_in_{node_id}_{start}_{end}')
-                        self.canvas.delete(f'text_in_{end}')
-                        connections_to_remove.append(conn)
-
-                for conn in connections_to_remove:
-                    self.connections.remove(conn)
+                    else:
+                        self.canvas.delete(f'conn_{start}_{end}')
+                        self.canvas.delete(f'in_{end}_text')
 
                 self.canvas.delete(f'node_{node.id}')
+                if self.lazy_mode:
+                    self.spatial_grid.remove(node.id)
+                    self.materialized.discard(node.id)
+                in_points, out_points = node_points(node)
+                for point_id in in_points:
+                    self.point_items.pop(('in', point_id), None)
+                for point_id in out_points:
+                    self.point_items.pop(('out', point_id), None)
 
                 if node.type == 'input':
                     out_id = f"0{node.typeid}"
@@ -503,25 +584,25 @@ class FailureSimulator:
                         in_id = f"{node.typeid}{i + 7}"
                         self.canvas.delete(f'in_{in_id}')
                         self.canvas.delete(f'in_{in_id}_text')
-                        for conn in self.connections[:]:
-                            if conn[1] == in_id:
-                                self.canvas.delete(f'conn_{conn[0]}_{in_id}')
-                                self.connections.remove(conn)
                     Node.aggregate_nodes -= 1
+                self.scheme_changed()
                 return
 
         for tag in tags:
             if tag.startswith('conn_'):
                 _, start, end = tag.split('_')
                 self.canvas.delete(f'conn_{start}_{end}')
-                self.canvas.delete(f'text_in_{end}')
-                self.connections.remove((start, end))
+                self.canvas.delete(f'in_{end}_text')
+                self.graph.remove_connection(start, end)
+                self.connection_items.pop((start, end), None)
+                self.scheme_changed()
                 return
             if tag.startswith('internal_conn_in_'):
                 _, _, _, node_id, start, end = tag.split('_')
                 self.canvas.delete(tag)
-                if (start, end) in self.connections:
-                    self.connections.remove((start, end))
+                self.graph.remove_connection(start, end)
+                self.connection_items.pop((start, end), None)
+                self.scheme_changed()
                 return
 
 
@@ -567,7 +648,7 @@ class FailureSimulator:
         Начинает перетаскивание узла.
         :param event: Событие нажатие кнопки мыши
         """
-        clicked_items = self.canvas.find_closest(event.x, event.y)
+        clicked_items = self.canvas.find_closest(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
         if not clicked_items:
             return
 
@@ -582,138 +663,99 @@ class FailureSimulator:
     def update_connections(self, node):
         """
         Обновляет все соединения, связанные с перемещенным узлом.
+        Линии не пересоздаются: у существующих элементов холста меняются только координаты,
+        поэтому теги и окраска отказавших соединений сохраняются.
         :param node: Перемещенный узел
         """
-        for conn in self.connections:
-            start_point, end_point = conn
-
-            if node.type == 'input':
-                input_point = f'0{node.typeid}'
-                should_update = (start_point == input_point or end_point == input_point)
-            else:
-                should_update = (any(start_point == f"{node.typeid}{i}" for i in range(15)) or
-                                 any(end_point == f"{node.typeid}{i}" for i in range(15)))
-
-            if should_update:
-                in_agg = self.get_node_by_point(start_point) != self.get_node_by_point(end_point)
-
-                old_conn_tag = f'conn_{start_point}_{end_point}'
-                old_internal_tag = f'internal_conn_in_{self.get_node_by_point(start_point).id}_{start_point}_{end_point}'
-
-                was_failed = False
-                if in_agg:
-                    old_items = self.canvas.find_withtag(old_conn_tag)
-                else:
-                    old_items = self.canvas.find_withtag(old_internal_tag)
-
-                if old_items:
-                    was_failed = 'failed' in self.canvas.gettags(old_items[0])
-
-                if in_agg:
-                    self.canvas.delete(old_conn_tag)
-                else:
-                    self.canvas.delete(old_internal_tag)
-
-                start_item = self.canvas.find_withtag(f'out_{start_point}')[0]
-                end_item = self.canvas.find_withtag(f'in_{end_point}')[0]
-
-                start_coords = self.canvas.coords(start_item)
-                end_coords = self.canvas.coords(end_item)
-
-                start_x = (start_coords[0] + start_coords[2]) / 2
-                start_y = (start_coords[1] + start_coords[3]) / 2
-                end_x = (end_coords[0] + end_coords[2]) / 2
-                end_y = (end_coords[1] + end_coords[3]) / 2
-
-                new_conn = self.draw_connection(
-                    [start_x, start_y],
-                    [end_x, end_y],
-                    in_agg,
-                    tags=f'conn_{start_point}_{end_point}' if in_agg else
-                    f'internal_conn_in_{self.get_node_by_point(start_point).id}_{start_point}_{end_point}'
-                )
-
-                if was_failed:
-                    self.canvas.addtag_withtag('failed', new_conn)
-                    self.canvas.itemconfig(new_conn, fill='red', width=2)
+        for start_point, end_point, internal in self.graph.incident_connections(node.id):
+            item = self.connection_items.get((start_point, end_point))
+            if item is None:
+                continue
+            self.canvas.coords(item, self.connection_coords(self.point_center(start_point, 'out'),
+                                                            self.point_center(end_point, 'in'),
+                                                            not internal))
 
     def drag(self, event):
         """
         Обрабатывает перетаскивание узла.
+        События перемещения мыши только накапливают смещение; перерисовка выполняется
+        один раз, когда Tk освобождается от обработки событий.
         :param event: Событие перемещения мыши
         """
         if self.connection_mode or self.drag_data["item"] is None:
             return
 
-        dx = event.x - self.drag_data["x"]
-        dy = event.y - self.drag_data["y"]
-
-        node = self.nodes[self.drag_data["item"]]
+        self.drag_data["dx"] += event.x - self.drag_data["x"]
+        self.drag_data["dy"] += event.y - self.drag_data["y"]
+        self.drag_data["x"] = event.x
+        self.drag_data["y"] = event.y
 
-        for item in self.canvas.find_withtag(f'node_{node.id}'):
-            self.canvas.move(item, dx, dy)
+        if self.drag_job is None:
+            self.drag_job = self.root.after_idle(self.redraw_drag)
 
-        if node.type == 'output':
-            in_id = f"{node.typeid}0"
-            for item in self.canvas.find_withtag(f'in_{in_id}'):
-                self.canvas.move(item, dx, dy)
-            for item in self.canvas.find_withtag(f'in_{in_id}_text'):
-                self.canvas.move(item, dx, dy)
-        elif node.type == 'aggregate':
-            for i in range(6):
-                in_id = f"{node.typeid}{i + 7}"
-                for item in self.canvas.find_withtag(f'in_{in_id}'):
-                    self.canvas.move(item, dx, dy)
-                for item in self.canvas.find_withtag(f'in_{in_id}_text'):
-                    self.canvas.move(item, dx, dy)
+    def redraw_drag(self):
+        """
+        Перемещает перетаскиваемый узел на накопленное смещение и обновляет его соединения.
+        """
+        self.drag_job = None
+        if self.drag_data["item"] is None:
+            return
 
-        if node.type == 'input':
-            out_id = f"0{node.typeid}"
-            for item in self.canvas.find_withtag(f'out_{out_id}'):
-                self.canvas.move(item, dx, dy)
-            for item in self.canvas.find_withtag(f'out_{out_id}_text'):
-                self.canvas.move(item, dx, dy)
-        elif node.type == 'aggregate':
-            for i in range(6):
-                out_id = f"{node.typeid}{i + 1}"
-                for item in self.canvas.find_withtag(f'out_{out_id}'):
-                    self.canvas.move(item, dx, dy)
-                for item in self.canvas.find_withtag(f'out_{out_id}_text'):
-                    self.canvas.move(item, dx, dy)
+        dx, dy = self.drag_data["dx"], self.drag_data["dy"]
+        self.drag_data["dx"] = self.drag_data["dy"] = 0
+        if not dx and not dy:
+            return
 
+        node = self.nodes[self.drag_data["item"]]
+        self.canvas.move(f'node_{node.id}', dx, dy)
+        self.canvas.move(f'point_of_{node.id}', dx, dy)
+
+        in_points, out_points = node_points(node)
+        for in_id in in_points:
+            self.canvas.move(f'in_{in_id}_text', dx, dy)
+        for out_id in out_points:
+            self.canvas.move(f'out_{out_id}_text', dx, dy)
+
+        node.x += dx / self.view_scale
+        node.y += dy / self.view_scale
+        if self.lazy_mode:
+            self.spatial_grid.move(node.id, node.x, node.y)
         self.update_connections(node)
 
-        self.drag_data["x"] = event.x
-        self.drag_data["y"] = event.y
-        node.x += dx
-        node.y += dy
-
     def get_internal_connections(self):
         """
         Получает список всех внутренних соединений на схеме сопряжения.
         :return: list: Cписок кортежей (начальная_точка, конечная_точка)
         """
-        internal_connections = []
-        for item in self.canvas.find_all():
-            tags = self.canvas.gettags(item)
-            for tag in tags:
-                if tag.startswith('internal_conn_in_'):
-                    _, _, _, node_id, start_point, end_point = tag.split('_')
-                    start_text = self.get_point_text(start_point, 'out')
-                    end_text = self.get_point_text(end_point, 'in')
-                    internal_connections.append((start_text, end_text))
-        return internal_connections
+        return self.graph.internal_connections()
 
     def show_adjacency_matrix(self):
         """
         Отображает матрицу смежности для текущей схемы сопряжения.
         Создает новое окно с визуализацией связей между точками.
         """
+        from analysis import show_adjacency_matrix
         show_adjacency_matrix(self)
 
     def build_analysis_table(self):
+        from analysis import build_analysis_table
         build_analysis_table(self)
 
+    def show_metrics_panel(self):
+        """
+        Открывает панель мер важности, обновляемую после каждого изменения схемы.
+        """
+        from analysis import show_metrics_panel
+        show_metrics_panel(self)
+
+    def scheme_changed(self):
+        """
+        Сообщает об изменении соединений схемы открытой панели метрик.
+        Сами изменения берутся из журнала графа схемы.
+        """
+        if self.metrics_panel is not None:
+            self.metrics_panel.schedule_refresh()
+
     def build_tree_base(self, connections, is_fta=True):
         """
         Базовая функция для отрисовки деревьев FTA и RCA.
@@ -727,25 +769,45 @@ class FailureSimulator:
             node_colors: Информация о цвете для каждого узла;
             node_sizes: Информация о размере для каждого узла;
         """
-        build_tree_base(self, connections=connections, is_fta=is_fta)
+        from rca_fta import build_tree_base
+        return build_tree_base(self, connections=connections, is_fta=is_fta)
 
     def build_fault_tree(self):
         """
         Строит дерево отказов FTA на основе текущей схемы сопряжения.
         """
+        from rca_fta import build_fault_tree
         build_fault_tree(self)
 
     def build_rca_tree(self):
         """
         Строит дерево анализа коренных причин RCA на основе текущей схемы сопряжения.
         """
+        from rca_fta import build_rca_tree
         build_rca_tree(self)
 
+    def show_minimal_cut_sets(self):
+        """
+        Рассчитывает минимальные сечения дерева отказов и вероятности отказа выходов.
+        """
+        from rca_fta import show_minimal_cut_sets
+        show_minimal_cut_sets(self)
+
+    def show_fault_tree_probability(self):
+        """
+        Рассчитывает точную вероятность отказа по дереву отказов и важность точек.
+        """
+        from rca_fta import show_fault_tree_probability
+        show_fault_tree_probability(self)
+
     def drag_stop(self, event):
         """
         Завершает перетаскивание узла.
         :param event: Событие отпускания кнопки мыши
         """
+        if self.drag_job is not None:
+            self.root.after_cancel(self.drag_job)
+            self.redraw_drag()
         self.drag_data["item"] = None
 
     def add_input_node(self):
@@ -754,6 +816,7 @@ class FailureSimulator:
         """
         node = Node('input', len(self.nodes))
         self.nodes.append(node)
+        self.graph.add_node(node)
         self.draw_node(node)
 
     def add_output_node(self):
@@ -762,6 +825,7 @@ class FailureSimulator:
         """
         node = Node('output', len(self.nodes))
         self.nodes.append(node)
+        self.graph.add_node(node)
         self.draw_node(node)
 
     def add_aggregate(self):
@@ -770,15 +834,18 @@ class FailureSimulator:
         """
         node = Node('aggregate', len(self.nodes))
         self.nodes.append(node)
+        self.graph.add_node(node)
         self.draw_node(node)
 
-    def mark_failed_elements(self, point_id):
+    def mark_failed_elements(self, point_id, kind=None):
         """
         Помечает элементы тегом failed, обозначающим отказ данного элемента системы.
         После выбора изначальной отказавшей точки проверяет распространение отказов.
         :param point_id: ID изначальной отказавшей точки
+        :param kind: 'in' | 'out' - тип точки; если не задан, определяется по графу схемы
+        :return: FailureSet: Отказавшие точки, соединения и элементы
         """
-        mark_failed_elements(self, point_id=point_id)
+        return mark_failed_elements(self, point_id=point_id, kind=kind)
 
     def color_failed_elements(self):
         """
@@ -799,6 +866,36 @@ class FailureSimulator:
         """
         reset_failures(self)
 
+    def show_failure_sweep(self):
+        """
+        Перебирает одиночные отказы всех выходных точек и выводит таблицу областей их распространения.
+        """
+        show_failure_sweep(self)
+
+    def show_single_points_of_failure(self):
+        """
+        Выводит для каждого выхода точки, отказ любой из которых отрезает его от всех входов.
+        """
+        show_single_points_of_failure(self)
+
+    def set_failure_probability(self):
+        """
+        Переводит холст в режим задания вероятности отказа выходной точки.
+        """
+        set_failure_probability(self)
+
+    def set_default_failure_probability(self):
+        """
+        Задает вероятность отказа для всех точек, у которых она не указана явно.
+        """
+        set_default_failure_probability(self)
+
+    def run_monte_carlo(self):
+        """
+        Оценивает вероятности отказа выходов схемы методом Монте-Карло.
+        """
+        run_monte_carlo(self)
+
     def reset_canvas(self):
         """
         Сбрасывает холст в изначальное состояние, очищая схему сопряжения.
@@ -810,26 +907,108 @@ class FailureSimulator:
         Node.aggregate_nodes = 0
 
         self.nodes = []
-        for node in self.nodes:
-            node.deleted = False
-        self.connections = []
+        self.graph.clear()
+        self.point_items = {}
+        self.connection_items = {}
+        self.failure_probabilities = {}
         self.failed_points = set()
         self.connection_mode = False
         self.connection_start = None
         self.selected_node = None
         self.selected_point_type = None
-        self.drag_data = {"x": 0, "y": 0, "item": None}
+        if self.drag_job is not None:
+            self.root.after_cancel(self.drag_job)
+            self.drag_job = None
+        self.drag_data = {"x": 0, "y": 0, "item": None, "dx": 0, "dy": 0}
+        self.failure = None
         self.failure_mode = False
-        self.visited_points = set()
+
+        if self.viewport_job is not None:
+            self.root.after_cancel(self.viewport_job)
+            self.viewport_job = None
+        self.view_scale = 1.0
+        self.materialized = set()
+        if self.lazy_mode:
+            self.spatial_grid = SpatialGrid()
 
         self.root.config(cursor="")
         self.canvas.bind("<Button-1>", self.canvas_click)
+        self.scheme_changed()
+
 
+    def save_scheme(self):
+        """
+        Сохраняет схему сопряжения в файл JSON или в компактный двоичный файл .npz.
+        """
+        path = filedialog.asksaveasfilename(parent=self.root, title="Сохранить схему",
+                                            defaultextension='.json', filetypes=SCHEME_FILE_TYPES)
+        if not path:
+            return
+        try:
+            save_scheme(path, scheme_from_graph(self.graph, self.failure_probabilities,
+                                                self.default_failure_probability))
+        except OSError as error:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить схему: {error}")
+
+    def open_scheme(self):
+        """
+        Открывает схему сопряжения из файла JSON или .npz.
+        """
+        path = filedialog.askopenfilename(parent=self.root, title="Открыть схему", filetypes=SCHEME_FILE_TYPES)
+        if not path:
+            return
+        try:
+            scheme = load_scheme(path)
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as error:
+            messagebox.showerror("Ошибка", f"Не удалось открыть схему: {error}")
+            return
+        self.load_scheme(scheme)
+
+    def load_scheme(self, scheme):
+        """
+        Заменяет текущую схему загруженной. Элементы и соединения создаются на холсте напрямую
+        по сохраненным позициям, без повторения действий пользователя и проверок занятости точек.
+        :param scheme: SchemeData
+        """
+        graph = scheme.build_graph()
+        self.reset_canvas()
+        self.nodes = list(scheme.nodes)
+        self.graph = graph
+        scheme.apply_counters()
+        self.failure_probabilities = dict(scheme.failure_probabilities)
+        self.default_failure_probability = scheme.default_failure_probability
+        self.scheme_changed()
+
+        if len(self.nodes) > LAZY_NODE_THRESHOLD:
+            self.lazy_mode_var.set(True)
+            self.lazy_mode = True
+        if self.lazy_mode:
+            rebuild_viewport(self)
+            return
+
+        for node in self.nodes:
+            self.render_node(node)
+        for out_point, in_point, internal in scheme.connections:
+            if self.graph.has_connection(out_point, in_point):
+                self.render_connection(out_point, in_point, internal)
+
+    def set_lazy_mode(self, enabled):
+        """
+        Включает или выключает отрисовку только видимой области схемы.
+        :param enabled: True - включить режим
+        """
+        set_lazy_mode(self, enabled)
+
+    def reset_view(self):
+        """
+        Возвращает исходный масштаб и положение холста.
+        """
+        reset_view(self)
 
     def run(self):
         self.root.mainloop()
 
 
 if __name__ == "__main__":
-    simulator = FailureSimulator()
+    simulator = FailureSimulator(preload='--no-preload' not in sys.argv)
     simulator.run()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import numpy as np
+from dominators import dominated_counts, source_dominators
+from reachability import importance_measures, reachability_sets, reverse_condensation, strongly_connected_components
+
+BETWEENNESS_EXACT_LIMIT = 2000
+BETWEENNESS_SAMPLES = 500
+INFLUENCE_DAMPING = 0.85
+
+METRIC_COLUMNS = ('I1', 'I2', 'upstream', 'in_degree', 'out_degree', 'centrality',
+                  'betweenness', 'influence', 'dominated')
+
+
+def importance_table(point_labels, adjacency, output_points, betweenness_samples=None, seed=0):
+    """
+    Рассчитывает для каждой точки все меры важности по разреженной матрице смежности.
+    I1 - число выходов системы, на которые влияет точка;
+    I2 - число точек, достижимых из нее (распространение отказа вниз по схеме);
+    upstream - число точек, из которых достижима она (источники ее отказа);
+    in_degree, out_degree, centrality - входящие, исходящие связи и их сумма (степень центральности);
+    betweenness - посредничество: через сколько кратчайших путей между точками она проходит;
+    influence - влияние: PageRank по обращенному графу, отказ распространяется по ребрам вперед;
+    dominated - число точек, отрезаемых от входов схемы при отказе только этой точки.
+    Конденсация графа вычисляется один раз и используется для достижимости в обе стороны.
+    :param point_labels: Подписи точек
+    :param adjacency: SparseAdjacency
+    :param output_points: Подписи точек, подключенных к выходам
+    :param betweenness_samples: Число источников для оценки посредничества; по умолчанию
+                                точный расчет до BETWEENNESS_EXACT_LIMIT точек и выборка больше
+    :param seed: Зерно генератора выборки источников
+    :return: list: Словари с ключами point и METRIC_COLUMNS
+    """
+    successors = adjacency.successor_lists()
+    condensation = strongly_connected_components(successors)
+    measures = importance_measures(point_labels, successors, output_points, condensation)
+    upstream = upstream_counts(successors, condensation)
+    return metric_rows(point_labels, adjacency, measures, upstream,
+                       structural_metrics(adjacency, successors, betweenness_samples, seed))
+
+
+def structural_metrics(adjacency, successors, betweenness_samples=None, seed=0):
+    """
+    Меры, зависящие от всего графа сразу: посредничество, влияние и критичность по доминаторам.
+    :param adjacency: SparseAdjacency
+    :param successors: Списки преемников той же матрицы
+    :return: dict: Имя меры -> значения в порядке точек
+    """
+    return {
+        'betweenness': betweenness(adjacency, betweenness_samples, seed),
+        'influence': influence(adjacency),
+        'dominated': dominance_counts(successors, adjacency.in_degree()),
+    }
+
+
+def metric_rows(point_labels, adjacency, measures, upstream, structural=None):
+    """
+    Собирает строки таблицы мер важности.
+    :param measures: Пары (I1, I2) в порядке точек
+    :param upstream: Числа точек-источников в порядке точек
+    :param structural: Результат structural_metrics; None - только меры достижимости и степени
+    :return: list: Словари с ключами point и METRIC_COLUMNS (без структурных мер, если их нет)
+    """
+    in_degree = adjacency.in_degree()
+    out_degree = adjacency.out_degree()
+
+    metrics = []
+    for i, point in enumerate(point_labels):
+        i1_value, i2_value = measures[i]
+        row = {
+            'point': point,
+            'I1': i1_value,
+            'I2': i2_value,
+            'upstream': upstream[i],
+            'in_degree': int(in_degree[i]),
+            'out_degree': int(out_degree[i]),
+            'centrality': int(out_degree[i] + in_degree[i]),
+        }
+        if structural is not None:
+            row['betweenness'] = float(structural['betweenness'][i])
+            row['influence'] = float(structural['influence'][i])
+            row['dominated'] = structural['dominated'][i]
+        metrics.append(row)
+    return metrics
+
+
+def upstream_counts(successors, condensation):
+    """
+    Число точек, из которых достижима каждая точка (путем длины не меньше 1).
+    Компоненты сильной связности обращенного графа те же, меняется только их порядок.
+    :param successors: Списки преемников
+    :param condensation: Результат strongly_connected_components для successors
+    :return: list: Количества в порядке точек
+    """
+    predecessors = [[] for _ in successors]
+    for vertex, row in enumerate(successors):
+        for following in row:
+            predecessors[following].append(vertex)
+
+    return [reach.bit_count() for reach in reachability_sets(predecessors, reverse_condensation(condensation))]
+
+
+def expand_rows(adjacency, frontier):
+    """
+    Ребра, выходящие из вершин frontier, в виде двух массивов (начала, концы).
+    """
+    starts = adjacency.indptr[frontier]
+    counts = adjacency.indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return frontier[:0], frontier[:0]
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    return np.repeat(frontier, counts), adjacency.indices[offsets]
+
+
+def betweenness(adjacency, samples=None, seed=0):
+    """
+    Посредничество точек по алгоритму Брандеса (без нормировки, как у ориентированного графа).
+    Обход в ширину от каждого источника выполняется по уровням над массивами CSR.
+    Для больших графов источники выбираются случайно, а сумма масштабируется на n / samples.
+    :param adjacency: SparseAdjacency
+    :param samples: Число источников; None - все источники, если точек не больше BETWEENNESS_EXACT_LIMIT
+    :param seed: Зерно генератора выборки
+    :return: np.ndarray: Значения посредничества в порядке точек
+    """
+    size = adjacency.shape[0]
+    result = np.zeros(size)
+    if samples is None:
+        samples = size if size <= BETWEENNESS_EXACT_LIMIT else BETWEENNESS_SAMPLES
+    samples = min(samples, size)
+    if samples == size:
+        sources = np.arange(size)
+    else:
+        sources = np.random.default_rng(seed).choice(size, samples, replace=False)
+
+    for source in sources:
+        distance = np.full(size, -1)
+        distance[source] = 0
+        sigma = np.zeros(size)
+        sigma[source] = 1
+        frontier = np.array([source])
+        levels = []
+        depth = 0
+        while frontier.size:
+            starts, ends = expand_rows(adjacency, frontier)
+            frontier = np.unique(ends[distance[ends] == -1])
+            distance[frontier] = depth + 1
+            on_path = distance[ends] == depth + 1
+            starts, ends = starts[on_path], ends[on_path]
+            sigma += np.bincount(ends, weights=sigma[starts], minlength=size)
+            levels.append((starts, ends))
+            depth += 1
+
+        delta = np.zeros(size)
+        for starts, ends in reversed(levels):
+            delta += np.bincount(starts, weights=sigma[starts] / sigma[ends] * (1 + delta[ends]),
+                                 minlength=size)
+        delta[source] = 0
+        result += delta
+
+    if samples and samples < size:
+        result *= size / samples
+    return result
+
+
+def influence(adjacency, damping=INFLUENCE_DAMPING, tolerance=1e-6, max_iterations=100):
+    """
+    Влияние точек: PageRank по обращенному графу, вычисленный степенным методом.
+    Вес точки складывается из весов зависящих от нее точек, поэтому высокий вес получают
+    точки, отказ которых доходит до многих важных точек. Вес точек без источников
+    распределяется равномерно, сумма весов равна 1.
+    :param adjacency: SparseAdjacency
+    :param damping: Коэффициент затухания
+    :param tolerance: Допустимое изменение весов на одну точку
+    :param max_iterations: Наибольшее число итераций
+    :return: np.ndarray: Веса в порядке точек
+    """
+    size = adjacency.shape[0]
+    if not size:
+        return np.zeros(0)
+    starts = np.repeat(np.arange(size), adjacency.out_degree())
+    ends = adjacency.indices
+    in_degree = adjacency.in_degree()
+    weights = 1 / in_degree[ends]
+    dangling = in_degree == 0
+
+    rank = np.full(size, 1 / size)
+    for _ in range(max_iterations):
+        spread = np.bincount(starts, weights=rank[ends] * weights, minlength=size)
+        updated = damping * (spread + rank[dangling].sum() / size) + (1 - damping) / size
+        converged = np.abs(updated - rank).sum() < size * tolerance
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def dominance_counts(successors, in_degree):
+    """
+    Критичность по дереву доминаторов: число точек, все пути к которым от точек без
+    источников (входов схемы) проходят через данную точку.
+    :param successors: Списки преемников
+    :param in_degree: Число входящих связей точек
+    :return: list: Количества в порядке точек
+    """
+    sources = [vertex for vertex in range(len(successors)) if in_degree[vertex] == 0]
+    idom = source_dominators(successors, sources)
+    return dominated_counts(idom, len(successors))[:len(successors)]
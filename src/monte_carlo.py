@@ -0,0 +1,272 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from reachability import reachability_sets
+
+CHUNK_TRIALS = 1000000
+
+
+class SimulationCancelled(Exception):
+    """
+    Исключение, которым функция progress прерывает моделирование.
+    """
+
+
+class MonteCarloResult:
+    """
+    Результат статистического моделирования отказов.
+    failures[k] - число испытаний, в которых отказал выход k;
+    system_failures - число испытаний, в которых отказал хотя бы один выход.
+    """
+    def __init__(self, output_points, trials, failures, system_failures):
+        self.output_points = output_points
+        self.trials = trials
+        self.failures = failures
+        self.system_failures = system_failures
+
+    def probabilities(self):
+        """
+        :return: np.ndarray: Оценки вероятности отказа каждого выхода
+        """
+        return self.failures / max(self.trials, 1)
+
+    def confidence_intervals(self, z=1.96):
+        """
+        Доверительные интервалы Уилсона для вероятности отказа каждого выхода.
+        :param z: Квантиль нормального распределения (1.96 - 95%)
+        :return: tuple: (нижние границы, верхние границы)
+        """
+        return wilson_interval(self.failures, self.trials, z)
+
+    def system_probability(self, z=1.96):
+        """
+        :return: tuple: (оценка, нижняя граница, верхняя граница) вероятности отказа системы
+        """
+        low, high = wilson_interval(self.system_failures, self.trials, z)
+        return self.system_failures / max(self.trials, 1), low, high
+
+    def merge(self, other):
+        """
+        Объединяет результаты двух серий испытаний одной схемы.
+        :param other: MonteCarloResult
+        :return: MonteCarloResult
+        """
+        return MonteCarloResult(self.output_points, self.trials + other.trials,
+                                self.failures + other.failures,
+                                self.system_failures + other.system_failures)
+
+
+def wilson_interval(failures, trials, z=1.96):
+    """
+    Доверительный интервал Уилсона для доли отказов.
+    :param failures: Число отказов (скаляр или массив)
+    :param trials: Число испытаний
+    :param z: Квантиль нормального распределения
+    :return: tuple: (нижняя граница, верхняя граница)
+    """
+    if trials == 0:
+        return np.zeros_like(failures, dtype=float), np.ones_like(failures, dtype=float)
+    p = np.asarray(failures, dtype=float) / trials
+    denominator = 1 + z ** 2 / trials
+    center = (p + z ** 2 / (2 * trials)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+    return np.clip(center - half_width, 0, 1), np.clip(center + half_width, 0, 1)
+
+
+def influence_matrix(point_labels, successors, output_points):
+    """
+    Строит матрицу влияния точек на выходы по замыканию графа зависимостей.
+    Точки выходов, не входящие в граф (например, вход системы, подключенный напрямую к выходу),
+    добавляются как самостоятельные источники отказа.
+    :param point_labels: Подписи точек графа зависимостей
+    :param successors: Списки преемников
+    :param output_points: Подписи точек, подключенных к выходам
+    :return: tuple: (подписи источников, матрица bool размера источники x выходы)
+    """
+    sources = list(point_labels)
+    label_index = {label: idx for idx, label in enumerate(sources)}
+    for point in output_points:
+        if point not in label_index:
+            label_index[point] = len(sources)
+            sources.append(point)
+
+    reach = reachability_sets(successors)
+    influence = np.zeros((len(sources), len(output_points)), dtype=bool)
+    for k, point in enumerate(output_points):
+        j = label_index[point]
+        influence[j, k] = True
+        for i, mask in enumerate(reach):
+            if mask >> j & 1:
+                influence[i, k] = True
+    return sources, influence
+
+
+def failure_probability_vector(sources, probabilities, default_probability=0.0):
+    """
+    :param sources: Подписи точек
+    :param probabilities: Словарь точка -> вероятность отказа
+    :param default_probability: Вероятность для точек, отсутствующих в словаре
+    :return: np.ndarray: Вероятности отказа в порядке sources
+    """
+    return np.array([probabilities.get(point, default_probability) for point in sources], dtype=float)
+
+
+def run_trials(influence, p, trials, rng, batch_size=None, progress=None):
+    """
+    Выполняет серию испытаний: в каждом точки отказывают независимо с вероятностями p,
+    отказ выхода определяется умножением матрицы отказов на матрицу влияния.
+    :param influence: Матрица влияния (источники x выходы) только для значимых источников
+    :param p: Вероятности отказа значимых источников
+    :param trials: Число испытаний
+    :param rng: np.random.Generator
+    :param batch_size: Число испытаний в одном блоке (по умолчанию ~4 млн ячеек на блок)
+    :param progress: Функция, вызываемая после каждого блока с числом выполненных в нем испытаний
+    :return: tuple: (число отказов каждого выхода, число отказов системы)
+    """
+    n_sources, n_outputs = influence.shape
+    failures = np.zeros(n_outputs, dtype=np.int64)
+    system_failures = 0
+    if n_sources == 0 or trials == 0:
+        return failures, system_failures
+
+    if batch_size is None:
+        batch_size = max(1, (1 << 22) // n_sources)
+    weights = influence.astype(np.float32)
+
+    done = 0
+    while done < trials:
+        batch = min(batch_size, trials - done)
+        failed = rng.random((batch, n_sources)) < p
+        failed_outputs = failed.astype(np.float32) @ weights > 0
+        failures += failed_outputs.sum(axis=0)
+        system_failures += int(failed_outputs.any(axis=1).sum())
+        done += batch
+        if progress is not None:
+            progress(batch)
+    return failures, system_failures
+
+
+def chunk_plan(trials, seed, chunk_trials=CHUNK_TRIALS):
+    """
+    Делит испытания на блоки фиксированного размера и выдает каждому блоку свой поток случайных чисел.
+    Разбиение не зависит от числа процессов, поэтому суммарный результат воспроизводится бит в бит.
+    :param trials: Общее число испытаний
+    :param seed: Начальное значение генератора
+    :param chunk_trials: Число испытаний в блоке
+    :return: list: Пары (число испытаний, np.random.SeedSequence)
+    """
+    sizes = [chunk_trials] * (trials // chunk_trials)
+    if trials % chunk_trials:
+        sizes.append(trials % chunk_trials)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(sizes, seeds))
+
+
+def prepare_trials(point_labels, successors, output_points, probabilities, default_probability=0.0):
+    """
+    Строит матрицу влияния и вектор вероятностей, оставляя только источники,
+    которые могут отказать и влияют хотя бы на один выход.
+    :return: tuple: (матрица влияния, вероятности отказа)
+    """
+    sources, influence = influence_matrix(point_labels, successors, output_points)
+    p = failure_probability_vector(sources, probabilities, default_probability)
+    relevant = influence.any(axis=1) & (p > 0)
+    return np.ascontiguousarray(influence[relevant]), np.ascontiguousarray(p[relevant])
+
+
+def simulate(point_labels, successors, output_points, probabilities, trials,
+             default_probability=0.0, seed=None, workers=1, chunk_trials=CHUNK_TRIALS, progress=None):
+    """
+    Оценивает вероятность отказа каждого выхода методом Монте-Карло.
+    Отказ распространяется так же, как в mark_failed_elements: выход отказывает,
+    если отказала хотя бы одна точка, от которой он зависит.
+    :param point_labels: Подписи точек графа зависимостей
+    :param successors: Списки преемников
+    :param output_points: Подписи точек, подключенных к выходам
+    :param probabilities: Словарь точка -> вероятность отказа
+    :param trials: Число испытаний
+    :param default_probability: Вероятность отказа точек, отсутствующих в словаре
+    :param seed: Начальное значение генератора случайных чисел
+    :param workers: Число процессов; при одинаковом seed результат не зависит от этого числа
+    :param chunk_trials: Число испытаний в одном независимом блоке
+    :param progress: Функция, вызываемая с числом испытаний, выполненных с прошлого вызова
+                     (в одном процессе - после каждого пакета, в нескольких - после каждого блока);
+                     исключение SimulationCancelled из нее прерывает моделирование
+    :return: MonteCarloResult
+    """
+    influence, p = prepare_trials(point_labels, successors, output_points, probabilities, default_probability)
+    plan = chunk_plan(trials, seed, chunk_trials)
+
+    if workers is None or workers > 1:
+        failures, system_failures = run_parallel(influence, p, plan, workers, progress)
+    else:
+        failures = np.zeros(influence.shape[1], dtype=np.int64)
+        system_failures = 0
+        for size, seed_sequence in plan:
+            chunk_failures, chunk_system = run_trials(influence, p, size, np.random.default_rng(seed_sequence),
+                                                      progress=progress)
+            failures += chunk_failures
+            system_failures += chunk_system
+    return MonteCarloResult(list(output_points), trials, failures, system_failures)
+
+
+def run_parallel(influence, p, plan, workers=None, progress=None):
+    """
+    Распределяет блоки испытаний по процессам. Матрица влияния и вероятности передаются
+    процессам через разделяемую память, а не копируются в каждую задачу.
+    :param influence: Матрица влияния значимых источников
+    :param p: Вероятности отказа значимых источников
+    :param plan: Блоки испытаний из chunk_plan
+    :param workers: Число процессов (по умолчанию - число ядер)
+    :param progress: Функция, вызываемая после каждого блока с числом его испытаний; если она
+                     выбрасывает исключение, еще не начатые блоки отменяются
+    :return: tuple: (число отказов каждого выхода, число отказов системы)
+    """
+    failures = np.zeros(influence.shape[1], dtype=np.int64)
+    system_failures = 0
+    if not plan:
+        return failures, system_failures
+
+    # Вероятности (float64) лежат в начале блока, чтобы быть выровненными; матрице bool выравнивание не нужно
+    shm = shared_memory.SharedMemory(create=True, size=max(1, p.nbytes + influence.nbytes))
+    try:
+        np.ndarray(p.shape, dtype=float, buffer=shm.buf)[:] = p
+        np.ndarray(influence.shape, dtype=bool, buffer=shm.buf, offset=p.nbytes)[:] = influence
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=_attach_shared_trials,
+                                 initargs=(shm.name, influence.shape)) as pool:
+            futures = [pool.submit(_run_shared_chunk, chunk) for chunk in plan]
+            try:
+                for future, (size, _) in zip(futures, plan):
+                    chunk_failures, chunk_system = future.result()
+                    failures += chunk_failures
+                    system_failures += chunk_system
+                    if progress is not None:
+                        progress(size)
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        shm.close()
+        shm.unlink()
+    return failures, system_failures
+
+
+_shared_trials = {}
+
+
+def _attach_shared_trials(name, shape):
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    p = np.ndarray((shape[0],), dtype=float, buffer=shm.buf)
+    influence = np.ndarray(shape, dtype=bool, buffer=shm.buf, offset=p.nbytes)
+    _shared_trials.update(shm=shm, influence=influence, p=p)
+
+
+def _run_shared_chunk(chunk):
+    size, seed_sequence = chunk
+    return run_trials(_shared_trials['influence'], _shared_trials['p'], size,
+                      np.random.default_rng(seed_sequence))
@@ -0,0 +1,161 @@
+from collections import deque
+from dominators import dominator_chain, source_dominators
+from reachability import closure_masks, label_graph, reachability_sets, strongly_connected_components
+
+
+class FailureSet:
+    """
+    Результат распространения отказа по схеме сопряжения.
+    points - точки (тип, ID), до которых дошел отказ;
+    edges - отказавшие соединения (выходная_точка, входная_точка);
+    nodes - ID элементов, которым принадлежат посещенные точки.
+    """
+    def __init__(self, origin):
+        self.origin = origin
+        self.points = set()
+        self.edges = set()
+        self.nodes = set()
+        self.visited = set()
+
+
+def build_successor_index(graph):
+    """
+    Строит для каждой точки графа список (индекс_соединения, следующая_точка), по которым распространяется отказ.
+    Отказ выходной точки переходит по внешним соединениям на входные точки других элементов,
+    отказ входной точки - на все выходные точки, соединенные с ней (внутренние соединения и источник).
+    :param graph: SchemeGraph
+    :return: list: Списки преемников, индексированные номером точки
+    """
+    successors = [[] for _ in graph.points]
+    for edge_idx, edge in enumerate(graph.edges):
+        if edge is None:
+            continue
+        start, end, internal = edge
+        successors[end].append((edge_idx, start))
+        if not internal:
+            successors[start].append((edge_idx, end))
+    return successors
+
+
+def propagate_failure(graph, point_id, kind='out'):
+    """
+    Находит все элементы схемы, до которых распространяется отказ заданной точки.
+    Обход выполняется итеративно (очередь), поэтому глубина цепочек не ограничена стеком вызовов.
+    :param graph: SchemeGraph
+    :param point_id: ID изначальной отказавшей точки
+    :param kind: 'in' | 'out' - тип изначальной точки
+    :return: FailureSet
+    """
+    failure = FailureSet((kind, point_id))
+    origin = graph.point_index.get((kind, point_id))
+    if origin is None:
+        return failure
+
+    successors = graph.cached('successors', build_successor_index)
+    points = graph.points
+    edges = graph.edges
+    visited = failure.visited
+
+    visited.add(origin)
+    queue = deque([origin])
+    while queue:
+        current = queue.popleft()
+        for edge_idx, following in successors[current]:
+            edge = edges[edge_idx]
+            failure.edges.add((points[edge[0]][1], points[edge[1]][1]))
+            failure.points.add(points[following])
+            if following not in visited:
+                visited.add(following)
+                queue.append(following)
+
+    for idx in visited:
+        node_id = graph.point_owner[idx]
+        if node_id is not None:
+            failure.nodes.add(node_id)
+    return failure
+
+
+def sweep_failures(graph):
+    """
+    Перебирает одиночные отказы всех выходных точек схемы, как если бы каждую из них
+    по очереди выбрали в режиме установки отказа.
+    Вместо повторного обхода для каждой точки используется одно замыкание графа распространения
+    с битовыми масками точек, соединений, элементов и выходов.
+    :param graph: SchemeGraph
+    :return: list: Словари с ключами point, node, points, edges, nodes, outputs
+    """
+    successors = graph.cached('successors', build_successor_index)
+    plain_successors = [[following for _, following in row] for row in successors]
+
+    node_bits = {node_id: bit for bit, node_id in enumerate(graph.nodes)}
+    output_nodes = [node for node in graph.nodes.values() if node.type == 'output']
+    output_bits = {node.id: bit for bit, node in enumerate(output_nodes)}
+
+    node_masks = []
+    output_masks = []
+    edge_masks = []
+    for idx, row in enumerate(successors):
+        node_id = graph.point_owner[idx]
+        node_masks.append(1 << node_bits[node_id] if node_id in node_bits else 0)
+        output_masks.append(1 << output_bits[node_id] if node_id in output_bits else 0)
+        edge_mask = 0
+        for edge_idx, _ in row:
+            edge_mask |= 1 << edge_idx
+        edge_masks.append(edge_mask)
+
+    condensation = strongly_connected_components(plain_successors)
+    reach = reachability_sets(plain_successors, condensation)
+    nodes_closure = closure_masks(plain_successors, node_masks, condensation)
+    outputs_closure = closure_masks(plain_successors, output_masks, condensation)
+    edges_closure = closure_masks(plain_successors, edge_masks, condensation)
+
+    rows = []
+    for idx, (kind, point_id) in enumerate(graph.points):
+        node_id = graph.point_owner[idx]
+        if kind != 'out' or node_id is None:
+            continue
+        outputs = outputs_closure[idx]
+        rows.append({
+            'point': point_id,
+            'node': graph.nodes[node_id],
+            'points': reach[idx].bit_count(),
+            'edges': edges_closure[idx].bit_count(),
+            'nodes': nodes_closure[idx].bit_count(),
+            'outputs': [node for node in output_nodes if outputs >> output_bits[node.id] & 1],
+        })
+    return rows
+
+
+def single_points_of_failure(graph):
+    """
+    Находит для каждого выхода схемы единичные точки отказа: точки, отказ только одной из которых
+    отрезает выход от всех входов. Это доминаторы точки выхода в графе зависимостей точек
+    с фиктивным корнем над точками входов, поэтому один проход алгоритма Ленгауэра - Тарьяна
+    дает точный ответ сразу для всех выходов вместо перебора отказов каждой точки.
+    :param graph: SchemeGraph
+    :return: list: Словари с ключами output (выходной элемент), point (подпись его входной точки),
+             connected (есть ли путь от входов) и spof (точки от входов к выходу, включая point)
+    """
+    point_labels, label_index, successors = label_graph(graph.internal_connections())
+    sources = [idx for idx, label in enumerate(point_labels)
+               if is_input_point(graph, label)]
+    root = len(successors)
+    idom = source_dominators(successors, sources)
+
+    rows = []
+    for node, label in graph.output_sources():
+        idx = label_index.get(label)
+        if idx is None:
+            connected = is_input_point(graph, label)
+            spof = [label] if connected else []
+        else:
+            connected = idom[idx] is not None
+            spof = [point_labels[dominator] for dominator in dominator_chain(idom, idx, root)] + [label] \
+                if connected else []
+        rows.append({'output': node, 'point': label, 'connected': connected, 'spof': spof})
+    return rows
+
+
+def is_input_point(graph, point_id):
+    node = graph.node_by_point(point_id, 'out')
+    return node is not None and node.type == 'input'
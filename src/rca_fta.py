@@ -1,7 +1,13 @@
-import networkx as nx
 import tkinter as tk
-import matplotlib.pyplot as plt
-from tkinter import messagebox
+from matplotlib.backend_bases import FigureCanvasBase
+from matplotlib.figure import Figure
+from tkinter import messagebox, ttk
+from bdd import ORDER_HEURISTICS, FaultTreeBDD
+from fault_tree import SYSTEM_EVENT, FaultTree, mask_points
+from tree_view import TreeRenderer
+from trees import TreeCache, build_tree_structure, topology_key
+
+GATE_NAMES = {'ИЛИ (отказ любого источника)': 'or', 'И (отказ всех источников)': 'and'}
 
 def build_tree_base(simulator, connections, is_fta=True):
     """
@@ -16,204 +22,96 @@ def build_tree_base(simulator, connections, is_fta=True):
         node_colors: Информация о цвете для каждого узла;
         node_sizes: Информация о размере для каждого узла;
     """
-    G = nx.DiGraph()
-
-    for start, end in connections:
-        G.add_edge(start, end)
-
-    if is_fta:
-        root_nodes = [node for node in G.nodes() if G.in_degree(node) == 0]
-
-        if not root_nodes:
-            messagebox.showinfo("Информация", "Не найдены корневые узлы для построения дерева отказов")
-            return None, None, None, None
-
-        system_node = "System"
-        for root in root_nodes:
-            G.add_edge(system_node, root)
-
-        start_nodes = [system_node]
-        initial_level = 0
-    else:
-        leaf_nodes = [node for node in G.nodes() if G.out_degree(node) == 0]
-
-        system_node = None
-        root_nodes = []
-
-        vlk_nodes = {}
-        non_leaf_nodes = [node for node in G.nodes() if node not in leaf_nodes]
-
-        for node in non_leaf_nodes:
-            node_obj = simulator.get_node_by_point(node)
-            if node_obj:
-                vlk_name = f"ВЛК_{node_obj.typeid}"
-                vlk_nodes[vlk_name] = node
-
-                G.add_node(vlk_name)
-                G.add_edge(node, vlk_name)
-
-        start_nodes = list(G.nodes())
-        initial_level = 0
-
-    levels = {}
-
-    if is_fta:
-        queue = [(system_node, initial_level)]
-        visited = {system_node}
-
-        while queue:
-            node, level = queue.pop(0)
-            levels[node] = level
-
-            for successor in G.successors(node):
-                if successor not in visited:
-                    visited.add(successor)
-                    queue.append((successor, level + 1))
-    else:
-        for node in G.nodes():
-            if node in vlk_nodes.keys():
-                parent = vlk_nodes[node]
-                if parent in levels:
-                    levels[node] = levels[parent] + 1
-                else:
-                    levels[node] = 0
-            else:
-                max_distance = 0
-                for leaf in leaf_nodes:
-                    try:
-                        path = nx.shortest_path(G, node, leaf)
-                        max_distance = max(max_distance, len(path) - 1)
-                    except nx.NetworkXNoPath:
-                        pass
-
-                levels[node] = max_distance
-
-    changed = True
-    while changed:
-        changed = False
-        for u, v in G.edges():
-            if is_fta:
-                if levels[u] >= levels[v]:
-                    levels[v] = levels[u] + 1
-                    changed = True
-            else:
-                if levels[u] <= levels[v] and v not in vlk_nodes:
-                    levels[u] = levels[v] + 1
-                    changed = True
-
-    if not is_fta:
-        max_level = max(levels.values()) if levels else 0
-        for node in levels:
-            levels[node] = max_level - levels[node]
-
-        for vlk_name, parent in vlk_nodes.items():
-            levels[vlk_name] = levels[parent] + 1
-
-    nodes_by_level = {}
-    for node, level in levels.items():
-        if level not in nodes_by_level:
-            nodes_by_level[level] = []
-        nodes_by_level[level].append(node)
-
-    pos = {}
-    max_level = max(levels.values()) if levels else 0
-
-    for level in range(max_level + 1):
-        nodes = nodes_by_level.get(level, [])
-
-        if not is_fta and 'vlk_nodes' in locals():
-            vlk_nodes_at_level = [n for n in nodes if n in vlk_nodes.keys()]
-            regular_nodes = [n for n in nodes if n not in vlk_nodes.keys()]
-
-            n_regular = len(regular_nodes)
-            for i, node in enumerate(regular_nodes):
-                x_pos = (i - (n_regular - 1) / 2) * 3
-                pos[node] = (x_pos, -level * 2)
-
-            for vlk_name in vlk_nodes_at_level:
-                parent = vlk_nodes[vlk_name]
-                parent_pos = pos.get(parent)
-                if parent_pos:
-                    pos[vlk_name] = (parent_pos[0] + 0.8, -level * 2)
-        else:
-            n_nodes = len(nodes)
-
-            if level > 0 and n_nodes > 1:
-                def get_parent_avg_x(node):
-                    parents = [p for p in G.predecessors(node) if p in pos]
-                    if parents:
-                        return sum(pos[p][0] for p in parents) / len(parents)
-                    return 0
-
-                nodes.sort(key=get_parent_avg_x)
-
-            for i, node in enumerate(nodes):
-                x_pos = (i - (n_nodes - 1) / 2) * 3
-                pos[node] = (x_pos, -level * 2)
-
-    node_colors = []
-    node_sizes = []
-
-    for node in G.nodes():
-        if is_fta:
-            if node == system_node:
-                node_colors.append('lightgreen')
-                node_sizes.append(3000)
-            elif node in root_nodes:
-                node_colors.append('lightcoral')
-                node_sizes.append(2000)
-            else:
-                node_colors.append('lightblue')
-                node_sizes.append(2000)
-        else:  # RCA
-            if 'vlk_nodes' in locals() and node in vlk_nodes.keys():
-                node_colors.append('lightyellow')
-                node_sizes.append(1500)
-            elif node in leaf_nodes:
-                node_colors.append('lightgreen')
-                node_sizes.append(2000)
-            else:
-                node_colors.append('lightblue')
-                node_sizes.append(2000)
-
+    G, pos, node_colors, node_sizes = build_tree_structure(simulator.graph, connections, is_fta)
+    report_tree_problems(G, is_fta)
     return G, pos, node_colors, node_sizes
 
 
+def tree_structure(simulator, is_fta):
+    """
+    Структура дерева текущей схемы из кэша simulator.tree_cache (trees.TreeCache, создается
+    при первом обращении).
+    Соединения и ключ topology_key запоминаются в graph.cached до следующего изменения графа
+    схемы, поэтому повторный запрос неизменившейся схемы не перебирает даже соединения.
+    :param is_fta: True для FTA, False для RCA
+    :return: tuple: (ключ topology_key, (G, pos, node_colors, node_sizes) как у build_tree_structure)
+    """
+    def topology(graph):
+        connections = graph.internal_connections()
+        return topology_key(graph, connections, is_fta), connections
+
+    if simulator.tree_cache is None:
+        simulator.tree_cache = TreeCache()
+    graph = simulator.graph
+    key, connections = graph.cached(('tree_topology', is_fta), topology)
+    return key, simulator.tree_cache.get(key, lambda: build_tree_structure(graph, connections, is_fta))
+
+
+def report_tree_problems(G, is_fta):
+    """
+    Сообщает, что дерево отказов не построено из-за отсутствия корневых узлов или что в схеме есть циклы.
+    """
+    if is_fta and G is None:
+        messagebox.showinfo("Информация", "Не найдены корневые узлы для построения дерева отказов")
+    elif G is not None and G.graph['cycles']:
+        show_cycles_warning(G.graph['cycles'])
+
+
+def show_cycles_warning(cycles, limit=10):
+    """
+    Сообщает о циклах в схеме: точки одного цикла размещаются в дереве на одном уровне.
+    :param cycles: Списки точек циклов
+    :param limit: Наибольшее число перечисляемых циклов
+    """
+    lines = [' -> '.join(cycle) for cycle in cycles[:limit]]
+    if len(cycles) > limit:
+        lines.append(f'... и еще {len(cycles) - limit}')
+    messagebox.showwarning("Циклы в схеме",
+                           f"В схеме найдены циклы ({len(cycles)}), их точки размещены на одном уровне:\n"
+                           + '\n'.join(lines))
+
+
 def build_fault_tree(simulator):
     """
     Строит дерево отказов FTA на основе текущей схемы сопряжения.
     """
-    connections = simulator.get_internal_connections()
-    G, pos, node_colors, node_sizes = build_tree_base(simulator=simulator, connections=connections, is_fta=True)
-
-    if G is None:
-        return
+    show_tree_window(simulator, is_fta=True, title="Дерево отказов FTA")
 
-    plt.figure(figsize=(16, 12))
 
-    nx.draw_networkx_edges(G, pos=pos,
-                           arrows=True,
-                           arrowstyle='-|>',
-                           arrowsize=10,
-                           width=2,
-                           edge_color='black')
+def build_rca_tree(simulator):
+    """
+    Строит дерево анализа коренных причин RCA на основе текущей схемы сопряжения.
+    """
+    show_tree_window(simulator, is_fta=False, title="Дерево анализа коренных причин RCA")
 
-    nx.draw_networkx_nodes(G, pos=pos,
-                           node_color=node_colors,
-                           node_size=node_sizes)
 
-    nx.draw_networkx_labels(G, pos=pos,
-                            font_size=10,
-                            font_weight='bold')
+def show_tree_window(simulator, is_fta, title):
+    """
+    Открывает окно дерева FTA или RCA. Дерево рисуется TreeRenderer пакетными коллекциями,
+    панорамирование - панелью инструментов matplotlib, масштаб - также колесом мыши.
+    Если окно с деревом неизменившейся схемы уже открыто, оно поднимается вместо создания нового.
+    :param is_fta: True для FTA, False для RCA
+    :param title: Заголовок окна
+    """
+    renderer = tree_renderer(simulator, is_fta)
+    if renderer is None:
+        return
 
-    plt.axis('off')
+    tree_window = simulator.tree_windows.get(is_fta)
+    if tree_window is not None and tree_window.renderer is renderer:
+        tree_window.deiconify()
+        tree_window.lift()
+        return
 
     tree_window = tk.Toplevel(simulator.root)
-    tree_window.title("Дерево отказов FTA")
+    tree_window.title(title)
     tree_window.geometry("1200x900")
+    tree_window.renderer = renderer
+    tree_window.protocol("WM_DELETE_WINDOW", lambda: close_tree_window(simulator, is_fta, tree_window))
+    simulator.tree_windows[is_fta] = tree_window
 
     from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    canvas = FigureCanvasTkAgg(plt.gcf(), master=tree_window)
+    canvas = FigureCanvasTkAgg(renderer.ax.figure, master=tree_window)
     canvas.draw()
     canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
@@ -223,45 +121,163 @@ def build_fault_tree(simulator):
     canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
 
-def build_rca_tree(simulator):
+def tree_renderer(simulator, is_fta):
     """
-    Строит дерево анализа коренных причин RCA на основе текущей схемы сопряжения.
+    Возвращает TreeRenderer дерева FTA или RCA в собственной фигуре matplotlib.Figure (без pyplot,
+    поэтому фигура не удерживается глобальным состоянием и освобождается вместе с окном).
+    Последняя фигура каждого дерева хранится в simulator.tree_figures вместе с ключом
+    topology_key и используется повторно, пока топология схемы не изменилась.
+    :param is_fta: True для FTA, False для RCA
+    :return: TreeRenderer или None, если дерево не построено
     """
-    connections = simulator.get_internal_connections()
-    G, pos, node_colors, node_sizes = build_tree_base(simulator=simulator, connections=connections, is_fta=False)
+    key, (G, pos, node_colors, node_sizes) = tree_structure(simulator, is_fta)
+    cached = simulator.tree_figures.get(is_fta)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    simulator.tree_figures.pop(is_fta, None)
 
+    report_tree_problems(G, is_fta)
     if G is None:
-        return
-
-    plt.figure(figsize=(16, 12))
+        return None
 
-    nx.draw_networkx_edges(G, pos=pos,
-                           arrows=True,
-                           arrowstyle='-|>',
-                           arrowsize=10,
-                           width=2,
-                           edge_color='black')
+    figure = Figure(figsize=(16, 12))
+    renderer = TreeRenderer(figure.add_axes([0, 0, 1, 1]), G, pos, node_colors, node_sizes)
+    simulator.tree_figures[is_fta] = (key, renderer)
+    return renderer
 
-    nx.draw_networkx_nodes(G, pos=pos,
-                           node_color=node_colors,
-                           node_size=node_sizes)
 
-    nx.draw_networkx_labels(G, pos=pos,
-                            font_size=10,
-                            font_weight='bold')
-
-    plt.axis('off')
+def close_tree_window(simulator, is_fta, tree_window):
+    """
+    Закрывает окно дерева и отвязывает фигуру от холста Tk (вместе с ним освобождаются растр
+    и изображение окна). Фигура, которой нет в кэше (схема с тех пор изменилась), очищается.
+    """
+    renderer = tree_window.renderer
+    tree_window.renderer = None
+    tree_window.destroy()
+    if simulator.tree_windows.get(is_fta) is tree_window:
+        del simulator.tree_windows[is_fta]
 
-    tree_window = tk.Toplevel(simulator.root)
-    tree_window.title("Дерево анализа коренных причин RCA")
-    tree_window.geometry("1200x900")
+    figure = renderer.ax.figure
+    FigureCanvasBase(figure)
+    cached = simulator.tree_figures.get(is_fta)
+    if cached is None or cached[1] is not renderer:
+        figure.clear()
 
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    canvas = FigureCanvasTkAgg(plt.gcf(), master=tree_window)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-    from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-    toolbar = NavigationToolbar2Tk(canvas, tree_window)
-    toolbar.update()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
\ No newline at end of file
+def show_minimal_cut_sets(simulator):
+    """
+    Открывает окно расчета минимальных сечений дерева отказов для каждого выхода схемы
+    и оценки вероятности головного события по заданным вероятностям отказа точек.
+    """
+    window = tk.Toplevel(simulator.root)
+    window.title("Минимальные сечения FTA")
+    window.geometry("700x600")
+
+    controls = ttk.Frame(window)
+    controls.pack(fill=tk.X, padx=5, pady=5)
+
+    ttk.Label(controls, text='Вентиль:').pack(side=tk.LEFT)
+    gate_var = tk.StringVar(value=next(iter(GATE_NAMES)))
+    ttk.Combobox(controls, textvariable=gate_var, values=list(GATE_NAMES), state='readonly',
+                 width=28).pack(side=tk.LEFT, padx=5)
+    ttk.Label(controls, text='Макс. порядок:').pack(side=tk.LEFT)
+    order_var = tk.IntVar(value=4)
+    ttk.Spinbox(controls, from_=1, to=8, textvariable=order_var, width=4).pack(side=tk.LEFT, padx=5)
+
+    table = ttk.Treeview(window)
+    table['columns'] = ('order', 'probability')
+    table.column('#0', width=400, minwidth=150)
+    table.column('order', width=80, minwidth=50, anchor=tk.CENTER)
+    table.column('probability', width=150, minwidth=80, anchor=tk.CENTER)
+    table.heading('#0', text='Событие / сечение', anchor=tk.CENTER)
+    table.heading('order', text='Порядок', anchor=tk.CENTER)
+    table.heading('probability', text='Вероятность', anchor=tk.CENTER)
+
+    def calculate():
+        table.delete(*table.get_children())
+        output_sources = simulator.graph.output_sources()
+        fault_tree = FaultTree(simulator.get_internal_connections(), gate=GATE_NAMES[gate_var.get()],
+                               extra_points=[label for _, label in output_sources])
+        p = fault_tree.probability_vector(simulator.failure_probabilities,
+                                          simulator.default_failure_probability)
+        max_order = order_var.get()
+
+        tops = [(f'Выход {node.typeid} ({label})', label) for node, label in output_sources]
+        tops.append(('Система', SYSTEM_EVENT))
+        for title, top in tops:
+            cut_sets = fault_tree.cut_sets(top, max_order)
+            parent = table.insert('', tk.END, text=title,
+                                  values=(len(cut_sets), f'{fault_tree.top_event_probability(cut_sets, p):.6g}'))
+            for mask in cut_sets[:1000]:
+                table.insert(parent, tk.END, text=', '.join(mask_points(mask, fault_tree.labels)),
+                             values=(mask.bit_count(), f'{fault_tree.cut_set_probability(mask, p):.6g}'))
+            if len(cut_sets) > 1000:
+                table.insert(parent, tk.END, text=f'... еще {len(cut_sets) - 1000}', values=('', ''))
+
+    ttk.Button(controls, text='Рассчитать', command=calculate).pack(side=tk.LEFT, padx=5)
+    table.pack(fill=tk.BOTH, expand=True)
+    calculate()
+
+
+def show_fault_tree_probability(simulator):
+    """
+    Открывает окно точного расчета вероятности головного события дерева отказов
+    и важности Бирнбаума всех точек. Расчет выполняется по BDD функции структуры дерева,
+    без перебора минимальных сечений.
+    """
+    window = tk.Toplevel(simulator.root)
+    window.title("Вероятность и важность FTA (BDD)")
+    window.geometry("700x600")
+
+    controls = ttk.Frame(window)
+    controls.pack(fill=tk.X, padx=5, pady=5)
+
+    output_sources = simulator.graph.output_sources()
+    tops = {f'Выход {node.typeid} ({label})': label for node, label in output_sources}
+    tops['Система'] = SYSTEM_EVENT
+
+    ttk.Label(controls, text='Вентиль:').pack(side=tk.LEFT)
+    gate_var = tk.StringVar(value=next(iter(GATE_NAMES)))
+    ttk.Combobox(controls, textvariable=gate_var, values=list(GATE_NAMES), state='readonly',
+                 width=28).pack(side=tk.LEFT, padx=5)
+    ttk.Label(controls, text='Событие:').pack(side=tk.LEFT)
+    top_var = tk.StringVar(value='Система')
+    ttk.Combobox(controls, textvariable=top_var, values=list(tops), state='readonly',
+                 width=18).pack(side=tk.LEFT, padx=5)
+
+    summary = ttk.Label(window)
+    summary.pack(fill=tk.X, padx=5)
+
+    table = ttk.Treeview(window)
+    table['columns'] = ('probability', 'birnbaum', 'criticality')
+    table.column('#0', width=150, minwidth=80)
+    for column in table['columns']:
+        table.column(column, width=150, minwidth=80, anchor=tk.CENTER)
+    table.heading('#0', text='Точка', anchor=tk.CENTER)
+    table.heading('probability', text='P отказа', anchor=tk.CENTER)
+    table.heading('birnbaum', text='Важность Бирнбаума', anchor=tk.CENTER)
+    table.heading('criticality', text='Критичность', anchor=tk.CENTER)
+
+    def calculate():
+        table.delete(*table.get_children())
+        top = tops[top_var.get()]
+        fault_tree = FaultTree(simulator.get_internal_connections(), gate=GATE_NAMES[gate_var.get()],
+                               extra_points=[label for _, label in output_sources])
+        p = fault_tree.probability_vector(simulator.failure_probabilities,
+                                          simulator.default_failure_probability)
+        diagram = FaultTreeBDD(fault_tree, [label for _, label in output_sources], ORDER_HEURISTICS[0])
+        top_probability = diagram.probability(top, p)
+        importance = diagram.birnbaum(top, p)
+        summary.config(text=f'P({top_var.get()}) = {top_probability:.6g}, '
+                            f'узлов BDD: {len(diagram.bdd.level)}')
+
+        rows = sorted(importance.items(), key=lambda item: (-item[1], item[0]))
+        for label, birnbaum in rows:
+            point_probability = p[fault_tree.label_index[label]]
+            criticality = birnbaum * point_probability / top_probability if top_probability else 0.0
+            table.insert('', tk.END, text=label,
+                         values=(f'{point_probability:.6g}', f'{birnbaum:.6g}', f'{criticality:.6g}'))
+
+    ttk.Button(controls, text='Рассчитать', command=calculate).pack(side=tk.LEFT, padx=5)
+    table.pack(fill=tk.BOTH, expand=True)
+    calculate()
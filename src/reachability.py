@@ -0,0 +1,173 @@
+def label_graph(internal_connections):
+    """
+    Строит граф зависимостей точек по списку внутренних соединений.
+    Направление ребер совпадает с матрицей смежности: от источника к зависящей от него точке.
+    :param internal_connections: Список кортежей (начальная_точка, конечная_точка)
+    :return: tuple: (отсортированный список точек, словарь точка -> индекс, списки преемников)
+    """
+    all_points = set()
+    for start, end in internal_connections:
+        all_points.add(start)
+        all_points.add(end)
+
+    point_labels = sorted(all_points)
+    label_index = {label: idx for idx, label in enumerate(point_labels)}
+
+    successors = [[] for _ in point_labels]
+    seen = set()
+    for start, end in internal_connections:
+        edge = (label_index[end], label_index[start])
+        if edge not in seen:
+            seen.add(edge)
+            successors[edge[0]].append(edge[1])
+    return point_labels, label_index, successors
+
+
+def strongly_connected_components(successors):
+    """
+    Находит компоненты сильной связности итеративным алгоритмом Тарьяна.
+    Компоненты возвращаются в обратном топологическом порядке: каждая компонента
+    идет после всех компонент, достижимых из нее.
+    :param successors: Списки преемников вершин
+    :return: tuple: (номер компоненты для каждой вершины, список компонент)
+    """
+    size = len(successors)
+    index = [-1] * size
+    lowlink = [0] * size
+    on_stack = [False] * size
+    component = [-1] * size
+    components = []
+    stack = []
+    counter = 0
+
+    for root in range(size):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            vertex, child = work[-1]
+            if child == 0:
+                index[vertex] = lowlink[vertex] = counter
+                counter += 1
+                stack.append(vertex)
+                on_stack[vertex] = True
+
+            vertex_successors = successors[vertex]
+            while child < len(vertex_successors):
+                following = vertex_successors[child]
+                child += 1
+                if index[following] == -1:
+                    work[-1] = (vertex, child)
+                    work.append((following, 0))
+                    break
+                if on_stack[following]:
+                    lowlink[vertex] = min(lowlink[vertex], index[following])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[vertex])
+                if lowlink[vertex] == index[vertex]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = len(components)
+                        members.append(member)
+                        if member == vertex:
+                            break
+                    components.append(members)
+
+    return component, components
+
+
+def reverse_condensation(condensation):
+    """
+    Конденсация обращенного графа: компоненты те же, их порядок обратный.
+    :param condensation: Результат strongly_connected_components
+    :return: tuple: (номер компоненты для каждой вершины, список компонент) для обращенного графа
+    """
+    component, components = condensation
+    last = len(components) - 1
+    return [last - comp_idx for comp_idx in component], components[::-1]
+
+
+def reachability_sets(successors, condensation=None):
+    """
+    Вычисляет множества достижимости для всех вершин сразу через конденсацию графа
+    и распространение битовых масок по DAG компонент.
+    Бит j в маске вершины i установлен, если из i в j есть путь длины не меньше 1
+    (то же, что объединение строк степеней матрицы смежности).
+    :param successors: Списки преемников вершин
+    :param condensation: Готовый результат strongly_connected_components, если он уже вычислен
+    :return: list: Битовые маски (int) достижимых вершин
+    """
+    component, components = condensation or strongly_connected_components(successors)
+
+    component_reach = []
+    for comp_idx, members in enumerate(components):
+        members_mask = 0
+        for member in members:
+            members_mask |= 1 << member
+
+        reach = 0
+        cyclic = len(members) > 1
+        for member in members:
+            for following in successors[member]:
+                target = component[following]
+                if target == comp_idx:
+                    cyclic = True
+                else:
+                    reach |= component_reach[target] | (1 << following)
+        if cyclic:
+            reach |= members_mask
+        component_reach.append(reach)
+
+    return [component_reach[component[vertex]] for vertex in range(len(successors))]
+
+
+def closure_masks(successors, masks, condensation=None):
+    """
+    Для каждой вершины объединяет битовые маски всех вершин, достижимых из нее, включая ее саму.
+    Маски вершин одной компоненты сильной связности вычисляются один раз, поэтому
+    полный перебор вершин стоит столько же, сколько одно построение замыкания.
+    :param successors: Списки преемников вершин
+    :param masks: Битовые маски (int), приписанные вершинам
+    :param condensation: Готовый результат strongly_connected_components, если он уже вычислен
+    :return: list: Объединенные маски для каждой вершины
+    """
+    component, components = condensation or strongly_connected_components(successors)
+
+    component_masks = []
+    for comp_idx, members in enumerate(components):
+        accumulated = 0
+        for member in members:
+            accumulated |= masks[member]
+            for following in successors[member]:
+                target = component[following]
+                if target != comp_idx:
+                    accumulated |= component_masks[target]
+        component_masks.append(accumulated)
+
+    return [component_masks[component[vertex]] for vertex in range(len(successors))]
+
+
+def importance_measures(point_labels, successors, output_points, condensation=None):
+    """
+    Вычисляет меры важности I1 и I2 для всех точек.
+    I1 - число выходов системы, на которые влияет отказ точки;
+    I2 - общее число точек, на которые влияет отказ точки.
+    :param point_labels: Список точек
+    :param successors: Списки преемников в графе зависимостей
+    :param output_points: Точки, подключенные к выходам системы
+    :param condensation: Готовый результат strongly_connected_components, если он уже вычислен
+    :return: list: Кортежи (I1, I2) в порядке point_labels
+    """
+    label_index = {label: idx for idx, label in enumerate(point_labels)}
+    output_indices = [label_index[point] for point in output_points if point in label_index]
+
+    measures = []
+    for reach in reachability_sets(successors, condensation):
+        i1_value = sum(1 for j in output_indices if reach >> j & 1)
+        measures.append((i1_value, reach.bit_count()))
+    return measures
@@ -0,0 +1,372 @@
+import gc
+import json
+import zipfile
+import zlib
+from contextlib import contextmanager
+from graph_model import Node, SchemeGraph, node_points
+
+SCHEME_FORMAT = 'failures-modeling-scheme'
+SCHEME_VERSION = 1
+NODE_TYPES = ('input', 'output', 'aggregate')
+NPZ_ARRAYS = ('header', 'node_types', 'node_typeids', 'node_positions', 'edges',
+              'probability_points', 'probability_values', 'default_probability')
+
+
+class SchemeData:
+    """
+    Содержимое файла схемы сопряжения.
+    nodes - элементы (Node) с позициями x, y и ID, равными их номеру в списке;
+    connections - соединения (выходная_точка, входная_точка, внутреннее) в порядке создания;
+    counters - значения счетчиков Node.input_nodes, output_nodes, aggregate_nodes.
+    """
+    def __init__(self, nodes, connections, counters=None, failure_probabilities=None,
+                 default_failure_probability=0.01):
+        self.nodes = nodes
+        self.connections = connections
+        self.counters = counters or max_typeids(nodes)
+        self.failure_probabilities = failure_probabilities or {}
+        self.default_failure_probability = default_failure_probability
+
+    def build_graph(self):
+        """
+        :return: SchemeGraph: Граф схемы с элементами и соединениями из файла
+        """
+        graph = SchemeGraph()
+        with gc_paused():
+            graph.add_nodes(self.nodes)
+            graph.add_connections(self.connections)
+        return graph
+
+    def apply_counters(self):
+        """
+        Устанавливает счетчики Node так, чтобы новые элементы продолжали нумерацию загруженной схемы.
+        """
+        Node.input_nodes = self.counters['input']
+        Node.output_nodes = self.counters['output']
+        Node.aggregate_nodes = self.counters['aggregate']
+
+
+def max_typeids(nodes):
+    """
+    :return: dict: Тип элемента -> наибольший номер элемента этого типа (0, если таких нет)
+    """
+    counters = dict.fromkeys(NODE_TYPES, 0)
+    for node in nodes:
+        counters[node.type] = max(counters[node.type], node.typeid)
+    return counters
+
+
+def scheme_from_graph(graph, failure_probabilities=None, default_failure_probability=0.01):
+    """
+    Собирает содержимое файла из графа схемы. Удаленные элементы не сохраняются.
+    :param graph: SchemeGraph
+    :param failure_probabilities: Словарь точка -> вероятность отказа
+    :param default_failure_probability: Вероятность отказа по умолчанию
+    :return: SchemeData
+    """
+    nodes = [node for node in graph.nodes.values() if not node.deleted]
+    connections = [(graph.points[edge[0]][1], graph.points[edge[1]][1], edge[2])
+                   for edge in graph.edges if edge is not None]
+    counters = {'input': Node.input_nodes, 'output': Node.output_nodes, 'aggregate': Node.aggregate_nodes}
+    return SchemeData(nodes, connections, counters, dict(failure_probabilities or {}),
+                      default_failure_probability)
+
+
+def make_node(node_type, node_id, typeid, x=0, y=0):
+    """
+    Создает элемент с заданным номером своего типа (typeid), не нарушая логику конструктора Node.
+    Счетчик Node восстанавливается сразу, поэтому неудачная загрузка не меняет нумерацию текущей
+    схемы; счетчики загруженной схемы выставляются SchemeData.apply_counters.
+    """
+    if node_type not in NODE_TYPES:
+        raise ValueError(f"Неизвестный тип элемента: {node_type}")
+    if not isinstance(typeid, int) or isinstance(typeid, bool) or typeid < 1:
+        raise ValueError(f"Неверный номер элемента: {typeid}")
+    counter = f'{node_type}_nodes'
+    saved = getattr(Node, counter)
+    setattr(Node, counter, typeid - 1)
+    try:
+        node = Node(node_type, node_id)
+    finally:
+        setattr(Node, counter, saved)
+    node.x = x
+    node.y = y
+    return node
+
+
+@contextmanager
+def gc_paused():
+    """
+    Приостанавливает циклический сборщик мусора. При загрузке большой схемы создаются сотни тысяч
+    строк, кортежей и списков без циклических ссылок, а сборщик, запускаемый по числу созданных
+    объектов, каждый раз обходит всю растущую кучу - до трети времени загрузки.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def save_scheme(path, scheme):
+    """
+    Сохраняет схему. Формат выбирается по расширению: .npz - компактный двоичный, иначе JSON.
+    :param path: Путь к файлу
+    :param scheme: SchemeData
+    """
+    if str(path).lower().endswith('.npz'):
+        save_npz(path, scheme)
+    else:
+        save_json(path, scheme)
+
+
+def load_scheme(path):
+    """
+    Загружает схему из файла JSON или .npz.
+    :param path: Путь к файлу
+    :return: SchemeData
+    """
+    with gc_paused():
+        if str(path).lower().endswith('.npz'):
+            return load_npz(path)
+        return load_json(path)
+
+
+def save_json(path, scheme):
+    """
+    Сохраняет схему в читаемом формате JSON.
+    """
+    data = {
+        'format': SCHEME_FORMAT,
+        'version': SCHEME_VERSION,
+        'counters': scheme.counters,
+        'nodes': [{'type': node.type, 'typeid': node.typeid, 'x': node.x, 'y': node.y}
+                  for node in scheme.nodes],
+        'connections': [[out_point, in_point, bool(internal)]
+                        for out_point, in_point, internal in scheme.connections],
+        'failure_probabilities': scheme.failure_probabilities,
+        'default_failure_probability': scheme.default_failure_probability,
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=1)
+
+
+def load_json(path):
+    """
+    Загружает схему из файла JSON.
+    """
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not isinstance(data, dict):
+        raise ValueError("Поврежденный файл схемы: ожидается объект JSON")
+    check_format(data.get('format'), data.get('version'))
+
+    items = data.get('nodes')
+    connections = data.get('connections', [])
+    if not isinstance(items, list) or not isinstance(connections, list):
+        raise ValueError("Поврежденный файл схемы: разделы nodes и connections должны быть списками")
+    for item in items:
+        if not isinstance(item, dict) or 'type' not in item or 'typeid' not in item \
+                or not all(is_number(item.get(axis, 0)) for axis in ('x', 'y')):
+            raise ValueError(f"Поврежденный файл схемы: неверное описание элемента {item!r}")
+    for item in connections:
+        if not isinstance(item, list) or len(item) != 3 or not all(isinstance(point, str) for point in item[:2]):
+            raise ValueError(f"Поврежденный файл схемы: неверное описание соединения {item!r}")
+
+    nodes = [make_node(item['type'], node_id, item['typeid'], item.get('x', 0), item.get('y', 0))
+             for node_id, item in enumerate(items)]
+    check_unique_nodes((node.type, node.typeid) for node in nodes)
+    connections = [(out_point, in_point, bool(internal)) for out_point, in_point, internal in connections]
+    return SchemeData(nodes, connections,
+                      check_counters(data.get('counters'), nodes),
+                      check_probabilities(data.get('failure_probabilities')),
+                      check_probability(data.get('default_failure_probability', 0.01), 'по умолчанию'))
+
+
+def save_npz(path, scheme):
+    """
+    Сохраняет схему в сжатом архиве numpy. Элементы и соединения хранятся массивами:
+    точка соединения кодируется номером элемента и номером порта в списке node_points.
+    """
+    import numpy as np
+
+    node_index = {node.id: idx for idx, node in enumerate(scheme.nodes)}
+    ports = {}
+    for node in scheme.nodes:
+        in_points, out_points = node_points(node)
+        for port, point_id in enumerate(in_points):
+            ports[('in', point_id)] = (node_index[node.id], port)
+        for port, point_id in enumerate(out_points):
+            ports[('out', point_id)] = (node_index[node.id], port)
+
+    edges = np.array([ports[('out', out_point)] + ports[('in', in_point)] + (int(internal),)
+                      for out_point, in_point, internal in scheme.connections],
+                     dtype=np.int32).reshape(-1, 5)
+    probabilities = scheme.failure_probabilities
+    np.savez_compressed(
+        path,
+        header=np.array([SCHEME_VERSION] + [scheme.counters[node_type] for node_type in NODE_TYPES],
+                        dtype=np.int64),
+        node_types=np.array([NODE_TYPES.index(node.type) for node in scheme.nodes], dtype=np.uint8),
+        node_typeids=np.array([node.typeid for node in scheme.nodes], dtype=np.int32),
+        node_positions=np.array([(node.x, node.y) for node in scheme.nodes], dtype=np.float64).reshape(-1, 2),
+        edges=edges,
+        probability_points=np.array(list(probabilities), dtype=str),
+        probability_values=np.array(list(probabilities.values()), dtype=np.float64),
+        default_probability=np.array(scheme.default_failure_probability, dtype=np.float64),
+    )
+
+
+def load_npz(path):
+    """
+    Загружает схему из архива .npz, сохраненного save_npz.
+    """
+    import numpy as np
+
+    try:
+        archive = np.load(path, allow_pickle=False)
+        if not isinstance(archive, np.lib.npyio.NpzFile):
+            raise ValueError("Поврежденный файл схемы: ожидается архив .npz")
+        with archive as data:
+            return read_npz(data)
+    except (zipfile.BadZipFile, zlib.error, EOFError) as error:
+        raise ValueError(f"Поврежденный файл схемы: {error}") from error
+
+
+def read_npz(data):
+    """
+    :param data: Открытый архив np.lib.npyio.NpzFile
+    :return: SchemeData
+    """
+    missing = set(NPZ_ARRAYS) - set(data.files)
+    if missing:
+        raise ValueError(f"Поврежденный файл схемы: нет массивов {', '.join(sorted(missing))}")
+    header = data['header']
+    if header.dtype.kind not in 'iu' or header.shape != (len(NODE_TYPES) + 1,):
+        raise ValueError("Поврежденный файл схемы: неверный заголовок")
+    header = header.tolist()
+    check_format(SCHEME_FORMAT, header[0])
+    counters = dict(zip(NODE_TYPES, header[1:]))
+
+    node_types = data['node_types']
+    typeids = data['node_typeids']
+    positions = data['node_positions']
+    edges = data['edges']
+    check_npz_arrays(node_types, typeids, positions, edges)
+
+    nodes = [make_node(NODE_TYPES[node_type], node_id, typeid, *position)
+             for node_id, (node_type, typeid, position)
+             in enumerate(zip(node_types.tolist(), typeids.tolist(), positions.tolist()))]
+    points = [node_points(node) for node in nodes]
+    connections = []
+    for out_node, out_port, in_node, in_port, internal in edges.tolist():
+        out_points = points[out_node][1]
+        in_points = points[in_node][0]
+        if not (0 <= out_port < len(out_points) and 0 <= in_port < len(in_points)):
+            raise ValueError(f"Неверный порт соединения: {out_node}:{out_port} -> {in_node}:{in_port}")
+        connections.append((out_points[out_port], in_points[in_port], bool(internal)))
+    probability_points = data['probability_points']
+    probability_values = data['probability_values']
+    default_probability = data['default_probability']
+    if probability_points.dtype.kind != 'U' or probability_values.dtype.kind != 'f' \
+            or probability_points.ndim != 1 or probability_values.shape != probability_points.shape \
+            or default_probability.dtype.kind != 'f' or default_probability.shape != ():
+        raise ValueError("Поврежденный файл схемы: неверные вероятности отказа")
+    probabilities = dict(zip(probability_points.tolist(), probability_values.tolist()))
+    default_probability = default_probability.item()
+    return SchemeData(nodes, connections, check_counters(counters, nodes), check_probabilities(probabilities),
+                      check_probability(default_probability, 'по умолчанию'))
+
+
+def check_npz_arrays(node_types, typeids, positions, edges):
+    """
+    Проверяет размеры и диапазоны массивов архива .npz до создания элементов.
+    :raises ValueError: Если архив поврежден
+    """
+    if any(array.dtype.kind not in 'iu' for array in (node_types, typeids, edges)) \
+            or positions.dtype.kind not in 'iuf':
+        raise ValueError("Поврежденный файл схемы: неверные типы массивов")
+    count = len(node_types)
+    if node_types.ndim != 1 or typeids.shape != (count,) or positions.shape != (count, 2) \
+            or edges.ndim != 2 or edges.shape[1] != 5:
+        raise ValueError("Поврежденный файл схемы: неверные размеры массивов")
+    if count and (node_types.min() < 0 or node_types.max() >= len(NODE_TYPES)):
+        raise ValueError("Поврежденный файл схемы: неизвестный тип элемента")
+    if count and typeids.min() < 1:
+        raise ValueError("Поврежденный файл схемы: неверный номер элемента")
+    check_unique_nodes(zip((NODE_TYPES[node_type] for node_type in node_types.tolist()), typeids.tolist()))
+    if len(edges) and (edges[:, [0, 2]].min() < 0 or edges[:, [0, 2]].max() >= count):
+        raise ValueError("Поврежденный файл схемы: соединение с несуществующим элементом")
+
+
+def check_format(scheme_format, version):
+    if scheme_format != SCHEME_FORMAT or not isinstance(version, int) or version > SCHEME_VERSION:
+        raise ValueError(f"Неподдерживаемый формат файла схемы: {scheme_format} {version}")
+
+
+def check_unique_nodes(keys):
+    """
+    Проверяет, что номера элементов одного типа не повторяются: иначе их точки совпали бы.
+    :param keys: Пары (тип элемента, номер элемента)
+    :raises ValueError: Если пара встречается дважды
+    """
+    seen = set()
+    for node_type, typeid in keys:
+        key = (node_type, typeid)
+        if key in seen:
+            raise ValueError(f"Поврежденный файл схемы: повторяется элемент {node_type} {typeid}")
+        seen.add(key)
+
+
+def check_counters(counters, nodes):
+    """
+    Проверяет счетчики элементов и поднимает их до наибольших загруженных номеров,
+    чтобы новые элементы не получили номера (и ID точек) уже существующих.
+    :param counters: Словарь тип элемента -> счетчик или None
+    :param nodes: Загруженные элементы
+    :return: dict: Счетчики для всех типов NODE_TYPES
+    """
+    loaded = max_typeids(nodes)
+    if counters is None:
+        return loaded
+    if not isinstance(counters, dict) or any(not isinstance(counters.get(node_type), int)
+                                             or isinstance(counters[node_type], bool)
+                                             or counters[node_type] < 0 for node_type in NODE_TYPES):
+        raise ValueError(f"Поврежденный файл схемы: неверные счетчики элементов {counters!r}")
+    return {node_type: max(counters[node_type], loaded[node_type]) for node_type in NODE_TYPES}
+
+
+def check_probabilities(probabilities):
+    """
+    :param probabilities: Словарь точка -> вероятность отказа или None
+    :return: dict: Словарь str -> float
+    :raises ValueError: Если это не словарь строк и вероятностей
+    """
+    if probabilities is None:
+        return {}
+    if not isinstance(probabilities, dict):
+        raise ValueError("Поврежденный файл схемы: вероятности отказа должны быть словарем")
+    checked = {}
+    for point_id, value in probabilities.items():
+        if not isinstance(point_id, str):
+            raise ValueError(f"Поврежденный файл схемы: неверная точка {point_id!r}")
+        checked[point_id] = check_probability(value, point_id)
+    return checked
+
+
+def check_probability(value, name):
+    """
+    :param value: Вероятность отказа из файла
+    :param name: Точка или описание вероятности для сообщения об ошибке
+    :return: float: Вероятность
+    :raises ValueError: Если это не число из [0, 1]
+    """
+    if not is_number(value) or not 0 <= value <= 1:
+        raise ValueError(f"Поврежденный файл схемы: неверная вероятность отказа {name}: {value!r}")
+    return float(value)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
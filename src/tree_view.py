@@ -0,0 +1,158 @@
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from layout import NODE_SPACING
+
+LABEL_LIMIT = 300
+LABEL_MIN_SCALE = 0.6
+ARROW_POSITION = 0.75
+ARROW_SIZE = 0.25
+ZOOM_STEP = 1.2
+VIEW_MARGIN = 2
+
+
+class TreeRenderer:
+    """
+    Отрисовка дерева FTA/RCA на осях matplotlib пакетными коллекциями: все ребра - одна LineCollection,
+    все стрелки - одна PolyCollection, узлы - по одной линии маркеров Line2D на каждое сочетание
+    цвета и размера (их в дереве несколько, а Agg штампует одинаковые маркеры из одного растра,
+    что заметно быстрее PathCollection с маркерами разного размера). Поэтому отрисовка
+    и панорамирование дерева из десятков тысяч узлов стоят несколько вызовов рисования, а не по
+    артисту на каждый элемент, как у nx.draw_networkx_*.
+
+    При изменении видимой области в коллекции передаются только узлы и ребра, попадающие в нее
+    (с запасом в размер маркера), так что при увеличении рисуется лишь видимая часть дерева;
+    если набор видимых ребер не изменился, их коллекции не пересобираются.
+    Уровень детализации пересчитывается там же: маркеры узлов уменьшаются, когда они перестали бы
+    помещаться между соседями, а подписи создаются только для видимых узлов и только если их
+    не больше LABEL_LIMIT и маркеры не слишком уменьшены.
+    """
+    def __init__(self, ax, G, pos, node_colors, node_sizes):
+        """
+        :param ax: Оси matplotlib
+        :param G: Граф NetworkX
+        :param pos: Координаты узлов
+        :param node_colors: Цвета узлов в порядке G.nodes()
+        :param node_sizes: Размеры маркеров узлов (pt^2) в порядке G.nodes()
+        """
+        self.ax = ax
+        self.nodes = list(G.nodes())
+        index = {node: idx for idx, node in enumerate(self.nodes)}
+        self.xy = np.array([pos[node] for node in self.nodes], dtype=float).reshape(-1, 2)
+        self.sizes = np.asarray(node_sizes, dtype=float)
+        self.labels = {}
+
+        edges = np.array([(index[start], index[end]) for start, end in G.edges()], dtype=int).reshape(-1, 2)
+        starts = self.xy[edges[:, 0]]
+        ends = self.xy[edges[:, 1]]
+        self.segments = np.stack([starts, ends], axis=1)
+        self.heads = arrow_heads(starts, ends)
+        self.edge_low = np.minimum(starts, ends)
+        self.edge_high = np.maximum(starts, ends)
+        self.drawn_edges = None
+        self.lines = ax.add_collection(LineCollection([], colors='black', linewidths=1, zorder=1))
+        self.arrows = ax.add_collection(PolyCollection([], facecolors='black', edgecolors='none', zorder=1))
+        styles = {}
+        for idx, style in enumerate(zip(node_colors, node_sizes)):
+            styles.setdefault(style, []).append(idx)
+        self.markers = []
+        for (color, size), members in styles.items():
+            line, = ax.plot([], [], linestyle='none', marker='o', markeredgewidth=0, color=color, zorder=2)
+            self.markers.append((line, np.sqrt(size), np.array(members)))
+
+        ax.set_axis_off()
+        if len(self.xy):
+            low = self.xy.min(axis=0) - VIEW_MARGIN
+            high = self.xy.max(axis=0) + VIEW_MARGIN
+            ax.set_xlim(low[0], high[0])
+            ax.set_ylim(low[1], high[1])
+
+        ax.callbacks.connect('xlim_changed', self.update_details)
+        ax.callbacks.connect('ylim_changed', self.update_details)
+        ax.figure.canvas.mpl_connect('resize_event', self.update_details)
+        ax.figure.canvas.mpl_connect('scroll_event', self.scroll)
+        self.update_details()
+
+    def marker_scale(self):
+        """
+        :return: float: Множитель диаметра маркеров (не больше 1), при котором самый крупный
+                 маркер помещается в расстояние между соседними узлами слоя
+        """
+        if not len(self.sizes):
+            return 1.0
+        x1, x2 = self.ax.get_xlim()
+        pixels_per_unit = self.ax.bbox.width / abs(x2 - x1) if x2 != x1 else 0
+        diameter = np.sqrt(self.sizes.max()) * self.ax.figure.dpi / 72
+        return min(1.0, pixels_per_unit * NODE_SPACING * 0.9 / diameter)
+
+    def update_details(self, *args):
+        """
+        Передает коллекциям узлы и ребра видимой области и пересчитывает размеры маркеров
+        и набор подписей.
+        """
+        scale = self.marker_scale()
+        x1, x2 = sorted(self.ax.get_xlim())
+        y1, y2 = sorted(self.ax.get_ylim())
+        margin = NODE_SPACING / 2
+        low = np.array([x1 - margin, y1 - margin])
+        high = np.array([x2 + margin, y2 + margin])
+
+        for line, diameter, members in self.markers:
+            points = self.xy[members]
+            points = points[((points >= low) & (points <= high)).all(axis=1)]
+            line.set_data(points[:, 0], points[:, 1])
+            line.set_markersize(diameter * scale)
+
+        crossing = np.flatnonzero(((self.edge_high >= low) & (self.edge_low <= high)).all(axis=1))
+        if self.drawn_edges is None or not np.array_equal(crossing, self.drawn_edges):
+            self.drawn_edges = crossing
+            self.lines.set_segments(self.segments[crossing])
+            self.arrows.set_verts(self.heads[crossing])
+
+        visible = []
+        if scale >= LABEL_MIN_SCALE:
+            inside = (self.xy[:, 0] >= x1) & (self.xy[:, 0] <= x2) & (self.xy[:, 1] >= y1) & (self.xy[:, 1] <= y2)
+            visible = np.flatnonzero(inside)
+            if len(visible) > LABEL_LIMIT:
+                visible = []
+
+        shown = set(int(idx) for idx in visible)
+        for idx in list(self.labels):
+            if idx not in shown:
+                self.labels.pop(idx).remove()
+        for idx in shown:
+            if idx not in self.labels:
+                x, y = self.xy[idx]
+                self.labels[idx] = self.ax.text(x, y, str(self.nodes[idx]), fontsize=10, fontweight='bold',
+                                                ha='center', va='center', zorder=3, clip_on=True)
+
+    def scroll(self, event):
+        """
+        Масштабирование колесом мыши относительно точки под курсором.
+        """
+        if event.inaxes is not self.ax:
+            return
+        factor = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+        x1, x2 = self.ax.get_xlim()
+        y1, y2 = self.ax.get_ylim()
+        x, y = event.xdata, event.ydata
+        self.ax.set_xlim(x + (x1 - x) * factor, x + (x2 - x) * factor)
+        self.ax.set_ylim(y + (y1 - y) * factor, y + (y2 - y) * factor)
+        self.ax.figure.canvas.draw_idle()
+
+
+def arrow_heads(starts, ends):
+    """
+    Треугольники стрелок на отрезках ребер в координатах данных: вершина на доле ARROW_POSITION
+    длины ребра, чтобы стрелка не скрывалась под маркером узла.
+    :param starts: Массив (n, 2) начал ребер
+    :param ends: Массив (n, 2) концов ребер
+    :return: np.ndarray: Массив (n, 3, 2) вершин треугольников
+    """
+    vectors = ends - starts
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+    lengths[lengths == 0] = 1
+    directions = vectors / lengths[:, None]
+    normals = np.stack([-directions[:, 1], directions[:, 0]], axis=1)
+    tips = starts + vectors * ARROW_POSITION
+    bases = tips - directions * ARROW_SIZE
+    return np.stack([tips, bases + normals * ARROW_SIZE / 2, bases - normals * ARROW_SIZE / 2], axis=1)
@@ -0,0 +1,199 @@
+import hashlib
+import networkx as nx
+from collections import OrderedDict
+from layout import layered_layout
+from reachability import strongly_connected_components
+
+TREE_CACHE_SIZE = 8
+
+
+def condensation(G):
+    """
+    Находит компоненты сильной связности графа NetworkX.
+    :param G: Граф NetworkX
+    :return: tuple: (список узлов, номер компоненты для каждого узла, компоненты в обратном
+             топологическом порядке, списки преемников по номерам узлов)
+    """
+    nodes = list(G.nodes())
+    index = {node: idx for idx, node in enumerate(nodes)}
+    successors = [[index[following] for following in G.successors(node)] for node in nodes]
+    component, components = strongly_connected_components(successors)
+    return nodes, component, components, successors
+
+
+def find_cycles(nodes, components, successors):
+    """
+    :return: list: Циклы схемы - списки узлов компонент сильной связности из нескольких узлов
+             или узлов с петлей
+    """
+    cycles = []
+    for members in components:
+        if len(members) > 1 or members[0] in successors[members[0]]:
+            cycles.append([nodes[vertex] for vertex in sorted(members)])
+    return cycles
+
+
+def build_tree_structure(graph, connections, is_fta=True):
+    """
+    Строит структуру деревьев FTA и RCA: граф, уровни и координаты узлов, цвета и размеры.
+    Не зависит от Tk и matplotlib, поэтому используется и окнами программы, и пакетным анализом.
+
+    Уровни назначаются за O(V+E): граф сжимается по компонентам сильной связности, и по DAG
+    компонент за один проход в топологическом порядке находится длина наибольшего пути -
+    от корня системы для FTA и до листьев для RCA. Узлы одного цикла получают один уровень,
+    а сами циклы перечисляются в G.graph['cycles']; уровни всех узлов - в G.graph['levels']. Координаты по уровням строит
+    layout.layered_layout, общий для обоих деревьев.
+
+    :param graph: SchemeGraph - для поиска элементов, которым принадлежат точки (RCA)
+    :param connections: Кортеж соединений типа (начальная_точка, конечная_точка)
+    :param is_fta: True для FTA, False для RCA
+
+    :returns:
+        G: Граф NetworkX;
+        pos: Координаты расположения для всех узлов графа;
+        node_colors: Информация о цвете для каждого узла;
+        node_sizes: Информация о размере для каждого узла;
+        для FTA без корневых узлов возвращается (None, None, None, None)
+    """
+    G = nx.DiGraph()
+
+    for start, end in connections:
+        G.add_edge(start, end)
+
+    points, component, components, successors = condensation(G)
+    G.graph['cycles'] = find_cycles(points, components, successors)
+
+    if is_fta:
+        has_predecessor = [False] * len(components)
+        for vertex, row in enumerate(successors):
+            for following in row:
+                if component[following] != component[vertex]:
+                    has_predecessor[component[following]] = True
+        root_nodes = [node for vertex, node in enumerate(points) if not has_predecessor[component[vertex]]]
+
+        if not root_nodes:
+            return None, None, None, None
+
+        system_node = "System"
+        for root in root_nodes:
+            G.add_edge(system_node, root)
+
+        component_levels = [1] * len(components)
+        for comp_idx in range(len(components) - 1, -1, -1):
+            for vertex in components[comp_idx]:
+                for following in successors[vertex]:
+                    target = component[following]
+                    if target != comp_idx:
+                        component_levels[target] = max(component_levels[target], component_levels[comp_idx] + 1)
+
+        levels = {system_node: 0}
+        for vertex, node in enumerate(points):
+            levels[node] = component_levels[component[vertex]]
+    else:
+        leaf_nodes = {node for node in G.nodes() if G.out_degree(node) == 0}
+
+        system_node = None
+        root_nodes = []
+
+        vlk_nodes = {}
+        non_leaf_nodes = [node for node in G.nodes() if node not in leaf_nodes]
+
+        for node in non_leaf_nodes:
+            node_obj = graph.node_by_point(node)
+            if node_obj:
+                vlk_name = f"ВЛК_{node_obj.typeid}"
+                vlk_nodes[vlk_name] = node
+
+                G.add_node(vlk_name)
+                G.add_edge(node, vlk_name)
+
+        heights = [0] * len(components)
+        for comp_idx, members in enumerate(components):
+            for vertex in members:
+                for following in successors[vertex]:
+                    target = component[following]
+                    if target != comp_idx:
+                        heights[comp_idx] = max(heights[comp_idx], heights[target] + 1)
+
+        max_height = max(heights, default=0)
+        levels = {node: max_height - heights[component[vertex]] for vertex, node in enumerate(points)}
+        for vlk_name, parent in vlk_nodes.items():
+            levels[vlk_name] = levels[parent] + 1
+
+    G.graph['levels'] = levels
+    pos = layered_layout(G, levels)
+
+    node_colors = []
+    node_sizes = []
+    root_set = set(root_nodes)
+
+    for node in G.nodes():
+        if is_fta:
+            if node == system_node:
+                node_colors.append('lightgreen')
+                node_sizes.append(3000)
+            elif node in root_set:
+                node_colors.append('lightcoral')
+                node_sizes.append(2000)
+            else:
+                node_colors.append('lightblue')
+                node_sizes.append(2000)
+        else:  # RCA
+            if node in vlk_nodes:
+                node_colors.append('lightyellow')
+                node_sizes.append(1500)
+            elif node in leaf_nodes:
+                node_colors.append('lightgreen')
+                node_sizes.append(2000)
+            else:
+                node_colors.append('lightblue')
+                node_sizes.append(2000)
+
+    return G, pos, node_colors, node_sizes
+
+
+def topology_key(graph, connections, is_fta):
+    """
+    Устойчивый хэш всего, от чего зависит дерево: вида дерева, набора соединений (без учета
+    порядка) и элементов, которым принадлежат точки (по ним называются узлы ВЛК).
+    Не зависит от PYTHONHASHSEED, поэтому одинаков для одной и той же схемы в разных запусках.
+    :param graph: SchemeGraph
+    :param connections: Соединения (начальная_точка, конечная_точка)
+    :param is_fta: True для FTA, False для RCA
+    :return: str: Шестнадцатеричный SHA-1
+    """
+    owners = []
+    for point in sorted({point for connection in connections for point in connection}):
+        node = graph.node_by_point(point)
+        owners.append((point, node.type, node.typeid) if node else (point,))
+    text = repr((is_fta, sorted(connections), owners))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class TreeCache:
+    """
+    Кэш результатов build_tree_structure (граф, координаты, цвета, размеры) по ключу topology_key
+    с вытеснением давно не использованных записей (LRU). Ключ определяется содержимым схемы,
+    поэтому после изменения схемы запись просто не находится, а возврат к прежней схеме
+    (отмена правки, повторное открытие файла) снова попадает в кэш.
+    """
+    def __init__(self, maxsize=TREE_CACHE_SIZE):
+        """
+        :param maxsize: Наибольшее число хранимых деревьев
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key, builder):
+        """
+        :param key: Ключ topology_key
+        :param builder: Функция без аргументов, строящая дерево при промахе
+        :return: Результат builder для этого ключа
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        value = self.entries[key] = builder()
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return value
@@ -0,0 +1,288 @@
+from failures import color_failed_elements, tag_failed_elements
+from graph_model import node_points
+from propagation import FailureSet
+
+LAZY_NODE_THRESHOLD = 1000
+GRID_CELL = 400
+VIEW_MARGIN = 200
+NODE_EXTENTS = {'input': (50, 30), 'output': (50, 30), 'aggregate': (55, 60)}
+
+
+class SpatialGrid:
+    """
+    Равномерная сетка по координатам модели для поиска элементов, попадающих в прямоугольник.
+    Элемент хранится в ячейке своего центра, поэтому прямоугольник запроса должен включать запас
+    на размер элемента.
+    """
+    def __init__(self, cell_size=GRID_CELL):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.node_cells = {}
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, node_id, x, y):
+        cell = self.cell_of(x, y)
+        self.node_cells[node_id] = cell
+        self.cells.setdefault(cell, set()).add(node_id)
+
+    def remove(self, node_id):
+        cell = self.node_cells.pop(node_id, None)
+        if cell is not None:
+            self.cells[cell].discard(node_id)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def move(self, node_id, x, y):
+        if self.node_cells.get(node_id) != self.cell_of(x, y):
+            self.remove(node_id)
+            self.insert(node_id, x, y)
+
+    def query(self, x1, y1, x2, y2):
+        """
+        :return: set: ID элементов, центры которых лежат в ячейках, пересекающих прямоугольник
+        """
+        cx1, cy1 = self.cell_of(x1, y1)
+        cx2, cy2 = self.cell_of(x2, y2)
+        found = set()
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            for (cx, cy), node_ids in self.cells.items():
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                    found |= node_ids
+            return found
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                found |= self.cells.get((cx, cy), set())
+        return found
+
+
+def point_offset(node, point_type, point_id):
+    """
+    Смещение центра точки относительно центра элемента так, как она отрисовывается в render_node.
+    :param node: Элемент
+    :param point_type: 'in' | 'out' - тип точки
+    :param point_id: ID точки
+    :return: tuple: (dx, dy) в координатах модели
+    """
+    in_points, out_points = node_points(node)
+    if node.type == 'aggregate':
+        points = in_points if point_type == 'in' else out_points
+        dy = -40 + points.index(point_id) * 15
+    else:
+        dy = 0
+    return (-40 if point_type == 'in' else 40), dy
+
+
+def point_owner(graph, point):
+    """
+    :param point: Пара (тип, ID) точки
+    :return: ID элемента, которому принадлежит точка, или None
+    """
+    idx = graph.point_index.get(point)
+    return graph.point_owner[idx] if idx is not None else None
+
+
+def set_lazy_mode(simulator, enabled):
+    """
+    Включает или выключает режим отрисовки только видимой области.
+    В этом режиме вся схема хранится в графе, а элементы холста создаются только для узлов
+    в видимой области (с запасом) и соединений, хотя бы один конец которых виден.
+    :param enabled: True - включить режим
+    """
+    if enabled == simulator.lazy_mode:
+        return
+    if enabled:
+        simulator.lazy_mode = True
+        simulator.materialized = set(simulator.graph.nodes)
+        rebuild_viewport(simulator, keep_items=True)
+    else:
+        materialize_nodes(simulator, [node for node in simulator.graph.nodes.values()
+                                      if node.id not in simulator.materialized])
+        simulator.lazy_mode = False
+        simulator.spatial_grid = None
+        simulator.materialized = set()
+
+
+def rebuild_viewport(simulator, keep_items=False):
+    """
+    Перестраивает пространственный индекс по всем элементам графа и отрисовывает видимую область.
+    :param keep_items: True, если simulator.materialized уже описывает отрисованные узлы
+    """
+    simulator.canvas.config(confine=False)
+    simulator.spatial_grid = SpatialGrid()
+    for node in simulator.graph.nodes.values():
+        simulator.spatial_grid.insert(node.id, node.x, node.y)
+    if not keep_items:
+        simulator.materialized = set()
+    refresh_viewport(simulator)
+
+
+def visible_region(simulator, margin=VIEW_MARGIN):
+    """
+    :return: tuple: Видимый прямоугольник холста (x1, y1, x2, y2) в координатах модели
+    """
+    canvas = simulator.canvas
+    scale = simulator.view_scale
+    x1 = canvas.canvasx(0)
+    y1 = canvas.canvasy(0)
+    x2 = canvas.canvasx(canvas.winfo_width())
+    y2 = canvas.canvasy(canvas.winfo_height())
+    return x1 / scale - margin, y1 / scale - margin, x2 / scale + margin, y2 / scale + margin
+
+
+def schedule_viewport_refresh(simulator):
+    """
+    Откладывает пересчет видимой области до освобождения Tk, объединяя серию событий панорамирования.
+    """
+    if simulator.lazy_mode and simulator.viewport_job is None:
+        simulator.viewport_job = simulator.root.after_idle(refresh_viewport, simulator)
+
+
+def refresh_viewport(simulator):
+    """
+    Создает элементы холста для узлов, попавших в видимую область, и удаляет элементы ушедших из нее.
+    """
+    simulator.viewport_job = None
+    if not simulator.lazy_mode:
+        return
+
+    x1, y1, x2, y2 = visible_region(simulator)
+    nodes = simulator.graph.nodes
+    visible = set()
+    reach = max(max(extents) for extents in NODE_EXTENTS.values())
+    for node_id in simulator.spatial_grid.query(x1 - reach, y1 - reach, x2 + reach, y2 + reach):
+        node = nodes[node_id]
+        half_width, half_height = NODE_EXTENTS[node.type]
+        if node.x + half_width >= x1 and node.x - half_width <= x2 and \
+                node.y + half_height >= y1 and node.y - half_height <= y2:
+            visible.add(node_id)
+
+    if simulator.drag_data["item"] is not None:
+        visible.add(simulator.drag_data["item"])
+
+    for node_id in simulator.materialized - visible:
+        dematerialize_node(simulator, nodes[node_id])
+    materialize_nodes(simulator, [nodes[node_id] for node_id in visible - simulator.materialized])
+
+
+def materialize_nodes(simulator, new_nodes):
+    """
+    Создает элементы холста для узлов и их соединений и восстанавливает разметку отказа.
+    :param new_nodes: Узлы, еще не отрисованные на холсте
+    """
+    if not new_nodes:
+        return
+    graph = simulator.graph
+    created_connections = []
+    for node in new_nodes:
+        simulator.render_node(node)
+        simulator.materialized.add(node.id)
+        for out_point, in_point, internal in graph.incident_connections(node.id):
+            if (out_point, in_point) not in simulator.connection_items:
+                simulator.render_connection(out_point, in_point, internal)
+                created_connections.append((out_point, in_point))
+            elif not internal and graph.node_by_point(in_point, 'in') is node:
+                simulator.render_source_label(out_point, in_point)
+
+    failure = simulator.failure
+    if failure is not None:
+        node_ids = {node.id for node in new_nodes}
+        visible_failure = FailureSet(failure.origin)
+        visible_failure.nodes = failure.nodes & node_ids
+        visible_failure.points = {point for point in failure.points
+                                  if point_owner(graph, point) in node_ids}
+        visible_failure.edges = failure.edges.intersection(created_connections)
+        tag_failed_elements(simulator, visible_failure)
+
+        items = set()
+        for node_id in visible_failure.nodes:
+            items.update(simulator.canvas.find_withtag(f'node_{node_id}'))
+        for kind, point_id in visible_failure.points:
+            items.add(simulator.point_items[(kind, point_id)])
+        for edge in visible_failure.edges:
+            items.add(simulator.connection_items[edge])
+        color_failed_elements(simulator, items)
+
+
+def dematerialize_node(simulator, node):
+    """
+    Удаляет элементы холста узла и тех его соединений, второй конец которых тоже не отрисован.
+    """
+    canvas = simulator.canvas
+    graph = simulator.graph
+    simulator.materialized.discard(node.id)
+
+    for out_point, in_point, internal in graph.incident_connections(node.id):
+        out_owner = point_owner(graph, ('out', out_point))
+        other = point_owner(graph, ('in', in_point)) if out_owner == node.id else out_owner
+        if internal or other not in simulator.materialized:
+            item = simulator.connection_items.pop((out_point, in_point), None)
+            if item is not None:
+                canvas.delete(item)
+
+    canvas.delete(f'node_{node.id}')
+    canvas.delete(f'point_of_{node.id}')
+    in_points, out_points = node_points(node)
+    for point_id in in_points:
+        canvas.delete(f'in_{point_id}_text')
+        simulator.point_items.pop(('in', point_id), None)
+    for point_id in out_points:
+        canvas.delete(f'out_{point_id}_text')
+        simulator.point_items.pop(('out', point_id), None)
+
+
+def pan_start(simulator, event):
+    simulator.canvas.scan_mark(event.x, event.y)
+
+
+def pan(simulator, event):
+    """
+    Сдвигает видимую область холста вслед за мышью.
+    """
+    simulator.canvas.scan_dragto(event.x, event.y, gain=1)
+    schedule_viewport_refresh(simulator)
+
+
+def scroll(simulator, event):
+    """
+    Прокрутка колесом мыши: без модификаторов - по вертикали, с Shift - по горизонтали, с Ctrl - масштаб.
+    """
+    delta = event.delta if event.delta else (120 if event.num == 4 else -120)
+    if event.state & 0x0004:
+        zoom(simulator, event, 1.1 if delta > 0 else 1 / 1.1)
+        return
+    steps = -1 if delta > 0 else 1
+    if event.state & 0x0001:
+        simulator.canvas.xview_scroll(steps, 'units')
+    else:
+        simulator.canvas.yview_scroll(steps, 'units')
+    schedule_viewport_refresh(simulator)
+
+
+def zoom(simulator, event, factor):
+    """
+    Масштабирует холст относительно точки под курсором.
+    Координаты модели узлов не меняются: масштаб хранится в simulator.view_scale.
+    """
+    canvas = simulator.canvas
+    x = canvas.canvasx(event.x)
+    y = canvas.canvasy(event.y)
+    canvas.scale('all', 0, 0, factor, factor)
+    simulator.view_scale *= factor
+    canvas.scan_mark(0, 0)
+    canvas.scan_dragto(int(round(-x * (factor - 1))), int(round(-y * (factor - 1))), gain=1)
+    schedule_viewport_refresh(simulator)
+
+
+def reset_view(simulator):
+    """
+    Возвращает исходный масштаб и положение холста.
+    """
+    canvas = simulator.canvas
+    if simulator.view_scale != 1:
+        canvas.scale('all', 0, 0, 1 / simulator.view_scale, 1 / simulator.view_scale)
+        simulator.view_scale = 1.0
+    canvas.xview_moveto(0)
+    canvas.yview_moveto(0)
+    schedule_viewport_refresh(simulator)